@@ -50,12 +50,16 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'courses.telemetry.TelemetryMiddleware',
+    'courses.profiling.ProfilingMiddleware',
+    'courses.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'courses.middleware.HashingBusyMiddleware',
 ]
 
 ROOT_URLCONF = 'courseapi.urls'
@@ -107,10 +111,30 @@ REST_FRAMEWORK = {
     )
 }
 
+COMPRESSION_MIN_SIZE = 1024
+STREAMING_JSON_CHUNK_SIZE = 500
+
 OAUTH2_PROVIDER = {
-    'ACCESS_TOKEN_EXPIRE_SECONDS': 31536000,
+    'ACCESS_TOKEN_EXPIRE_SECONDS': 3600,
+    'REFRESH_TOKEN_EXPIRE_SECONDS': 30 * 24 * 3600,
+    'ROTATE_REFRESH_TOKEN': True,
+    'REFRESH_TOKEN_GRACE_PERIOD_SECONDS': 120,
+    'CLEAR_EXPIRED_TOKENS_BATCH_SIZE': 1000,
+    'CLEAR_EXPIRED_TOKENS_BATCH_INTERVAL': 0.1,
 }
 
+PASSWORD_HASHERS = [
+    'courses.hashing.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASH_ITERATIONS = 1_200_000
+PASSWORD_HASH_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+PASSWORD_HASH_MAX_PENDING = 64
+PASSWORD_HASH_WAIT_SECONDS = 5
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -152,6 +176,123 @@ CKEDITOR_CONFIGS = {
     }
 }
 
+LESSON_IMAGE_TRANSFORMATION = 'w_800,c_limit,q_auto,f_auto'
+LESSON_EXCERPT_LENGTH = 200
+LESSON_READING_WPM = 200
+LESSON_POSITION_GAP = 1024
+LESSON_RENDER_PRUNE_HOURS = 24
+
+LEADERBOARD_HALF_LIFE_DAYS = 7
+LEADERBOARD_MIN_SCORE = 0.01
+
+FACET_DURATION_BUCKETS = {
+    'short': (0, 5),
+    'medium': (6, 15),
+    'long': (16, None),
+}
+
+JOBS_ENABLED = False
+JOBS_SPOOL_DIR = BASE_DIR / 'spool'
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_BASE_SECONDS = 5
+JOBS_STALE_SECONDS = 600
+LECTURER_STATS_TTL = 300
+
+EXPORTS_ROOT = BASE_DIR / 'exports'
+EXPORT_CHUNK_SIZE = 2000
+
+BUNDLES_ROOT = BASE_DIR / 'bundles'
+BUNDLES_MAX_DELTAS = 20
+ACCESS_CACHE_TIMEOUT = 60
+
+PARTITIONED_MODELS = ['courses.Enrollment', 'courses.LessonStatus', 'courses.Like',
+                      'courses.Rating', 'courses.Comment', 'courses.Transaction']
+PARTITION_MONTHS_AHEAD = 3
+# Keep off until partition_tables has actually partitioned the tables (see partitioning.blockers).
+PARTITION_PRUNING = False
+
+NOTIFICATIONS_BACKEND = 'courses.notifications.LocalBackend'
+
+# Local memory is per process: version stamps are not shared between workers, so reference snapshots are
+# reloaded after REFERENCE_SNAPSHOT_MAX_AGE, conditional GETs (ETag/304) and lesson access decisions are not
+# cached at all, and comment throttling buckets are counted per worker. Use courses.telemetry.RedisCache for
+# multi-process deployments (check courses.W001).
+CACHES = {
+    'default': {
+        'BACKEND': 'courses.telemetry.LocMemCache',
+    }
+}
+
+REFERENCE_SNAPSHOT_MAX_AGE = 60
+
+TELEMETRY_ENABLED = True
+TELEMETRY_SAMPLE_RATE = 0.05
+TELEMETRY_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+TELEMETRY_SLOW_QUERY_MS = 100
+TELEMETRY_SLOW_QUERY_SAMPLES = 100
+TELEMETRY_METRICS_TOKEN = os.environ.get('TELEMETRY_METRICS_TOKEN')
+TELEMETRY_METRICS_ALLOWED_IPS = []
+TELEMETRY_LOG_FILE = os.environ.get('TELEMETRY_LOG_FILE', '/tmp/courseapi-logs/telemetry.log')
+
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED') == '1'
+PROFILING_SAMPLE_RATE = 0.001
+PROFILING_HEADER = 'X-Profile'
+PROFILING_INTERVAL = 0.005
+PROFILING_MAX_DEPTH = 128
+PROFILING_WINDOW_MINUTES = 60
+PROFILING_RETENTION_DAYS = 7
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'courses.telemetry.JSONFormatter',
+        },
+    },
+    'handlers': {
+        'telemetry': {
+            'class': 'courses.telemetry.RotatingFileHandler',
+            'filename': TELEMETRY_LOG_FILE,
+            'setting': 'TELEMETRY_LOG_FILE',
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+            'formatter': 'json',
+        },
+    },
+    'loggers': {
+        'courses.telemetry': {
+            'handlers': ['telemetry'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+NOTIFICATIONS_SOCKET_DIR = '/tmp/courseapi-notifications'
+NOTIFICATIONS_QUEUE_SIZE = 100
+NOTIFICATIONS_MAX_TOPICS = 50
+
+ARCHIVE_AFTER_DAYS = 180
+
+ADMIN_EXACT_COUNT_LIMIT = 10000
+ADMIN_FILTER_CACHE_TIMEOUT = 300
+
+SCHEMA_ROOT = BASE_DIR / 'schema'
+SCHEMA_CACHE_TIMEOUT = 3600
+SWAGGER_SETTINGS = {
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
+}
+REDOC_SETTINGS = {
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
+}
+
+PROVISIONING_BATCH_SIZE = 500
+
+THROTTLE_BUCKETS = {
+    'comments': {'capacity': 5, 'per_minute': 10},
+}
+
 # Internationalization
 # https://docs.djangoproject.com/en/6.0/topics/i18n/
 
@@ -17,34 +17,21 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, re_path, include
 from courses.admin import admin_site
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Course API",
-        default_version='v1',
-        description="APIs for CourseApp",
-        contact=openapi.Contact(email="tranthinhuhanh17@gmail.com"),
-        license=openapi.License(name="Han@2026"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from courses import schema, telemetry
 
 urlpatterns = [
     path('', include('courses.urls')),
     path('admin/', admin_site.urls),
+    path('metrics', telemetry.metrics_view, name='metrics'),
     re_path(r'^ckeditor/', include('ckeditor_uploader.urls')),
     re_path(r'^swagger(?P<format>\.json|\.yaml)$',
-            schema_view.without_ui(cache_timeout=0),
+            schema.schema_view,
             name='schema-json'),
     re_path(r'^swagger/$',
-            schema_view.with_ui('swagger', cache_timeout=0),
+            schema.ui_view('swagger'),
             name='schema-swagger-ui'),
     re_path(r'^redoc/$',
-            schema_view.with_ui('redoc', cache_timeout=0),
+            schema.ui_view('redoc'),
             name='schema-redoc'),
     path('o/',include('oauth2_provider.urls',
             namespace='oauth2_provider'))
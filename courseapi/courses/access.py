@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from courses import caching
+from courses.models import Enrollment, User
+
+ACCESS_KEY = 'access:{}:{}'
+
+
+def access_key(user_id, course_id):
+    return ACCESS_KEY.format(user_id, course_id)
+
+
+def remember(user_id, course_id):
+    cache.set(access_key(user_id, course_id), True, settings.ACCESS_CACHE_TIMEOUT)
+
+
+def forget(user_id, course_id):
+    cache.delete(access_key(user_id, course_id))
+
+
+def is_enrolled(user_id, course_id):
+    if caching.is_shared() and cache.get(access_key(user_id, course_id)):
+        return True
+    return Enrollment.objects.active().filter(student_id=user_id, course_id=course_id).exists()
+
+
+def can_view(user, course_id, instructor_id):
+    if not user.is_authenticated:
+        return False
+    if user.pk == instructor_id:
+        return True
+    return user.role == User.Role.STUDENT and is_enrolled(user.pk, course_id)
+
+
+def refresh(user_id, course_id, allowed):
+    forget(user_id, course_id)
+    if allowed:
+        transaction.on_commit(lambda: remember(user_id, course_id))
+    else:
+        transaction.on_commit(lambda: forget(user_id, course_id))
+
+
+@receiver(post_save, sender=Enrollment)
+def refresh_enrollment_access(sender, instance, **kwargs):
+    refresh(instance.student_id, instance.course_id, instance.active)
+
+
+@receiver(post_delete, sender=Enrollment)
+def revoke_enrollment_access(sender, instance, **kwargs):
+    refresh(instance.student_id, instance.course_id, False)
@@ -1,13 +1,39 @@
+import os
+from datetime import timedelta
+
 from ckeditor_uploader.widgets import CKEditorUploadingWidget
 from django.contrib import admin
 from django import forms
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.auth.admin import UserAdmin
 from django.db.models import Count, Sum
 from django.db.models.functions import TruncDate, TruncMonth
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import get_object_or_404
 from django.template.response import TemplateResponse
+from django.utils import timezone
+from django.utils.html import format_html
 from django.utils.safestring import mark_safe
+from django.utils.text import get_valid_filename
+from courses import exports, leaderboards, jobs, profiling, services
 from courses.models import Course, Category, Teacher, Lesson, Student, Tag, Comment, Enrollment, Transaction
-from django.urls import path
+from courses.models import CourseScore, ExportJob, Job
+from courses.admin_performance import PerformanceAdminMixin, thumbnail_url
+from courses.projection import heavy_fields
+from django.urls import path, reverse
+
+
+class ProjectedChangeList(ChangeList):
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        deferred = heavy_fields(self.model) - set(self.list_display)
+        return queryset.defer(*deferred) if deferred else queryset
+
+
+class ProjectionAdminMixin:
+    def get_changelist(self, request, **kwargs):
+        return ProjectedChangeList
 
 
 class LessonForm(forms.ModelForm):
@@ -22,7 +48,7 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
 
-class CourseAdmin(admin.ModelAdmin):
+class CourseAdmin(ProjectionAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'image_icon', 'name', 'duration', 'category', 'fee', 'instructor','active')
     list_filter = ('category', 'instructor', 'fee')
     search_fields = ('name',)
@@ -36,8 +62,8 @@ class CourseAdmin(admin.ModelAdmin):
 
     def image_icon(self, course):
         if course.image:
-            return mark_safe(f'<img src="{course.image.url}" width="50" height="50" style="object-fit: cover; border-radius: 5px;" />')
-        return self.name
+            return mark_safe(f'<img src="{thumbnail_url(course.image, 50)}" width="50" height="50" style="object-fit: cover; border-radius: 5px;" />')
+        return "Chưa có ảnh"
 
     image_icon.short_description = "Ảnh"
 
@@ -54,7 +80,7 @@ class UserPhotoMixin:
 
 
 @admin.register(Teacher)
-class TeacherAdmin(UserAdmin, UserPhotoMixin):
+class TeacherAdmin(ProjectionAdminMixin, UserAdmin, UserPhotoMixin):
     list_display = ('username', 'email', 'is_verified', 'work_place')
     list_editable = ('is_verified',)
     search_fields = ('first_name','last_name')
@@ -100,14 +126,15 @@ class StudentAdmin(UserAdmin, UserPhotoMixin):
 
     readonly_fields = ('photo_preview',)
 
-class LessonAdmin(admin.ModelAdmin):
+class LessonAdmin(ProjectionAdminMixin, admin.ModelAdmin):
     form = LessonForm
-    list_display = ('id', 'subject', 'course', 'created_date')
+    list_display = ('id', 'subject', 'course', 'position', 'created_date')
     search_fields = ('subject',)
     filter_horizontal = ('tags',)
 
 class EnrollmentAdmin(admin.ModelAdmin):
     list_display = ('id', 'get_course_name', 'get_instructor_name','created_date', 'active')
+    list_select_related = ('course__instructor',)
 
     @admin.display(ordering='course', description='Tên khóa học')
     def get_course_name(self, obj):
@@ -118,13 +145,70 @@ class EnrollmentAdmin(admin.ModelAdmin):
         instructor = obj.course.instructor
         return f"{instructor.first_name} {instructor.last_name}" if instructor.first_name else instructor.username
 
+class CommentAdmin(admin.ModelAdmin):
+    list_display = ('id', 'content', 'user', 'lesson', 'created_date', 'active')
+    list_filter = ('active',)
+    search_fields = ('content', 'user__username')
+    list_select_related = ('user', 'lesson')
+    actions = ['hide_comments']
+
+    @admin.action(description='Ẩn các bình luận đã chọn')
+    def hide_comments(self, request, queryset):
+        hidden = services.CommentService.hide(queryset)
+        self.message_user(request, f'Đã ẩn {hidden} bình luận')
+
+
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'report', 'format', 'requested_by', 'status', 'progress', 'created_date', 'download')
+    list_filter = ('report', 'format', 'status')
+    fields = ('report', 'format', 'date_from', 'date_to', 'instructor', 'pay_method')
+    list_select_related = ('requested_by',)
+
+    @admin.display(description='Tải về')
+    def download(self, obj):
+        if obj.status == Job.Status.DONE and obj.file:
+            url = reverse(f'{self.admin_site.name}:courses_exportjob_download', args=[obj.pk])
+            return format_html('<a href="{}">{}</a>', url, os.path.basename(obj.file.name))
+        return '-'
+
+    def get_urls(self):
+        return [path('<int:pk>/download/', self.admin_site.admin_view(self.download_view),
+                     name='courses_exportjob_download')] + super().get_urls()
+
+    def download_view(self, request, pk):
+        export = get_object_or_404(ExportJob, pk=pk)
+        if not self.has_view_permission(request, export):
+            raise PermissionDenied
+        if export.status != Job.Status.DONE or not export.file:
+            raise Http404("Báo cáo chưa sẵn sàng để tải về")
+        return FileResponse(export.file.open('rb'), as_attachment=True, filename=os.path.basename(export.file.name),
+                            content_type=exports.content_type(export))
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.requested_by = request.user
+        super().save_model(request, obj, form, change)
+        if not change:
+            jobs.enqueue('run_export', {'export_id': obj.pk}, dedup_key=f'export:{obj.pk}')
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 class MyAdminSite(admin.AdminSite):
     site_header = 'ECourseApp'
     site_title = 'Quản trị viên'
     index_title = 'Chào mừng đến với trang quản lý'
 
+    def register(self, model_or_iterable, admin_class=None, **options):
+        admin_class = admin_class or admin.ModelAdmin
+        if not issubclass(admin_class, PerformanceAdminMixin):
+            admin_class = type(admin_class.__name__, (PerformanceAdminMixin, admin_class), {})
+        super().register(model_or_iterable, admin_class, **options)
+
     def get_urls(self):
-        return [path('stats-view/', self.admin_view(self.stats_view))] + super().get_urls()
+        return [path('stats-view/', self.admin_view(self.stats_view)),
+                path('profiles/', self.admin_view(self.profiles_view), name='profiles')] + super().get_urls()
 
     def stats_view(self, request):
         course_stats = Category.objects.annotate(
@@ -152,11 +236,39 @@ class MyAdminSite(admin.AdminSite):
             'total_revenue': total_revenue,
             'registration_trend': registration_trend,
             'course_enrollment_details': course_enrollment_details,
+            'trending_courses': leaderboards.top(CourseScore.Boards.TRENDING),
+            'top_rated_courses': leaderboards.top(CourseScore.Boards.TOP_RATED),
             'total_courses': Course.objects.count(),
             'total_students': Student.objects.count(),
         }
         return TemplateResponse(request, 'admin/stats.html', context)
 
+    def profiles_view(self, request):
+        hour_choices = [(1, '1 giờ'), (6, '6 giờ'), (24, '24 giờ'), (168, '7 ngày')]
+        try:
+            hours = int(request.GET.get('hours', 24))
+        except ValueError:
+            hours = 24
+        endpoint = request.GET.get('endpoint', '')
+        since = timezone.now() - timedelta(hours=hours)
+
+        if request.GET.get('format') == 'folded':
+            response = HttpResponse(profiling.folded(since, endpoint), content_type='text/plain; charset=utf-8')
+            response['Content-Disposition'] = f'attachment; filename="{get_valid_filename(endpoint or "all")}.folded"'
+            return response
+
+        windows = [{**w, 'avg_ms': 1000 * w['seconds'] / w['requests']} for w in profiling.windows(since)]
+        context = {
+            **self.each_context(request),
+            'title': 'Hồ sơ hiệu năng',
+            'hour_choices': hour_choices,
+            'hours': hours,
+            'endpoint': endpoint,
+            'windows': windows,
+            'functions': profiling.hottest(since, endpoint),
+        }
+        return TemplateResponse(request, 'admin/profiles.html', context)
+
 
 admin_site = MyAdminSite()
 
@@ -166,5 +278,6 @@ admin_site.register(Teacher, TeacherAdmin)
 admin_site.register(Student, StudentAdmin)
 admin_site.register(Lesson, LessonAdmin)
 admin_site.register(Tag)
-admin_site.register(Comment)
-admin_site.register(Enrollment, EnrollmentAdmin)
\ No newline at end of file
+admin_site.register(Comment, CommentAdmin)
+admin_site.register(Enrollment, EnrollmentAdmin)
+admin_site.register(ExportJob, ExportJobAdmin)
\ No newline at end of file
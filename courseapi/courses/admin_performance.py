@@ -0,0 +1,109 @@
+from functools import lru_cache
+
+from cloudinary import CloudinaryResource
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.utils import get_fields_from_path
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db import connections, models
+from django.utils.functional import cached_property
+
+from courses.caching import get_version
+
+
+def estimated_rows(model, using='default'):
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute("SELECT TABLE_ROWS FROM information_schema.TABLES "
+                           "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", [model._meta.db_table])
+        elif connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                           [model._meta.db_table])
+        else:
+            return None
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None and row[0] >= 0 else None
+
+
+class ApproximateCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, models.QuerySet) and not queryset.query.where and not queryset.query.distinct:
+            estimate = estimated_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate >= settings.ADMIN_EXACT_COUNT_LIMIT:
+                return estimate
+        return super().count
+
+
+def filter_cache_key(model, field_path, version_model):
+    return f'admin-filter:{model._meta.label_lower}:{field_path}:{get_version(version_model._meta.model_name)}'
+
+
+class CachedRelatedFieldListFilter(admin.RelatedFieldListFilter):
+    def field_choices(self, field, request, model_admin):
+        key = filter_cache_key(model_admin.model, self.field_path, field.remote_field.model)
+        return cache.get_or_set(key, lambda: list(super(CachedRelatedFieldListFilter, self)
+                                                  .field_choices(field, request, model_admin)),
+                                settings.ADMIN_FILTER_CACHE_TIMEOUT)
+
+
+class CachedAllValuesFieldListFilter(admin.AllValuesFieldListFilter):
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        key = filter_cache_key(model, field_path, field.model)
+        self.lookup_choices = cache.get_or_set(key, lambda: list(self.lookup_choices),
+                                               settings.ADMIN_FILTER_CACHE_TIMEOUT)
+
+
+def cached_filter(model, item):
+    if not isinstance(item, str):
+        return item
+
+    field = get_fields_from_path(model, item)[-1]
+    if field.is_relation:
+        return item, CachedRelatedFieldListFilter
+    if field.choices or isinstance(field, (models.BooleanField, models.DateField)):
+        return item
+    return item, CachedAllValuesFieldListFilter
+
+
+@lru_cache(maxsize=4096)
+def _thumbnail(public_id, format, version, type, resource_type, size):
+    resource = CloudinaryResource(public_id, format=format, version=version, type=type,
+                                  resource_type=resource_type)
+    return resource.build_url(width=size, height=size, crop='fill', quality='auto', fetch_format='auto')
+
+
+def thumbnail_url(resource, size):
+    if not resource:
+        return None
+    if isinstance(resource, str):
+        return resource
+    return _thumbnail(resource.public_id, resource.format, resource.version, resource.type,
+                      resource.resource_type, size)
+
+
+class PerformanceAdminMixin:
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+
+    def get_list_select_related(self, request):
+        if self.list_select_related is not False:
+            return self.list_select_related
+
+        related = []
+        for name in self.get_list_display(request):
+            try:
+                field = self.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.many_to_one or field.one_to_one:
+                related.append(name)
+        return tuple(related)
+
+    def get_list_filter(self, request):
+        return [cached_filter(self.model, item) for item in super().get_list_filter(request)]
@@ -0,0 +1,51 @@
+from datetime import timedelta
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+from courses.models import ArchivedComment, ArchivedLike, Comment, Like
+
+ARCHIVES = {
+    Comment: ArchivedComment,
+    Like: ArchivedLike,
+}
+
+
+def archive_fields(archive_model):
+    return [f.attname for f in archive_model._meta.concrete_fields if f.name != 'archived_date']
+
+
+def stale(model, days):
+    return model.objects.inactive().filter(updated_date__lt=timezone.now() - timedelta(days=days))
+
+
+def archive_batch(model, days, batch_size):
+    archive_model = ARCHIVES[model]
+    fields = archive_fields(archive_model)
+
+    with transaction.atomic():
+        rows = list(stale(model, days).select_for_update(skip_locked=True)
+                    .order_by('pk').values(*fields)[:batch_size])
+        if not rows:
+            return 0
+        archive_model.objects.bulk_create([archive_model(**row) for row in rows], ignore_conflicts=True)
+        delete_inactive(model, [row['id'] for row in rows])
+    return len(rows)
+
+
+def delete_inactive(model, ids):
+    connection = connections[model.objects.db]
+    table, pk, active = (connection.ops.quote_name(name) for name in
+                         (model._meta.db_table, model._meta.pk.column, model._meta.get_field('active').column))
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE {pk} IN ({placeholders}) AND {active} = %s", [*ids, False])
+
+
+def archive(model, days, batch_size=1000):
+    total = 0
+    while True:
+        moved = archive_batch(model, days, batch_size)
+        total += moved
+        if moved < batch_size:
+            return total
@@ -0,0 +1,212 @@
+import json
+import os
+import re
+import tempfile
+import zipfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from courses import rendering
+from courses.caching import get_version
+from courses.models import Lesson
+
+CONTENT_TYPE = 'application/zip'
+CHUNK_SIZE = 64 * 1024
+
+re_media = re.compile(r'<(?:img|iframe)\b[^>]*\bsrc="([^"]+)"', re.IGNORECASE)
+re_range = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def to_version(value):
+    return (value - EPOCH) // MICROSECOND if value else 0
+
+
+def course_version(course):
+    stats = Lesson.objects.filter(course=course).aggregate(updated=Max('updated_date'), total=Count('pk'))
+    version = max(to_version(stats['updated']), to_version(course.updated_date))
+    key = f"{version}-{stats['total']}-{get_version('tag')}-{rendering.RENDER_VERSION}"
+    return version, key
+
+
+def bundle_dir(course_id):
+    return os.path.join(settings.BUNDLES_ROOT, str(course_id))
+
+
+def media_urls(lesson, html):
+    urls = [lesson.video_url] if lesson.video_url else []
+    return urls + [url for url in re_media.findall(html) if url not in urls]
+
+
+def lesson_entry(lesson):
+    html = lesson.rendered.html if lesson.rendered_id else lesson.content
+    entry = {
+        'id': lesson.pk,
+        'subject': lesson.subject,
+        'position': lesson.position,
+        'excerpt': lesson.excerpt,
+        'reading_time': lesson.reading_time,
+        'updated_date': lesson.updated_date.isoformat(),
+        'tags': [{'id': tag.pk, 'name': tag.name} for tag in lesson.tags.all()],
+        'media': media_urls(lesson, html),
+        'file': f'lessons/{lesson.pk}.html',
+    }
+    return entry, html
+
+
+def write_bundle(fh, course, version, since=None):
+    lessons = course.lessons.order_by('position', 'id')
+    if since is not None:
+        lessons = lessons.filter(updated_date__gt=EPOCH + since * MICROSECOND)
+
+    manifest = {
+        'course': {'id': course.pk, 'name': course.name,
+                   'image': course.image.url if course.image and hasattr(course.image, 'url') else None,
+                   'video_url': course.video_url},
+        'version': version,
+        'since': since,
+        'generated_date': timezone.now().isoformat(),
+        'lesson_ids': list(course.lessons.active().order_by('position', 'id').values_list('id', flat=True)),
+        'removed': [],
+        'lessons': [],
+    }
+    with zipfile.ZipFile(fh, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for lesson in lessons.select_related('rendered').prefetch_related('tags').iterator(chunk_size=200):
+            if not lesson.active:
+                manifest['removed'].append(lesson.pk)
+                continue
+            entry, html = lesson_entry(lesson)
+            archive.writestr(entry['file'], html)
+            manifest['lessons'].append(entry)
+        archive.writestr('manifest.json', json.dumps(manifest, ensure_ascii=False, default=str))
+
+
+def snap_since(course, since, version):
+    if since >= version:
+        return version
+    latest = (Lesson.objects.filter(course=course, updated_date__lte=EPOCH + since * MICROSECOND)
+              .aggregate(latest=Max('updated_date'))['latest'])
+    return to_version(latest)
+
+
+def build(course, version, since, directory, path):
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            write_bundle(fh, course, version, since)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def get_bundle(course, since=None):
+    version, key = course_version(course)
+    if since is not None:
+        since = snap_since(course, since, version)
+    name = key if since is None else f'{key}-since-{since}'
+    directory = bundle_dir(course.pk)
+    path = os.path.join(directory, f'{name}.zip')
+
+    for attempt in range(2):
+        if not os.path.exists(path):
+            build(course, version, since, directory, path)
+            prune(directory, key)
+        try:
+            fh = open(path, 'rb')
+            break
+        except FileNotFoundError:
+            if attempt:
+                raise
+
+    return {'file': fh, 'version': version, 'etag': quote_etag(name)}
+
+
+def prune(directory, key):
+    deltas = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.endswith('.tmp'):
+            continue
+        if name.startswith(f'{key}-since-'):
+            deltas.append(path)
+        elif not name.startswith(f'{key}.'):
+            remove(path)
+
+    deltas.sort(key=lambda path: os.stat(path).st_mtime if os.path.exists(path) else 0, reverse=True)
+    for path in deltas[settings.BUNDLES_MAX_DELTAS:]:
+        remove(path)
+
+
+def remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def parse_range(header, size):
+    match = re_range.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if start:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    else:
+        start, end = max(0, size - int(end)), size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def read_range(fh, start, length):
+    with fh:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def ranged_response(request, fh, etag, filename):
+    size = os.fstat(fh.fileno()).st_size
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        fh.close()
+        response['ETag'] = etag
+        return response
+
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if request.headers.get('Range') and (not if_range or if_range == etag):
+        try:
+            byte_range = parse_range(request.headers['Range'], size)
+        except ValueError:
+            fh.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(fh, as_attachment=True, filename=filename, content_type=CONTENT_TYPE)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(read_range(fh, start, end - start + 1), status=206,
+                                         content_type=CONTENT_TYPE)
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,55 @@
+import time
+
+from django.core import checks
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+VERSION_KEY = 'version:{}'
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def get_versions(*names):
+    keys = {VERSION_KEY.format(name): name for name in names}
+    found = cache.get_many(keys.keys())
+
+    versions = {}
+    for key, name in keys.items():
+        version = found.get(key)
+        if version is None:
+            version = _now_ms()
+            if not cache.add(key, version, None):
+                version = cache.get(key, version)
+        versions[name] = version
+    return versions
+
+
+def get_version(name):
+    return get_versions(name)[name]
+
+
+def bump_version(*names):
+    now = _now_ms()
+    for name in names:
+        key = VERSION_KEY.format(name)
+        current = cache.get(key) or 0
+        cache.set(key, max(now, current + 1), None)
+
+
+def is_shared(alias=DEFAULT_CACHE_ALIAS):
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if is_shared():
+        return []
+    return [checks.Warning(
+        "CACHES['default'] chỉ tồn tại trong từng tiến trình nên phiên bản dữ liệu không được chia sẻ giữa các worker.",
+        hint="Dùng courses.telemetry.RedisCache khi chạy nhiều tiến trình; nếu không, snapshot danh mục/tag "
+             "ở các worker khác có thể chậm cập nhật, còn ETag/304 và quyền xem bài học sẽ bị tắt.",
+        id='courses.W001',
+    )]
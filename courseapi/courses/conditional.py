@@ -0,0 +1,65 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from courses.caching import get_versions, is_shared
+
+
+class ConditionalGetMixin:
+    etag_versions = ()
+    last_modified_field = 'updated_date'
+
+    def get_validator_queryset(self):
+        return self.filter_queryset(self.get_queryset())
+
+    def get_stamp(self, queryset):
+        aggregates = {'total': Count('pk')}
+        if self.last_modified_field:
+            aggregates['last_modified'] = Max(self.last_modified_field)
+        return queryset.order_by().aggregate(**aggregates)
+
+    def conditional_response(self, request, stamp, build, etag_versions=None):
+        if not is_shared():
+            return build()
+
+        user = request.user
+        versions = get_versions(*(self.etag_versions if etag_versions is None else etag_versions))
+
+        last_modified = stamp.get('last_modified')
+        timestamps = list(versions.values())
+        if last_modified:
+            timestamps.append(int(last_modified.timestamp() * 1000))
+        last_modified = max(timestamps) // 1000 if timestamps else None
+
+        parts = (request.get_full_path(), user.pk if user.is_authenticated else None,
+                 stamp.get('total'), stamp.get('last_modified'), sorted(versions.items()))
+        etag = quote_etag(hashlib.md5(repr(parts).encode()).hexdigest())
+
+        response = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = build()
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, self.get_stamp(self.get_validator_queryset()),
+                                         lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_retrieve(request, self.get_object())
+
+    def conditional_retrieve(self, request, instance):
+        stamp = {'total': 1}
+        if self.last_modified_field:
+            stamp['last_modified'] = getattr(instance, self.last_modified_field)
+        return self.conditional_response(request, stamp,
+                                         lambda: Response(self.get_serializer(instance).data))
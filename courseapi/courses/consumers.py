@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from oauth2_provider.models import get_access_token_model
+
+from courses import notifications
+from courses.models import Enrollment, Lesson
+
+
+class Connection:
+    def __init__(self, send, user, expires):
+        self.send = send
+        self.user = user
+        self.expires = expires
+        self.topics = set()
+        self.queue = asyncio.Queue(maxsize=getattr(settings, 'NOTIFICATIONS_QUEUE_SIZE', 100))
+
+    def push(self, message):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def reply(self, **data):
+        await self.send({'type': 'websocket.send', 'text': json.dumps(data)})
+
+    async def writer(self):
+        while True:
+            message = await self.queue.get()
+            await self.send({'type': 'websocket.send', 'text': message})
+
+
+def get_token(scope):
+    query = parse_qs(scope.get('query_string', b'').decode())
+    if query.get('access_token'):
+        return query['access_token'][0]
+    for name, value in scope.get('headers', ()):
+        if name == b'authorization' and value.lower().startswith(b'bearer '):
+            return value[7:].decode()
+    return None
+
+
+@sync_to_async
+def authenticate(token):
+    if not token:
+        return None
+    access_token = (get_access_token_model().objects.select_related('user')
+                    .filter(token_checksum=hashlib.sha256(token.encode()).hexdigest()).first())
+    if access_token and access_token.is_valid() and access_token.user and access_token.user.is_active:
+        return access_token
+    return None
+
+
+@sync_to_async
+def can_subscribe(user, topic):
+    kind, _, value = topic.partition(':')
+    if not value.isdigit():
+        return False
+    if user.is_staff:
+        return True
+    if kind == 'instructor':
+        return user.pk == int(value)
+    if kind == 'lesson':
+        lesson = Lesson.objects.active().filter(pk=value).values('course_id', 'course__instructor_id').first()
+        if not lesson:
+            return False
+        return (lesson['course__instructor_id'] == user.pk or
+                Enrollment.objects.active().filter(student_id=user.pk, course_id=lesson['course_id']).exists())
+    return False
+
+
+async def handle(connection, text):
+    try:
+        data = json.loads(text)
+        action, topic = data['action'], str(data['topic'])
+    except (ValueError, KeyError, TypeError):
+        return await connection.reply(error="Thông điệp không hợp lệ")
+
+    if action == 'subscribe':
+        if len(connection.topics) >= getattr(settings, 'NOTIFICATIONS_MAX_TOPICS', 50):
+            return await connection.reply(error="Đã vượt quá số kênh cho phép", topic=topic)
+        if not await can_subscribe(connection.user, topic):
+            return await connection.reply(error="Bạn không có quyền theo dõi kênh này", topic=topic)
+        connection.topics.add(topic)
+        notifications.hub.subscribe(connection, topic)
+        return await connection.reply(subscribed=topic)
+
+    if action == 'unsubscribe':
+        connection.topics.discard(topic)
+        notifications.hub.unsubscribe(connection, topic)
+        return await connection.reply(unsubscribed=topic)
+
+    return await connection.reply(error="Hành động không được hỗ trợ")
+
+
+async def websocket_application(scope, receive, send):
+    if scope['path'].rstrip('/') != '/ws/notifications':
+        await receive()
+        return await send({'type': 'websocket.close', 'code': 4404})
+
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+
+    access_token = await authenticate(get_token(scope))
+    if access_token is None:
+        return await send({'type': 'websocket.close', 'code': 4401})
+
+    notifications.start(asyncio.get_running_loop())
+    await send({'type': 'websocket.accept'})
+
+    connection = Connection(send, access_token.user, access_token.expires)
+    writer = asyncio.create_task(connection.writer())
+    try:
+        while True:
+            remaining = (connection.expires - timezone.now()).total_seconds()
+            if remaining <= 0:
+                await send({'type': 'websocket.close', 'code': 4401})
+                break
+            try:
+                event = await asyncio.wait_for(receive(), timeout=remaining)
+            except asyncio.TimeoutError:
+                continue
+            if event['type'] == 'websocket.disconnect':
+                break
+            if event.get('text'):
+                await handle(connection, event['text'])
+    finally:
+        notifications.hub.drop(connection)
+        writer.cancel()
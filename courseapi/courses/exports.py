@@ -0,0 +1,232 @@
+import csv
+import datetime
+import io
+import os
+import logging
+import tempfile
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.files import File
+from django.db.models import Count, DecimalField, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from courses import jobs
+from courses.models import Course, Enrollment, ExportJob, Job, Transaction
+
+logger = logging.getLogger(__name__)
+
+XLSX_PARTS = {
+    '[Content_Types].xml':
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>',
+    '_rels/.rels':
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>',
+    'xl/workbook.xml':
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Report" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>',
+    'xl/_rels/workbook.xml.rels':
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>',
+}
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return str(value)
+
+
+class CSVWriter:
+    extension = 'csv'
+    content_type = 'text/csv'
+
+    def __init__(self, fh):
+        self.stream = io.TextIOWrapper(fh, encoding='utf-8-sig', newline='')
+        self.writer = csv.writer(self.stream)
+
+    def writerow(self, row):
+        self.writer.writerow([_text(value) for value in row])
+
+    def close(self):
+        self.stream.flush()
+        self.stream.detach()
+
+
+class XLSXWriter:
+    extension = 'xlsx'
+    content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+    def __init__(self, fh):
+        self.zip = zipfile.ZipFile(fh, 'w', compression=zipfile.ZIP_DEFLATED)
+        for name, content in XLSX_PARTS.items():
+            self.zip.writestr(name, content)
+        self.sheet = io.TextIOWrapper(self.zip.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True),
+                                      encoding='utf-8')
+        self.sheet.write('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                         '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                         '<sheetData>')
+
+    @staticmethod
+    def cell(value):
+        if isinstance(value, bool):
+            return f'<c t="b"><v>{int(value)}</v></c>'
+        if isinstance(value, (int, float, Decimal)):
+            return f'<c><v>{value}</v></c>'
+        return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(_text(value))}</t></is></c>'
+
+    def writerow(self, row):
+        self.sheet.write('<row>' + ''.join(self.cell(value) for value in row) + '</row>')
+
+    def close(self):
+        self.sheet.write('</sheetData></worksheet>')
+        self.sheet.close()
+        self.zip.close()
+
+
+WRITERS = {
+    ExportJob.Formats.CSV: CSVWriter,
+    ExportJob.Formats.XLSX: XLSXWriter,
+}
+
+
+def _date_filter(export, prefix=''):
+    q = Q()
+    if export.date_from:
+        q &= Q(**{f'{prefix}created_date__date__gte': export.date_from})
+    if export.date_to:
+        q &= Q(**{f'{prefix}created_date__date__lte': export.date_to})
+    return q
+
+
+def transactions_report(export):
+    queryset = Transaction.objects.filter(_date_filter(export))
+    if export.instructor_id:
+        queryset = queryset.filter(enrollment__course__instructor_id=export.instructor_id)
+    if export.pay_method:
+        queryset = queryset.filter(pay_method=export.pay_method)
+
+    header = ('Mã giao dịch', 'Ngày tạo', 'Học viên', 'Khóa học', 'Giảng viên', 'Số tiền',
+              'Phương thức', 'Đã thanh toán')
+    rows = queryset.order_by('id').values_list(
+        'id', 'created_date', 'enrollment__student__username', 'enrollment__course__name',
+        'enrollment__course__instructor__username', 'amount', 'pay_method', 'status')
+    return header, queryset.count(), rows
+
+
+def enrollments_report(export):
+    queryset = Enrollment.objects.filter(_date_filter(export))
+    if export.instructor_id:
+        queryset = queryset.filter(course__instructor_id=export.instructor_id)
+    if export.pay_method:
+        queryset = queryset.filter(payment__pay_method=export.pay_method)
+
+    header = ('Mã đăng ký', 'Ngày đăng ký', 'Học viên', 'Khóa học', 'Giảng viên', 'Tiến độ (%)',
+              'Hoàn thành', 'Số tiền', 'Phương thức', 'Đã thanh toán')
+    rows = queryset.order_by('id').values_list(
+        'id', 'created_date', 'student__username', 'course__name', 'course__instructor__username',
+        'progress', 'is_completed', 'payment__amount', 'payment__pay_method', 'payment__status')
+    return header, queryset.count(), rows
+
+
+def revenue_report(export):
+    payments = Q(enrollments__payment__status=True) & _date_filter(export, 'enrollments__payment__')
+    if export.pay_method:
+        payments &= Q(enrollments__payment__pay_method=export.pay_method)
+
+    queryset = Course.objects.all()
+    if export.instructor_id:
+        queryset = queryset.filter(instructor_id=export.instructor_id)
+
+    header = ('Mã khóa học', 'Khóa học', 'Giảng viên', 'Số giao dịch', 'Doanh thu')
+    rows = queryset.order_by('id').annotate(
+        paid_count=Count('enrollments__payment', filter=payments),
+        revenue=Coalesce(Sum('enrollments__payment__amount', filter=payments), Decimal('0'),
+                         output_field=DecimalField(max_digits=12, decimal_places=2))
+    ).values_list('id', 'name', 'instructor__username', 'paid_count', 'revenue')
+    return header, queryset.count(), rows
+
+
+REPORTS = {
+    ExportJob.Reports.TRANSACTIONS: transactions_report,
+    ExportJob.Reports.ENROLLMENTS: enrollments_report,
+    ExportJob.Reports.REVENUE: revenue_report,
+}
+
+
+def write_export(export):
+    header, total, rows = REPORTS[export.report](export)
+    ExportJob.objects.filter(pk=export.pk).update(status=Job.Status.RUNNING, total_rows=total, processed_rows=0)
+
+    chunk_size = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+    writer_class = WRITERS[export.format]
+    os.makedirs(settings.EXPORTS_ROOT, exist_ok=True)
+
+    with tempfile.NamedTemporaryFile(dir=settings.EXPORTS_ROOT) as fh:
+        writer = writer_class(fh)
+        writer.writerow(header)
+        processed = 0
+        for row in rows.iterator(chunk_size=chunk_size):
+            writer.writerow(row)
+            processed += 1
+            if processed % chunk_size == 0:
+                ExportJob.objects.filter(pk=export.pk).update(processed_rows=processed)
+        writer.close()
+
+        fh.seek(0)
+        name = f'{export.report.lower()}_{export.pk}_{timezone.now():%Y%m%d%H%M%S}.{writer_class.extension}'
+        export.file.save(name, File(fh), save=False)
+
+    export.status = Job.Status.DONE
+    export.total_rows = export.processed_rows = processed
+    export.finished_date = timezone.now()
+    export.save(update_fields=['file', 'status', 'total_rows', 'processed_rows', 'finished_date'])
+    return export
+
+
+@jobs.task('run_export')
+def run_export(export_id):
+    export = ExportJob.objects.filter(pk=export_id).first()
+    if not export or export.status == Job.Status.DONE:
+        return
+    try:
+        write_export(export)
+    except Exception:
+        logger.exception("Xuất báo cáo #%s thất bại", export_id)
+        ExportJob.objects.filter(pk=export_id).update(status=Job.Status.FAILED,
+                                                      error="Không thể tạo tệp báo cáo. Vui lòng thử lại sau.",
+                                                      finished_date=timezone.now())
+        if jobs.enabled():
+            raise
+
+
+def content_type(export):
+    return WRITERS[export.format].content_type
@@ -0,0 +1,188 @@
+import threading
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Avg
+
+from courses.caching import get_versions
+from courses.models import Course, Rating
+
+INDEX_VERSIONS = ('course', 'rating', 'tag', 'category')
+LIST_FACETS = ('category', 'tag', 'instructor', 'duration')
+RATING_LEVELS = (1, 2, 3, 4, 5)
+PRICES = ('free', 'paid')
+
+
+class FacetIndex:
+    def __init__(self):
+        courses = list(Course.objects.active().order_by('-id')
+                       .values_list('id', 'category_id', 'category__name', 'instructor_id',
+                                    'instructor__first_name', 'instructor__last_name', 'fee', 'duration'))
+        self.ids = [c[0] for c in courses]
+        self.position = {course_id: i for i, course_id in enumerate(self.ids)}
+        self.all = (1 << len(self.ids)) - 1
+
+        self.postings = {facet: defaultdict(int) for facet in LIST_FACETS}
+        self.labels = {facet: {} for facet in LIST_FACETS}
+        for i, (_, category_id, category, instructor_id, first_name, last_name, fee, duration) in enumerate(courses):
+            bit = 1 << i
+            self.postings['category'][category_id] |= bit
+            self.labels['category'][category_id] = category
+            self.postings['instructor'][instructor_id] |= bit
+            self.labels['instructor'][instructor_id] = f'{first_name} {last_name}'.strip()
+            for name, (low, high) in settings.FACET_DURATION_BUCKETS.items():
+                if duration >= low and (high is None or duration <= high):
+                    self.postings['duration'][name] |= bit
+
+        for course_id, tag_id, tag in (Course.tags.through.objects
+                                       .filter(course_id__in=self.position, tag__active=True)
+                                       .values_list('course_id', 'tag_id', 'tag__name')):
+            self.postings['tag'][tag_id] |= 1 << self.position[course_id]
+            self.labels['tag'][tag_id] = tag
+
+        self.by_fee = sorted(range(len(courses)), key=lambda i: courses[i][6])
+        self.fees = [courses[i][6] for i in self.by_fee]
+        self.free = self.fee_range(None, Decimal('0'))
+        self.paid = self.all & ~self.free
+
+        ratings = dict(Rating.objects.filter(course_id__in=self.position).values('course_id')
+                       .annotate(avg=Avg('rate')).values_list('course_id', 'avg'))
+        self.min_rating = {level: 0 for level in RATING_LEVELS}
+        for course_id, avg in ratings.items():
+            for level in RATING_LEVELS:
+                if avg >= level:
+                    self.min_rating[level] |= 1 << self.position[course_id]
+
+    def fee_range(self, low=None, high=None):
+        start = 0 if low is None else bisect_left(self.fees, low)
+        end = len(self.fees) if high is None else bisect_right(self.fees, high)
+        if end <= start:
+            return 0
+        bits = bytearray((len(self.ids) + 7) // 8)
+        for i in self.by_fee[start:end]:
+            bits[i >> 3] |= 1 << (i & 7)
+        return int.from_bytes(bits, 'little')
+
+    def union(self, facet, values):
+        bits = 0
+        for value in values:
+            bits |= self.postings[facet].get(value, 0)
+        return bits
+
+    def encode(self, ids):
+        bits = 0
+        for course_id in ids:
+            if course_id in self.position:
+                bits |= 1 << self.position[course_id]
+        return bits
+
+    def decode(self, bits):
+        ids = []
+        while bits:
+            low = bits & -bits
+            ids.append(self.ids[low.bit_length() - 1])
+            bits ^= low
+        return ids
+
+    def search(self, selected, fee_min=None, fee_max=None, price=None, min_rating=None, restrict=None):
+        filters = {facet: self.union(facet, values) for facet, values in selected.items() if values}
+
+        common = self.all if restrict is None else restrict
+        if fee_min is not None or fee_max is not None:
+            common &= self.fee_range(fee_min, fee_max)
+        if price == 'free':
+            common &= self.free
+        elif price == 'paid':
+            common &= self.paid
+
+        base = common
+        for bits in filters.values():
+            base &= bits
+        if min_rating:
+            base &= self.min_rating[min_rating]
+
+        facets = {}
+        for facet in LIST_FACETS:
+            others = common
+            for name, bits in filters.items():
+                if name != facet:
+                    others &= bits
+            if min_rating:
+                others &= self.min_rating[min_rating]
+            facets[facet] = [
+                {'id': value, 'name': self.labels[facet].get(value, value), 'count': (others & bits).bit_count()}
+                for value, bits in self.postings[facet].items() if others & bits
+            ]
+
+        rating_base = common
+        for bits in filters.values():
+            rating_base &= bits
+        facets['min_rating'] = [{'id': level, 'count': (rating_base & self.min_rating[level]).bit_count()}
+                                for level in RATING_LEVELS]
+        facets['price'] = [{'id': 'free', 'count': (base & self.free).bit_count()},
+                           {'id': 'paid', 'count': (base & self.paid).bit_count()}]
+
+        return self.decode(base), facets
+
+
+_lock = threading.Lock()
+_index = {'versions': None, 'index': None}
+
+
+def get_index():
+    versions = get_versions(*INDEX_VERSIONS)
+    if _index['versions'] != versions:
+        with _lock:
+            if _index['versions'] != versions:
+                _index['index'] = FacetIndex()
+                _index['versions'] = versions
+    return _index['index']
+
+
+def _values(params, name, cast=int):
+    values = []
+    for raw in params.getlist(name):
+        for item in raw.split(','):
+            item = item.strip()
+            if item:
+                values.append(cast(item))
+    return values
+
+
+def _fee(raw):
+    if not raw:
+        return None
+    fee = Decimal(raw)
+    if not fee.is_finite():
+        raise ValueError(raw)
+    return fee
+
+
+def parse_params(params):
+    try:
+        selected = {
+            'category': _values(params, 'category_id'),
+            'tag': _values(params, 'tag_id'),
+            'instructor': _values(params, 'instructor_id'),
+            'duration': _values(params, 'duration', str),
+        }
+        fee_min = _fee(params.get('fee_min'))
+        fee_max = _fee(params.get('fee_max'))
+        min_rating = int(params['min_rating']) if params.get('min_rating') else None
+    except (ValueError, InvalidOperation):
+        raise ValueError("Tham số lọc không hợp lệ")
+
+    if min_rating is not None and min_rating not in RATING_LEVELS:
+        raise ValueError("min_rating phải từ 1 đến 5")
+    if params.get('price') and params['price'] not in PRICES:
+        raise ValueError("price phải là free hoặc paid")
+
+    return {
+        'selected': selected,
+        'fee_min': fee_min,
+        'fee_max': fee_max,
+        'price': params.get('price') or None,
+        'min_rating': min_rating,
+    }
@@ -0,0 +1,153 @@
+import atexit
+import threading
+import time
+
+import django
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class ConfigurablePBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', hashers.PBKDF2PasswordHasher.iterations)
+
+
+class HashingBusy(Exception):
+    pass
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+
+    def entry(self, operation):
+        return self.data.setdefault(operation, {'count': 0, 'rejected': 0, 'wait_seconds': 0.0,
+                                                'run_seconds': 0.0, 'max_seconds': 0.0})
+
+    def record(self, operation, total, run):
+        with self.lock:
+            entry = self.entry(operation)
+            entry['count'] += 1
+            entry['wait_seconds'] += max(0.0, total - run)
+            entry['run_seconds'] += run
+            entry['max_seconds'] = max(entry['max_seconds'], total)
+
+    def reject(self, operation):
+        with self.lock:
+            self.entry(operation)['rejected'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {operation: {**entry, 'avg_seconds': (entry['wait_seconds'] + entry['run_seconds'])
+                                / entry['count'] if entry['count'] else 0.0}
+                    for operation, entry in self.data.items()}
+
+    def reset(self):
+        with self.lock:
+            self.data = {}
+
+
+metrics = Metrics()
+
+
+def _encode(password):
+    started = time.perf_counter()
+    return hashers.make_password(password), time.perf_counter() - started
+
+
+def _verify(password, encoded):
+    started = time.perf_counter()
+    try:
+        hasher = hashers.identify_hasher(encoded)
+    except ValueError:
+        return (False, False), time.perf_counter() - started
+
+    preferred = hashers.get_hasher('default')
+    is_correct = hasher.verify(password, encoded)
+    must_update = hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+    return (is_correct, must_update), time.perf_counter() - started
+
+
+_pool = {}
+_pool_lock = threading.Lock()
+
+
+def start_executor(workers):
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    atexit.register(shutdown)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=django.setup)
+
+
+def get_pool():
+    if 'slots' not in _pool:
+        with _pool_lock:
+            if 'slots' not in _pool:
+                workers = settings.PASSWORD_HASH_WORKERS
+                _pool['executor'] = start_executor(workers) if workers else None
+                _pool['slots'] = threading.BoundedSemaphore(workers + settings.PASSWORD_HASH_MAX_PENDING)
+    return _pool
+
+
+def shutdown():
+    with _pool_lock:
+        executor = _pool.pop('executor', None)
+        _pool.clear()
+    if executor is not None:
+        executor.shutdown(cancel_futures=True)
+
+
+def run(operation, func, *args):
+    pool = get_pool()
+    executor, slots = pool['executor'], pool['slots']
+    started = time.perf_counter()
+    if executor is None:
+        result, elapsed = func(*args)
+        metrics.record(operation, time.perf_counter() - started, elapsed)
+        return result
+
+    from concurrent.futures.process import BrokenProcessPool
+
+    if not slots.acquire(timeout=settings.PASSWORD_HASH_WAIT_SECONDS):
+        metrics.reject(operation)
+        raise HashingBusy("Hệ thống đang bận xác thực, vui lòng thử lại sau.")
+    try:
+        result, elapsed = executor.submit(func, *args).result()
+    except BrokenProcessPool:
+        shutdown()
+        result, elapsed = func(*args)
+    finally:
+        slots.release()
+
+    metrics.record(operation, time.perf_counter() - started, elapsed)
+    return result
+
+
+def make_password(password):
+    if password is None:
+        return hashers.make_password(None)
+    return run('hash', _encode, password)
+
+
+def make_passwords(passwords):
+    if len(passwords) < 2 or get_pool()['executor'] is None:
+        return [make_password(password) for password in passwords]
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS) as threads:
+        return list(threads.map(make_password, passwords))
+
+
+def check_password(password, encoded, setter=None):
+    if password is None or not hashers.is_password_usable(encoded):
+        return False
+
+    is_correct, must_update = run('verify', _verify, password, encoded)
+    if setter and is_correct and must_update:
+        setter(password)
+    return is_correct
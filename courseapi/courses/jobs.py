@@ -0,0 +1,123 @@
+import logging
+import random
+import threading
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from courses.models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def enabled():
+    return getattr(settings, 'JOBS_ENABLED', False)
+
+
+def task(name):
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, dedup_key=None, delay=0):
+    payload = payload or {}
+    if not enabled():
+        _registry[name](**payload)
+        return None
+
+    job = Job(name=name, payload=payload, dedup_key=dedup_key,
+              max_attempts=getattr(settings, 'JOBS_MAX_ATTEMPTS', 5),
+              run_at=timezone.now() + timedelta(seconds=delay))
+    if dedup_key is None:
+        job.save()
+        return job
+
+    try:
+        with transaction.atomic():
+            job.save()
+        return job
+    except IntegrityError:
+        return Job.objects.filter(dedup_key=dedup_key).first()
+
+
+def replace_pending(dedup_key, payload):
+    with transaction.atomic():
+        job = Job.objects.select_for_update().filter(dedup_key=dedup_key, status=Job.Status.PENDING).first()
+        if job is None:
+            return None
+        previous, job.payload = job.payload, payload
+        job.save(update_fields=['payload', 'updated_date'])
+    return previous
+
+
+def claim(limit):
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(Job.objects.select_for_update(skip_locked=True)
+                   .filter(status=Job.Status.PENDING, run_at__lte=now)
+                   .order_by('run_at').values_list('id', flat=True)[:limit])
+        Job.objects.filter(id__in=ids).update(status=Job.Status.RUNNING, locked_at=now, dedup_key=None,
+                                              attempts=F('attempts') + 1)
+    return list(Job.objects.filter(id__in=ids))
+
+
+def execute(job):
+    close_old_connections()
+    try:
+        func = _registry[job.name]
+        func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Job %s thất bại (lần %s): %s", job, job.attempts, error)
+        if job.attempts < job.max_attempts:
+            base = getattr(settings, 'JOBS_RETRY_BASE_SECONDS', 5)
+            backoff = base * 2 ** (job.attempts - 1) * (1 + random.random() / 2)
+            Job.objects.filter(pk=job.pk).update(status=Job.Status.PENDING, last_error=error, locked_at=None,
+                                                 run_at=timezone.now() + timedelta(seconds=backoff))
+        else:
+            Job.objects.filter(pk=job.pk).update(status=Job.Status.FAILED, last_error=error)
+    else:
+        Job.objects.filter(pk=job.pk).update(status=Job.Status.DONE, last_error='')
+    finally:
+        close_old_connections()
+
+
+def requeue_stale():
+    timeout = getattr(settings, 'JOBS_STALE_SECONDS', 600)
+    return Job.objects.filter(status=Job.Status.RUNNING,
+                              locked_at__lt=timezone.now() - timedelta(seconds=timeout)
+                              ).update(status=Job.Status.PENDING, locked_at=None)
+
+
+def run_worker(concurrency=4, poll_interval=1.0, once=False, stop_event=None):
+    stop_event = stop_event or threading.Event()
+    processed = 0
+    futures = set()
+
+    requeue_stale()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='job-worker') as pool:
+        while not stop_event.is_set():
+            futures = {f for f in futures if not f.done()}
+            free = concurrency - len(futures)
+            jobs = claim(free) if free else []
+            futures.update(pool.submit(execute, job) for job in jobs)
+            processed += len(jobs)
+
+            if jobs:
+                continue
+            if futures:
+                wait(futures, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            elif once:
+                break
+            else:
+                stop_event.wait(poll_interval)
+    return processed
@@ -0,0 +1,163 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from courses.models import Course, CourseScore, Enrollment, Leaderboard, Like, Rating
+
+TRENDING = CourseScore.Boards.TRENDING
+TOP_RATED = CourseScore.Boards.TOP_RATED
+
+
+def half_life():
+    return getattr(settings, 'LEADERBOARD_HALF_LIFE_DAYS', 7) * 86400
+
+
+def get_epoch(board):
+    return Leaderboard.objects.get_or_create(board=board, defaults={'epoch': timezone.now()})[0].epoch
+
+
+def lock_board(board):
+    return Leaderboard.objects.select_for_update().get_or_create(board=board, defaults={'epoch': timezone.now()})[0]
+
+
+def growth(board, when, epoch=None):
+    epoch = epoch or get_epoch(board)
+    return 2 ** ((when - epoch).total_seconds() / half_life())
+
+
+def decayed(score, board, now=None, epoch=None):
+    return score / growth(board, now or timezone.now(), epoch)
+
+
+def course_scopes(course):
+    tag_ids = Course.tags.through.objects.filter(course_id=course.pk).values_list('tag_id', flat=True)
+    return ['global', f'category:{course.category_id}', *(f'tag:{tag_id}' for tag_id in tag_ids)]
+
+
+def scope_for(category_id=None, tag_id=None):
+    if category_id:
+        return f'category:{category_id}'
+    if tag_id:
+        return f'tag:{tag_id}'
+    return 'global'
+
+
+def record(course, weights, when=None):
+    when = when or timezone.now()
+    scopes = course_scopes(course)
+
+    for board, weight in weights.items():
+        if not weight:
+            continue
+        with transaction.atomic():
+            increment = weight * growth(board, when, lock_board(board).epoch)
+            for scope in scopes:
+                rows = CourseScore.objects.filter(board=board, scope=scope, course_id=course.pk)
+                if rows.update(score=F('score') + increment):
+                    continue
+                try:
+                    with transaction.atomic():
+                        CourseScore.objects.create(board=board, scope=scope, course_id=course.pk, score=increment)
+                except IntegrityError:
+                    rows.update(score=F('score') + increment)
+
+
+def top(board, scope='global', limit=10):
+    epoch = get_epoch(board)
+    now = timezone.now()
+    scores = (CourseScore.objects.filter(board=board, scope=scope, course__active=True)
+              .select_related('course').order_by('-score')[:limit])
+    return [{'course': s.course, 'score': decayed(s.score, board, now, epoch)} for s in scores]
+
+
+@transaction.atomic
+def compact(board, min_score=None):
+    min_score = getattr(settings, 'LEADERBOARD_MIN_SCORE', 0.01) if min_score is None else min_score
+    leaderboard = lock_board(board)
+    now = timezone.now()
+    factor = 1 / growth(board, now, leaderboard.epoch)
+
+    CourseScore.objects.filter(board=board).update(score=F('score') * factor)
+    removed, _ = CourseScore.objects.filter(board=board, score__gt=-min_score, score__lt=min_score).delete()
+
+    leaderboard.epoch = now
+    leaderboard.save(update_fields=['epoch'])
+    return removed
+
+
+@transaction.atomic
+def rebuild():
+    now = timezone.now()
+    CourseScore.objects.all().delete()
+    Leaderboard.objects.all().delete()
+    epochs = {board: Leaderboard.objects.create(board=board, epoch=now).epoch for board in CourseScore.Boards.values}
+
+    scopes = {pk: ['global', f'category:{category_id}']
+              for pk, category_id in Course.objects.values_list('id', 'category_id')}
+    for course_id, tag_id in Course.tags.through.objects.values_list('course_id', 'tag_id'):
+        scopes[course_id].append(f'tag:{tag_id}')
+    totals = defaultdict(float)
+
+    def add(course_id, when, weights):
+        for board, weight in weights.items():
+            for scope in scopes.get(course_id, ()):
+                totals[(board, scope, course_id)] += weight * growth(board, when, epochs[board])
+
+    for course_id, when in Enrollment.objects.values_list('course_id', 'created_date').iterator():
+        add(course_id, when, event_weights('enrollment'))
+    for course_id, when in Like.objects.active().values_list('course_id', 'updated_date').iterator():
+        add(course_id, when, event_weights('like'))
+    for course_id, when, rate in Rating.objects.values_list('course_id', 'updated_date', 'rate').iterator():
+        add(course_id, when, event_weights('rating', rate))
+
+    CourseScore.objects.bulk_create(
+        [CourseScore(board=board, scope=scope, course_id=course_id, score=score)
+         for (board, scope, course_id), score in totals.items()],
+        batch_size=1000
+    )
+    return len(totals)
+
+
+def event_weights(event, rate=None):
+    if event == 'enrollment':
+        return {TRENDING: 3}
+    if event == 'like':
+        return {TRENDING: 1}
+    return {TRENDING: 1, TOP_RATED: rate - 3}
+
+
+@receiver(post_save, sender=Enrollment)
+def score_enrollment(sender, instance, created, **kwargs):
+    if created:
+        record(instance.course, event_weights('enrollment'))
+
+
+def negate(weights):
+    return {board: -weight for board, weight in weights.items()}
+
+
+@receiver(post_save, sender=Like)
+def score_like(sender, instance, created, **kwargs):
+    loaded = {} if created else getattr(instance, '_loaded', {})
+    was_active = False if created else loaded.get('active', instance.active)
+    if instance.active and not was_active:
+        record(instance.course, event_weights('like'))
+    elif was_active and not instance.active:
+        record(instance.course, negate(event_weights('like')), loaded.get('updated_date'))
+    instance.remember_state()
+
+
+@receiver(post_save, sender=Rating)
+def score_rating(sender, instance, created, **kwargs):
+    loaded = {} if created else getattr(instance, '_loaded', {})
+    previous = None if created else loaded.get('rate', instance.rate)
+    if previous != instance.rate:
+        if previous is not None:
+            record(instance.course, negate(event_weights('rating', previous)), loaded.get('updated_date'))
+        record(instance.course, event_weights('rating', instance.rate))
+    instance.remember_state()
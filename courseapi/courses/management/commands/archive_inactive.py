@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from courses import archiving
+
+
+class Command(BaseCommand):
+    help = "Chuyển các bản ghi đã ẩn lâu ngày sang bảng lưu trữ để giữ bảng chính gọn nhẹ"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        for model in archiving.ARCHIVES:
+            name = model._meta.verbose_name_plural
+            if options['dry_run']:
+                count = archiving.stale(model, options['days']).count()
+                self.stdout.write(f"{name}: {count} bản ghi sẽ được lưu trữ")
+                continue
+
+            moved = archiving.archive(model, options['days'], options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"{name}: đã lưu trữ {moved} bản ghi"))
@@ -0,0 +1,88 @@
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from courses import hashing
+
+
+class Command(BaseCommand):
+    help = "Đo thông lượng đăng nhập (băm/kiểm tra mật khẩu) khi có nhiều yêu cầu đồng thời"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help="Endpoint lấy token, ví dụ http://127.0.0.1:8000/o/token/. "
+                                          "Bỏ trống để đo trực tiếp pool băm trong tiến trình")
+        parser.add_argument('--username')
+        parser.add_argument('--password', default='123456')
+        parser.add_argument('--client-id')
+        parser.add_argument('--client-secret')
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--requests', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['url']:
+            if not (options['username'] and options['client_id']):
+                raise CommandError("Cần --username và --client-id khi đo qua HTTP")
+            login = self.http_login(options)
+        else:
+            login = self.local_login(options)
+
+        latencies, outcomes = [], Counter()
+        lock = threading.Lock()
+
+        def attempt(_):
+            started = time.perf_counter()
+            try:
+                outcome = login()
+            except hashing.HashingBusy:
+                outcome = 'busy'
+            except requests.RequestException as e:
+                outcome = type(e).__name__
+            with lock:
+                latencies.append(time.perf_counter() - started)
+                outcomes[outcome] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            list(pool.map(attempt, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f"{options['requests']} lượt đăng nhập, {options['concurrency']} luồng đồng thời: "
+                          f"{elapsed:.2f}s ({options['requests'] / elapsed:.1f} lượt/s)")
+        self.stdout.write(f"Kết quả: {dict(outcomes)}")
+        if len(latencies) > 1:
+            cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+            self.stdout.write("Độ trễ (ms): p50={:.1f} p95={:.1f} p99={:.1f} max={:.1f}".format(
+                cuts[49] * 1000, cuts[94] * 1000, cuts[98] * 1000, max(latencies) * 1000))
+        for operation, entry in hashing.metrics.snapshot().items():
+            self.stdout.write(f"{operation}: {entry['count']} lần, chờ TB "
+                              f"{entry['wait_seconds'] / max(entry['count'], 1) * 1000:.1f}ms, "
+                              f"băm TB {entry['run_seconds'] / max(entry['count'], 1) * 1000:.1f}ms, "
+                              f"từ chối {entry['rejected']}")
+
+    def http_login(self, options):
+        session_data = {
+            'grant_type': 'password',
+            'username': options['username'],
+            'password': options['password'],
+            'client_id': options['client_id'],
+            'client_secret': options['client_secret'] or '',
+        }
+
+        def login():
+            return requests.post(options['url'], data=session_data, timeout=60).status_code
+
+        return login
+
+    def local_login(self, options):
+        encoded = hashing.make_password(options['password'])
+        hashing.metrics.reset()
+
+        def login():
+            return 'ok' if hashing.check_password(options['password'], encoded) else 'sai mật khẩu'
+
+        return login
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Tính bảng khóa học tương tự (top-K) từ lượt đăng ký, tag, danh mục và đánh giá"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            from courses import recommendations
+            start = time.monotonic()
+            neighbors = recommendations.build_similarity(top_k=options['top_k'])
+        except ImportError as e:
+            raise CommandError(f"Cần cài numpy và scipy để tính gợi ý: {e}")
+
+        recommendations.store_neighbors(neighbors)
+        total = sum(len(items) for items in neighbors.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã lưu {total} cặp gợi ý cho {len(neighbors)} khóa học trong {time.monotonic() - start:.2f}s"))
@@ -0,0 +1,28 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from courses import schema
+
+
+class Command(BaseCommand):
+    help = "Sinh sẵn tài liệu OpenAPI thành tệp tĩnh để phục vụ kèm ETag"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formats', nargs='+', choices=list(schema.CONTENT_TYPES),
+                            default=list(schema.CONTENT_TYPES))
+
+    def handle(self, *args, **options):
+        os.makedirs(settings.SCHEMA_ROOT, exist_ok=True)
+        for format in options['formats']:
+            started = time.perf_counter()
+            content = schema.generate(format)
+            path = schema.schema_path(format)
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+            self.stdout.write(self.style.SUCCESS(f"{path}: {len(content)} bytes, "
+                                                 f"sinh trong {time.perf_counter() - started:.2f}s"))
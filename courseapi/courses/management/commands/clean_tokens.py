@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from courses import tokens
+
+
+class Command(BaseCommand):
+    help = "Dọn các token OAuth2 đã hết hạn hoặc bị thu hồi theo từng lô nhỏ"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--pause', type=float, help="Số giây nghỉ giữa các lô")
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        report = tokens.clear_expired(batch_size=options['batch_size'], pause=options['pause'],
+                                      dry_run=options['dry_run'])
+        verb = "sẽ xoá" if options['dry_run'] else "đã xoá"
+        for row in report:
+            self.stdout.write(f"{row['table']}: {row['before']} -> {row['after']} bản ghi, {verb} {row['deleted']} "
+                              f"trong {row['seconds']:.2f}s ({row['rate']:.0f} bản ghi/s)")
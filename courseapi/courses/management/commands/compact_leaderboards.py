@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from courses import leaderboards
+from courses.models import CourseScore
+
+
+class Command(BaseCommand):
+    help = "Dời mốc thời gian, thu gọn điểm xếp hạng khóa học (hoặc tính lại từ đầu với --rebuild)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true')
+        parser.add_argument('--min-score', type=float, default=None)
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            total = leaderboards.rebuild()
+            self.stdout.write(self.style.SUCCESS(f"Đã tính lại {total} điểm xếp hạng"))
+            return
+
+        for board in CourseScore.Boards.values:
+            removed = leaderboards.compact(board, options['min_score'])
+            self.stdout.write(self.style.SUCCESS(f"{board}: đã thu gọn, xóa {removed} dòng điểm thấp"))
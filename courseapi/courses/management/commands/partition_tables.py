@@ -0,0 +1,36 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from courses import partitioning
+
+
+class Command(BaseCommand):
+    help = "Tạo trước và xoay vòng phân vùng theo tháng (created_date) cho các bảng tương tác trên MySQL"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, default=settings.PARTITION_MONTHS_AHEAD)
+        parser.add_argument('--retain-months', type=int, default=None)
+        parser.add_argument('--models', nargs='*', default=None)
+        parser.add_argument('--apply', action='store_true')
+
+    def handle(self, *args, **options):
+        models = ([apps.get_model(label) for label in options['models']] if options['models']
+                  else partitioning.partitioned_models())
+
+        for model in models:
+            table = model._meta.db_table
+            found = partitioning.blockers(model)
+            if found:
+                self.stdout.write(self.style.WARNING(f"{table}: bỏ qua — " + "; ".join(found)))
+                continue
+
+            statements = partitioning.plan(model, options['ahead'], options['retain_months'])
+            if not statements:
+                self.stdout.write(f"{table}: phân vùng đã đủ")
+                continue
+            for sql in statements:
+                self.stdout.write(sql)
+            if options['apply']:
+                partitioning.apply(model, statements)
+                self.stdout.write(self.style.SUCCESS(f"{table}: đã áp dụng {len(statements)} câu lệnh"))
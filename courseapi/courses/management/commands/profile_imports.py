@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+TARGETS = {
+    'wsgi': "import courseapi.wsgi; import {urlconf}",
+    'asgi': "import courseapi.asgi; import {urlconf}",
+    'setup': "import django; django.setup()",
+}
+
+
+def parse_importtime(output):
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if self_us.strip().isdigit():
+            modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+class Command(BaseCommand):
+    help = "Đo thời gian import khi khởi động tiến trình (WSGI/ASGI/manage.py) và liệt kê các gói tốn thời gian nhất"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=list(TARGETS), default='wsgi')
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument('--runs', type=int, default=3)
+
+    def handle(self, *args, **options):
+        code = TARGETS[options['target']].format(urlconf=settings.ROOT_URLCONF)
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'courseapi.settings')}
+
+        wall, output = [], ''
+        for _ in range(options['runs']):
+            started = time.perf_counter()
+            result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], env=env,
+                                    capture_output=True, text=True, cwd=settings.BASE_DIR)
+            wall.append(time.perf_counter() - started)
+            if result.returncode:
+                raise CommandError(result.stderr[-2000:])
+            output = result.stderr
+
+        packages = defaultdict(int)
+        total = 0
+        for name, self_us, _ in parse_importtime(output):
+            packages[name.split('.')[0]] += self_us
+            total += self_us
+
+        self.stdout.write(f"Khởi động '{options['target']}': tốt nhất {min(wall) * 1000:.0f}ms, "
+                          f"trung bình {sum(wall) / len(wall) * 1000:.0f}ms qua {len(wall)} lần; "
+                          f"tổng thời gian import {total / 1000:.0f}ms")
+        for name, spent in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"{spent / 1000:8.1f}ms  {spent / total * 100:5.1f}%  {name}")
@@ -0,0 +1,30 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from courses import provisioning
+
+
+class Command(BaseCommand):
+    help = "Tạo hàng loạt tài khoản sinh viên/giảng viên từ tệp danh sách CSV hoặc JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('roster')
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--report', help="Đường dẫn ghi báo cáo kết quả từng dòng (JSON)")
+
+    def handle(self, *args, **options):
+        with open(options['roster'], 'rb') as roster:
+            report = provisioning.provision(provisioning.read_roster(roster), batch_size=options['batch_size'])
+
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+
+        for result in report['results']:
+            if result['status'] == 'failed':
+                self.stderr.write(f"Dòng {result['row']} ({result['username']}): {json.dumps(result['errors'], ensure_ascii=False)}")
+        self.stdout.write(self.style.SUCCESS(f"Đã tạo {report['created']}/{report['total']} tài khoản, "
+                                             f"lỗi {report['failed']}"))
+        if 'error' in report:
+            self.stderr.write(report['error'])
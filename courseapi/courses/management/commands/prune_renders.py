@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from courses.models import LessonRender
+
+
+class Command(BaseCommand):
+    help = "Xoá các bản HTML đã render không còn bài học nào tham chiếu"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=settings.LESSON_RENDER_PRUNE_HOURS,
+                            help="Chỉ xoá bản render cũ hơn số giờ này")
+
+    def handle(self, *args, **options):
+        deleted = LessonRender.prune(options['hours'])
+        self.stdout.write(self.style.SUCCESS(f"Đã xoá {deleted} bản render không dùng"))
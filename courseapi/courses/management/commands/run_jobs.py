@@ -0,0 +1,25 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from courses import jobs
+
+
+class Command(BaseCommand):
+    help = "Chạy các worker xử lý hàng đợi công việc nền"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--poll', type=float, default=1.0)
+        parser.add_argument('--once', action='store_true')
+
+    def handle(self, *args, **options):
+        stop_event = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop_event.set())
+
+        self.stdout.write(f"Đang chạy {options['concurrency']} worker...")
+        processed = jobs.run_worker(concurrency=options['concurrency'], poll_interval=options['poll'],
+                                    once=options['once'], stop_event=stop_event)
+        self.stdout.write(self.style.SUCCESS(f"Đã xử lý {processed} công việc"))
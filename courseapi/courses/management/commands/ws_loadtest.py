@@ -0,0 +1,139 @@
+import asyncio
+import json
+import resource
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from websockets.asyncio.client import connect
+
+from courses import notifications
+
+
+def rss_kb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+def percentile(values, p):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class Command(BaseCommand):
+    help = "Kiểm thử tải kênh thông báo WebSocket với nhiều kết nối nhàn rỗi đồng thời"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='ws://127.0.0.1:8000/ws/notifications/')
+        parser.add_argument('--token', required=True)
+        parser.add_argument('--topic', required=True)
+        parser.add_argument('--connections', type=int, default=5000)
+        parser.add_argument('--batch', type=int, default=200)
+        parser.add_argument('--hold', type=float, default=30.0)
+        parser.add_argument('--publish', type=int, default=0)
+        parser.add_argument('--server-pid', type=int)
+
+    def handle(self, *args, **options):
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < options['connections'] + 100:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+            if hard < options['connections'] + 100:
+                raise CommandError(f"Giới hạn file descriptor ({hard}) quá thấp cho {options['connections']} kết nối")
+
+        if options['publish'] and not isinstance(notifications.get_backend(), notifications.UnixSocketBackend):
+            self.stderr.write("Cảnh báo: backend hiện tại chỉ phát trong tiến trình này, "
+                              "server sẽ không nhận được thông điệp --publish")
+
+        result = asyncio.run(self.run(options))
+        self.report(result, options)
+
+    async def run(self, options):
+        url = f"{options['url']}?access_token={options['token']}"
+        connect_times, latencies, failures = [], [], []
+        received = {'count': 0}
+        sockets = []
+        before = rss_kb(options['server_pid']) if options['server_pid'] else None
+
+        async def open_one():
+            started = time.perf_counter()
+            try:
+                ws = await connect(url, open_timeout=30, ping_interval=None, compression=None)
+                await ws.send(json.dumps({'action': 'subscribe', 'topic': options['topic']}))
+                ack = json.loads(await ws.recv())
+                if 'subscribed' not in ack:
+                    await ws.close()
+                    failures.append(ack.get('error', 'subscribe'))
+                    return
+            except Exception as e:
+                failures.append(type(e).__name__)
+                return
+            connect_times.append(time.perf_counter() - started)
+            sockets.append(ws)
+
+        async def listen(ws):
+            try:
+                async for message in ws:
+                    data = json.loads(message).get('data', {})
+                    if 'sent_at' in data:
+                        latencies.append(time.time() - data['sent_at'])
+                        received['count'] += 1
+            except Exception:
+                pass
+
+        started = time.perf_counter()
+        for i in range(0, options['connections'], options['batch']):
+            await asyncio.gather(*(open_one() for _ in range(min(options['batch'],
+                                                                 options['connections'] - i))))
+        ramp = time.perf_counter() - started
+        listeners = [asyncio.create_task(listen(ws)) for ws in sockets]
+        idle = rss_kb(options['server_pid']) if options['server_pid'] else None
+
+        backend = notifications.get_backend()
+        for _ in range(options['publish']):
+            message = notifications.encode(options['topic'], 'loadtest', {'sent_at': time.time()})
+            backend.publish(options['topic'], message)
+            await asyncio.sleep(options['hold'] / max(options['publish'], 1))
+        await asyncio.sleep(options['hold'] if not options['publish'] else 1)
+
+        alive = sum(1 for ws in sockets if ws.close_code is None)
+        await asyncio.gather(*(ws.close() for ws in sockets), return_exceptions=True)
+        for task in listeners:
+            task.cancel()
+
+        return {
+            'opened': len(sockets), 'failed': failures, 'alive': alive, 'ramp': ramp,
+            'connect_times': connect_times, 'latencies': latencies, 'received': received['count'],
+            'rss_before': before, 'rss_idle': idle,
+        }
+
+    def report(self, result, options):
+        self.stdout.write(f"Kết nối thành công: {result['opened']}/{options['connections']} "
+                          f"trong {result['ramp']:.2f}s, còn sống sau khi giữ: {result['alive']}")
+        if result['failed']:
+            reasons = {reason: result['failed'].count(reason) for reason in set(result['failed'])}
+            self.stdout.write(self.style.WARNING(f"Thất bại: {reasons}"))
+
+        times = result['connect_times']
+        if times:
+            self.stdout.write("Thời gian kết nối + đăng ký (ms): p50={:.1f} p95={:.1f} p99={:.1f} max={:.1f}".format(
+                *(percentile(times, p) * 1000 for p in (50, 95, 99)), max(times) * 1000))
+
+        if options['publish']:
+            expected = options['publish'] * result['opened']
+            self.stdout.write(f"Đã nhận {result['received']}/{expected} thông điệp")
+            if result['latencies']:
+                self.stdout.write("Độ trễ phát (ms): p50={:.1f} p95={:.1f} p99={:.1f} trung bình={:.1f}".format(
+                    *(percentile(result['latencies'], p) * 1000 for p in (50, 95, 99)),
+                    statistics.mean(result['latencies']) * 1000))
+
+        if result['rss_before'] and result['rss_idle'] and result['opened']:
+            per_connection = (result['rss_idle'] - result['rss_before']) / result['opened']
+            self.stdout.write(f"RSS server: {result['rss_before']} KB -> {result['rss_idle']} KB "
+                              f"(~{per_connection:.1f} KB/kết nối)")
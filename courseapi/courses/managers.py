@@ -0,0 +1,36 @@
+from django.contrib.auth.models import UserManager as BaseUserManager
+from django.db import models
+from django.db.models import Q
+
+
+class ActiveQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(active=True)
+
+    def inactive(self):
+        return self.filter(active=False)
+
+    def soft_delete(self):
+        return self.active().update(active=False)
+
+
+class ActiveManager(models.Manager.from_queryset(ActiveQuerySet)):
+    pass
+
+
+class ActiveIndex(models.Index):
+    def physical(self, connection):
+        if connection.features.supports_partial_indexes:
+            return models.Index(fields=self.fields, name=self.name, condition=Q(active=True),
+                                db_tablespace=self.db_tablespace)
+        return models.Index(fields=['active', *self.fields], name=self.name, db_tablespace=self.db_tablespace)
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        return self.physical(schema_editor.connection).create_sql(model, schema_editor, using=using, **kwargs)
+
+
+class UserManager(BaseUserManager):
+    def _create_user_object(self, username, email, password, **extra_fields):
+        user = super()._create_user_object(username, email, None, **extra_fields)
+        user.set_password(password)
+        return user
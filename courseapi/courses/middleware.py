@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.http import JsonResponse
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+from courses.hashing import HashingBusy
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+re_accepts_brotli = _lazy_re_compile(r"\bbr\b")
+INCOMPRESSIBLE_TYPES = ('application/zip', 'image/', 'video/', 'audio/')
+
+
+def compress_brotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=5)
+    for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < getattr(settings, 'COMPRESSION_MIN_SIZE', 1024):
+            return response
+
+        if response.has_header('Content-Encoding') or response.has_header('Content-Range'):
+            return response
+
+        if response.get('Content-Type', '').startswith(INCOMPRESSIBLE_TYPES):
+            return response
+
+        ae = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is None or getattr(response, 'is_async', False) or not re_accepts_brotli.search(ae):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        if response.streaming:
+            response.streaming_content = compress_brotli_sequence(response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            compressed_content = brotli.compress(response.content, quality=5)
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response.headers['Content-Length'] = str(len(response.content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+
+        return response
+
+
+class HashingBusyMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, HashingBusy):
+            response = JsonResponse({'detail': str(exception)}, status=503)
+            response['Retry-After'] = str(settings.PASSWORD_HASH_WAIT_SECONDS)
+            return response
@@ -0,0 +1,52 @@
+# Generated by Django 6.0 on 2026-10-19 14:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from courses import rendering
+
+
+def render_lessons(apps, schema_editor):
+    Lesson = apps.get_model('courses', 'Lesson')
+    LessonRender = apps.get_model('courses', 'LessonRender')
+
+    for lesson in Lesson.objects.only('id', 'content').iterator(chunk_size=200):
+        content_hash = rendering.content_hash(lesson.content)
+        result = rendering.render(lesson.content)
+        LessonRender.objects.get_or_create(content_hash=content_hash, defaults={'html': result['html']})
+        Lesson.objects.filter(pk=lesson.pk).update(rendered_id=content_hash, excerpt=result['excerpt'],
+                                                   reading_time=result['reading_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LessonRender',
+            fields=[
+                ('content_hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('html', models.TextField()),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='reading_time',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Số phút đọc ước tính'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='rendered',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lessons', to='courses.lessonrender'),
+        ),
+        migrations.RunPython(render_lessons, migrations.RunPython.noop),
+    ]
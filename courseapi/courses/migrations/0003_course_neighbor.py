@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-19 14:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_lesson_render'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseNeighbor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='courses.course')),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbor_of', to='courses.course')),
+            ],
+            options={
+                'ordering': ['course', 'rank'],
+                'unique_together': {('course', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-19 14:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_course_neighbor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Leaderboard',
+            fields=[
+                ('board', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('epoch', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CourseScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(choices=[('TRENDING', 'Xu hướng'), ('TOP_RATED', 'Đánh giá cao')], max_length=20)),
+                ('scope', models.CharField(default='global', max_length=30)),
+                ('score', models.FloatField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scores', to='courses.course')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['board', 'scope', '-score'], name='course_score_rank_idx')],
+                'unique_together': {('board', 'scope', 'course')},
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-19 15:04
+
+import courses.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report', models.CharField(choices=[('TRANSACTIONS', 'Giao dịch'), ('ENROLLMENTS', 'Đăng ký khóa học'), ('REVENUE', 'Doanh thu theo khóa học')], max_length=20)),
+                ('format', models.CharField(choices=[('CSV', 'CSV'), ('XLSX', 'Excel (XLSX)')], default='CSV', max_length=10)),
+                ('date_from', models.DateField(blank=True, null=True)),
+                ('date_to', models.DateField(blank=True, null=True)),
+                ('pay_method', models.CharField(blank=True, choices=[('CASH', 'Tiền mặt'), ('MOMO', 'Ví MoMo'), ('ZALOPAY', 'ZaloPay')], max_length=50)),
+                ('status', models.CharField(choices=[('PENDING', 'Đang chờ'), ('RUNNING', 'Đang chạy'), ('DONE', 'Hoàn thành'), ('FAILED', 'Thất bại')], default='PENDING', max_length=10)),
+                ('total_rows', models.PositiveIntegerField(default=0)),
+                ('processed_rows', models.PositiveIntegerField(default=0)),
+                ('file', models.FileField(blank=True, storage=courses.models.export_storage, upload_to='%Y/%m/')),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('finished_date', models.DateTimeField(blank=True, null=True)),
+                ('instructor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='courses.teacher')),
+                ('requested_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exports', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_date'],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-19 15:09
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_comments(apps, schema_editor):
+    Lesson = apps.get_model('courses', 'Lesson')
+    Comment = apps.get_model('courses', 'Comment')
+
+    counts = (Comment.objects.filter(lesson=OuterRef('pk'), active=True).order_by()
+              .values('lesson').annotate(total=Count('id')).values('total'))
+    Lesson.objects.update(comment_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_export_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 6.0 on 2026-10-19 15:14
+
+import courses.managers
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_lesson_comment_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('user_id', models.BigIntegerField(db_index=True)),
+                ('lesson_id', models.BigIntegerField(db_index=True)),
+                ('content', models.TextField()),
+                ('created_date', models.DateTimeField()),
+                ('updated_date', models.DateTimeField()),
+                ('archived_date', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedLike',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('student_id', models.BigIntegerField(db_index=True)),
+                ('course_id', models.BigIntegerField(db_index=True)),
+                ('created_date', models.DateTimeField()),
+                ('updated_date', models.DateTimeField()),
+                ('archived_date', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=courses.managers.ActiveIndex(fields=['lesson', '-created_date'], name='comment_active_lesson_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=courses.managers.ActiveIndex(fields=['category'], name='course_active_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=courses.managers.ActiveIndex(fields=['instructor'], name='course_active_instructor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=courses.managers.ActiveIndex(fields=['course', 'created_date'], name='lesson_active_course_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='like',
+            index=courses.managers.ActiveIndex(fields=['course'], name='like_active_course_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-19 15:21
+
+import courses.managers
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_active_indexes_archive'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='adminprofile',
+            managers=[
+                ('objects', courses.managers.UserManager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='student',
+            managers=[
+                ('objects', courses.managers.UserManager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='teacher',
+            managers=[
+                ('objects', courses.managers.UserManager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', courses.managers.UserManager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+from oauth2_provider.settings import oauth2_settings
+
+INDEXES = [
+    ('AccessToken', oauth2_settings.ACCESS_TOKEN_MODEL,
+     [models.Index(fields=['expires'], name='oauth_access_expires_idx')]),
+    ('RefreshToken', oauth2_settings.REFRESH_TOKEN_MODEL,
+     [models.Index(fields=['revoked'], name='oauth_refresh_revoked_idx'),
+      models.Index(fields=['created'], name='oauth_refresh_created_idx')]),
+    ('IDToken', oauth2_settings.ID_TOKEN_MODEL,
+     [models.Index(fields=['expires'], name='oauth_idtoken_expires_idx')]),
+    ('Grant', oauth2_settings.GRANT_MODEL,
+     [models.Index(fields=['expires'], name='oauth_grant_expires_idx')]),
+]
+
+
+def token_indexes(apps):
+    for name, configured, indexes in INDEXES:
+        if configured == f'oauth2_provider.{name}':
+            model = apps.get_model('oauth2_provider', name)
+            for index in indexes:
+                yield model, index
+
+
+def add_indexes(apps, schema_editor):
+    for model, index in token_indexes(apps):
+        schema_editor.add_index(model, index)
+
+
+def remove_indexes(apps, schema_editor):
+    for model, index in token_indexes(apps):
+        schema_editor.remove_index(model, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_user_manager'),
+        ('oauth2_provider', '0012_add_token_checksum'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_indexes, remove_indexes),
+    ]
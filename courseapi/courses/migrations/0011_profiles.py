@@ -0,0 +1,43 @@
+# Generated by Django 6.0 on 2026-10-19 15:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_oauth_token_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileStack',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('endpoint', models.CharField(max_length=255)),
+                ('window', models.DateTimeField()),
+                ('stack_hash', models.CharField(max_length=40)),
+                ('stack', models.TextField()),
+                ('samples', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['window', 'endpoint'], name='profile_stack_window_idx')],
+                'unique_together': {('endpoint', 'window', 'stack_hash')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ProfileWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('endpoint', models.CharField(max_length=255)),
+                ('window', models.DateTimeField()),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('seconds', models.FloatField(default=0)),
+                ('samples', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['window', 'endpoint'], name='profile_window_idx')],
+                'unique_together': {('endpoint', 'window')},
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 6.0 on 2026-10-19 15:37
+
+import courses.managers
+import django.db.models.deletion
+from django.db import migrations, models
+
+POSITION_GAP = 1024
+
+
+def number_lessons(apps, schema_editor):
+    Lesson = apps.get_model('courses', 'Lesson')
+    lessons = list(Lesson.objects.order_by('course_id', 'created_date', 'id')
+                   .only('id', 'course_id', 'active'))
+
+    course_id, number, previous = None, 0, None
+    for lesson in lessons:
+        if lesson.course_id != course_id:
+            course_id, number, previous = lesson.course_id, 0, None
+        number += 1
+        lesson.position = number * POSITION_GAP
+        if lesson.active:
+            if previous is not None:
+                lesson.prev_lesson_id, previous.next_lesson_id = previous.pk, lesson.pk
+            previous = lesson
+    Lesson.objects.bulk_update(lessons, ['position', 'prev_lesson', 'next_lesson'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0011_profiles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='next_lesson',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='courses.lesson'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='position',
+            field=models.PositiveIntegerField(default=0, help_text='Thứ tự bài học trong khóa học'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='prev_lesson',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='courses.lesson'),
+        ),
+        migrations.RunPython(number_lessons, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=courses.managers.ActiveIndex(fields=['course', 'position'], name='lesson_active_position_idx'),
+        ),
+    ]
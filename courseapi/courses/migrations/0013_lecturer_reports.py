@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-19 15:56
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0012_lesson_position'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LecturerReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=10)),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('generated_date', models.DateTimeField()),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reports', to='courses.teacher')),
+            ],
+            options={
+                'unique_together': {('teacher', 'period')},
+            },
+        ),
+    ]
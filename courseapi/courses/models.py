@@ -1,13 +1,26 @@
 import datetime
+import os
 
+from asgiref.sync import sync_to_async
 from ckeditor_uploader.fields import RichTextUploadingField
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.db import models
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Length
 from django.contrib.auth.models import AbstractUser
 from ckeditor.fields import RichTextField
 from cloudinary.models import CloudinaryField
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
+from django.utils import timezone
+
+from courses import hashing, rendering
+from courses.caching import bump_version
+from courses.managers import ActiveIndex, ActiveManager, UserManager
+from courses.partitioning import created_since
 
 
 class User(AbstractUser):
@@ -22,6 +35,23 @@ class User(AbstractUser):
         default=Role.STUDENT
     )
 
+    objects = UserManager()
+
+    def set_password(self, raw_password):
+        self.password = hashing.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        def setter(raw_password):
+            self.set_password(raw_password)
+            self._password = None
+            self.save(update_fields=['password'])
+
+        return hashing.check_password(raw_password, self.password, setter)
+
+    async def acheck_password(self, raw_password):
+        return await sync_to_async(self.check_password)(raw_password)
+
     def __str__(self):
         return self.username
 
@@ -50,19 +80,20 @@ class Student(User):
     def save(self, *args, **kwargs):
         self.role = User.Role.STUDENT
         if not self.student_code:
-            year = datetime.datetime.now().year
-            last_student = Student.objects.filter(student_code__startswith=f"SV{year}").order_by(
-                "-student_code").first()
-
-            if last_student:
-                last_number = int(last_student.student_code[-4:])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            self.student_code = f"SV{year}{new_number:04d}"
+            self.student_code = Student.allocate_codes(1)[0]
 
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def allocate_codes(count):
+        prefix = f"SV{datetime.datetime.now().year}"
+        last_code = (Student.objects.filter(student_code__startswith=prefix)
+                     .order_by(Length('student_code').desc(), '-student_code')
+                     .values_list('student_code', flat=True).first())
+
+        start = int(last_code[len(prefix):]) + 1 if last_code else 1
+        return [f"{prefix}{number:04d}" for number in range(start, start + count)]
+
     class Meta:
         verbose_name = "Sinh viên"
 
@@ -78,6 +109,8 @@ class BaseModel(models.Model):
     updated_date = models.DateTimeField(auto_now=True)
     active = models.BooleanField(default=True)
 
+    objects = ActiveManager()
+
     class Meta:
         abstract = True
 
@@ -110,27 +143,133 @@ class Course(BaseModel):
 
     class Meta:
         unique_together = ('name', 'instructor', 'fee')
+        indexes = [
+            ActiveIndex(fields=['category'], name='course_active_category_idx'),
+            ActiveIndex(fields=['instructor'], name='course_active_instructor_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
     def update_duration(self):
-        count = self.lessons.filter(active=True).count()
+        count = self.lessons.active().count()
         self.duration = count
         self.save(update_fields=['duration'])
 
+class LessonRender(models.Model):
+    content_hash = models.CharField(max_length=64, primary_key=True)
+    html = models.TextField()
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    @staticmethod
+    def prune(hours):
+        orphans = LessonRender.objects.filter(lessons__isnull=True,
+                                              created_date__lt=timezone.now() - datetime.timedelta(hours=hours))
+        return orphans.delete()[0]
+
+
+class CourseNeighbor(models.Model):
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='neighbors')
+    neighbor = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='neighbor_of')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = ('course', 'rank')
+        ordering = ['course', 'rank']
+
+
+class Leaderboard(models.Model):
+    board = models.CharField(max_length=20, primary_key=True)
+    epoch = models.DateTimeField()
+
+
+class CourseScore(models.Model):
+    class Boards(models.TextChoices):
+        TRENDING = 'TRENDING', 'Xu hướng'
+        TOP_RATED = 'TOP_RATED', 'Đánh giá cao'
+    board = models.CharField(max_length=20, choices=Boards.choices)
+    scope = models.CharField(max_length=30, default='global')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='scores')
+    score = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ('board', 'scope', 'course')
+        indexes = [models.Index(fields=['board', 'scope', '-score'], name='course_score_rank_idx')]
+
+
 class Lesson(BaseModel):
     subject = models.CharField(max_length=255)
     content = RichTextUploadingField()
     video_url = models.URLField(null=True, blank=True)
     course = models.ForeignKey(Course, on_delete=models.RESTRICT, related_name='lessons')
     tags = models.ManyToManyField(Tag, blank=True, related_name='lessons')
+    rendered = models.ForeignKey(LessonRender, null=True, blank=True, on_delete=models.SET_NULL,
+                                 editable=False, related_name='lessons')
+    excerpt = models.CharField(max_length=255, blank=True, default='', editable=False)
+    reading_time = models.PositiveIntegerField(default=0, editable=False, help_text="Số phút đọc ước tính")
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    position = models.PositiveIntegerField(default=0, help_text="Thứ tự bài học trong khóa học")
+    prev_lesson = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL,
+                                    editable=False, related_name='+')
+    next_lesson = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL,
+                                    editable=False, related_name='+')
+
+    derived_fields = ('comment_count', 'prev_lesson', 'next_lesson')
 
     def __str__(self):
         return self.subject
 
+    @staticmethod
+    def next_position(course_id):
+        last = Lesson.objects.filter(course_id=course_id).aggregate(m=models.Max('position'))['m']
+        return (last or 0) + settings.LESSON_POSITION_GAP
+
+    @staticmethod
+    def relink(course_id):
+        ids = list(Lesson.objects.active().filter(course_id=course_id)
+                   .order_by('position', 'id').values_list('id', flat=True))
+        links = {pk: (None, None) for pk in Lesson.objects.filter(course_id=course_id).values_list('id', flat=True)}
+        links.update({pk: (ids[i - 1] if i else None, ids[i + 1] if i + 1 < len(ids) else None)
+                      for i, pk in enumerate(ids)})
+
+        current = Lesson.objects.filter(course_id=course_id).values_list('id', 'prev_lesson_id', 'next_lesson_id')
+        changed = [Lesson(pk=pk, prev_lesson_id=links[pk][0], next_lesson_id=links[pk][1])
+                   for pk, prev_id, next_id in current if links[pk] != (prev_id, next_id)]
+        Lesson.objects.bulk_update(changed, ['prev_lesson', 'next_lesson'])
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.position:
+            self.position = Lesson.next_position(self.course_id)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            self.render_content()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'rendered', 'excerpt', 'reading_time'}
+
+        if update_fields is None and not self._state.adding:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [f.name for f in self._meta.concrete_fields
+                                       if not f.primary_key and f.attname not in deferred
+                                       and f.name not in self.derived_fields]
+        super().save(*args, **kwargs)
+
+    def render_content(self):
+        content_hash = rendering.content_hash(self.content)
+        if content_hash == self.rendered_id:
+            return
+
+        result = rendering.render(self.content)
+        LessonRender.objects.get_or_create(content_hash=content_hash, defaults={'html': result['html']})
+        self.rendered_id = content_hash
+        self.excerpt = result['excerpt']
+        self.reading_time = result['reading_time']
+
     class Meta:
         unique_together = ('subject', 'course')
+        indexes = [ActiveIndex(fields=['course', 'created_date'], name='lesson_active_course_idx'),
+                   ActiveIndex(fields=['course', 'position'], name='lesson_active_position_idx')]
 
 
 
@@ -144,6 +283,17 @@ class LessonInteraction(BaseModel):
 class CourseInteraction(BaseModel):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, null=False, blank=False)
     course = models.ForeignKey(Course, on_delete=models.CASCADE, null=False, blank=False)
+    tracked_fields = ('active', 'updated_date')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_state()
+        return instance
+
+    def remember_state(self):
+        self._loaded = {name: getattr(self, name) for name in self.tracked_fields
+                        if name not in self.get_deferred_fields()}
 
     class Meta:
         abstract = True
@@ -158,13 +308,22 @@ class Comment(BaseModel):
     def __str__(self):
         return self.content
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'active' in field_names:
+            instance._loaded_active = instance.active
+        return instance
+
     class Meta:
         ordering = ['-created_date']
+        indexes = [ActiveIndex(fields=['lesson', '-created_date'], name='comment_active_lesson_idx')]
 
 
 class Like(CourseInteraction):
     class Meta:
         unique_together = ('student', 'course')
+        indexes = [ActiveIndex(fields=['course'], name='like_active_course_idx')]
 
 
 class LessonStatus(LessonInteraction):
@@ -176,6 +335,7 @@ class LessonStatus(LessonInteraction):
 
 class Rating(CourseInteraction):
     rate = models.SmallIntegerField(default=5,validators=[MinValueValidator(1),MaxValueValidator(5)])
+    tracked_fields = ('active', 'rate', 'updated_date')
 
     class Meta:
         unique_together = ('student', 'course')
@@ -197,6 +357,7 @@ class Enrollment(BaseModel):
             return 0
 
         completed_count = LessonStatus.objects.filter(
+                            created_since(self.course),
                             student=self.student,
                             lesson__course=self.course,
                             is_completed=True).count()
@@ -223,7 +384,199 @@ class Transaction(BaseModel):
     status = models.BooleanField(default=False)
 
 
+class Job(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Đang chờ'
+        RUNNING = 'RUNNING', 'Đang chạy'
+        DONE = 'DONE', 'Hoàn thành'
+        FAILED = 'FAILED', 'Thất bại'
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    dedup_key = models.CharField(max_length=255, null=True, blank=True, unique=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_date = models.DateTimeField(auto_now_add=True)
+    updated_date = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_at'], name='job_queue_idx')]
+
+    def __str__(self):
+        return f'{self.name}#{self.pk}'
+
+
+class ArchivedComment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user_id = models.BigIntegerField(db_index=True)
+    lesson_id = models.BigIntegerField(db_index=True)
+    content = models.TextField()
+    created_date = models.DateTimeField()
+    updated_date = models.DateTimeField()
+    archived_date = models.DateTimeField(auto_now_add=True)
+
+
+class ArchivedLike(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    student_id = models.BigIntegerField(db_index=True)
+    course_id = models.BigIntegerField(db_index=True)
+    created_date = models.DateTimeField()
+    updated_date = models.DateTimeField()
+    archived_date = models.DateTimeField(auto_now_add=True)
+
+
+class ProfileWindow(models.Model):
+    endpoint = models.CharField(max_length=255)
+    window = models.DateTimeField()
+    requests = models.PositiveIntegerField(default=0)
+    seconds = models.FloatField(default=0)
+    samples = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('endpoint', 'window')
+        indexes = [models.Index(fields=['window', 'endpoint'], name='profile_window_idx')]
+
+
+class ProfileStack(models.Model):
+    endpoint = models.CharField(max_length=255)
+    window = models.DateTimeField()
+    stack_hash = models.CharField(max_length=40)
+    stack = models.TextField()
+    samples = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('endpoint', 'window', 'stack_hash')
+        indexes = [models.Index(fields=['window', 'endpoint'], name='profile_stack_window_idx')]
+
+
+class ExportStorage(FileSystemStorage):
+    @property
+    def base_location(self):
+        return settings.EXPORTS_ROOT
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+
+def export_storage():
+    return ExportStorage()
+
+
+class LecturerReport(models.Model):
+    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE, related_name='reports')
+    period = models.CharField(max_length=10)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    generated_date = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('teacher', 'period')
+
+
+class ExportJob(models.Model):
+    class Reports(models.TextChoices):
+        TRANSACTIONS = 'TRANSACTIONS', 'Giao dịch'
+        ENROLLMENTS = 'ENROLLMENTS', 'Đăng ký khóa học'
+        REVENUE = 'REVENUE', 'Doanh thu theo khóa học'
+
+    class Formats(models.TextChoices):
+        CSV = 'CSV', 'CSV'
+        XLSX = 'XLSX', 'Excel (XLSX)'
+
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='exports')
+    report = models.CharField(max_length=20, choices=Reports.choices)
+    format = models.CharField(max_length=10, choices=Formats.choices, default=Formats.CSV)
+    date_from = models.DateField(null=True, blank=True)
+    date_to = models.DateField(null=True, blank=True)
+    instructor = models.ForeignKey(Teacher, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    pay_method = models.CharField(max_length=50, choices=Transaction.PayMethods.choices, blank=True)
+    status = models.CharField(max_length=10, choices=Job.Status.choices, default=Job.Status.PENDING)
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    file = models.FileField(storage=export_storage, upload_to='%Y/%m/', blank=True)
+    error = models.TextField(blank=True, default='')
+    created_date = models.DateTimeField(auto_now_add=True)
+    finished_date = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_date']
+
+    def __str__(self):
+        return f'{self.get_report_display()} ({self.format}) #{self.pk}'
+
+    @property
+    def progress(self):
+        if self.status == Job.Status.DONE:
+            return 100
+        if not self.total_rows:
+            return 0
+        return round(self.processed_rows / self.total_rows * 100, 2)
+
+
+@receiver([post_save, post_delete])
+def bump_model_version(sender, **kwargs):
+    if sender in (Category, Tag, Course, Lesson, Comment, Like, Rating, Enrollment, Teacher):
+        bump_version(sender._meta.model_name)
+
+
+@receiver(post_save, sender=User)
+def bump_teacher_version(sender, instance, update_fields=None, **kwargs):
+    if instance.role == User.Role.TEACHER and not (update_fields and set(update_fields) <= {'last_login', 'password'}):
+        bump_version('teacher')
+
+
+def adjust_comment_counts(deltas):
+    whens = [When(pk=lesson_id, then=F('comment_count') + delta) if delta > 0 else
+             When(pk=lesson_id, comment_count__gte=-delta, then=F('comment_count') + delta)
+             for lesson_id, delta in deltas.items() if delta]
+    if whens:
+        Lesson.objects.filter(pk__in=deltas).update(comment_count=Case(*whens, default=Value(0)))
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    previous = False if created else getattr(instance, '_loaded_active', instance.active)
+    if previous != instance.active:
+        adjust_comment_counts({instance.lesson_id: 1 if instance.active else -1})
+    instance._loaded_active = instance.active
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    if instance.active:
+        adjust_comment_counts({instance.lesson_id: -1})
+
+
+@receiver(m2m_changed, sender=Course.tags.through)
+@receiver(m2m_changed, sender=Lesson.tags.through)
+def bump_tags_version(sender, instance, **kwargs):
+    bump_version(instance._meta.model_name)
+
+
+@receiver(m2m_changed, sender=Lesson.tags.through)
+def touch_tagged_lessons(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        instance._cleared_lesson_ids = list(instance.lessons.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        ids = [instance.pk]
+    elif action == 'post_clear':
+        ids = instance.__dict__.pop('_cleared_lesson_ids', [])
+    else:
+        ids = pk_set
+    Lesson.objects.filter(pk__in=ids).update(updated_date=timezone.now())
+
+
+@receiver(post_save, sender=Lesson)
+def relink_lessons(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields is None or {'position', 'active', 'course'} & set(update_fields):
+        Lesson.relink(instance.course_id)
+
 
-@receiver([post_save, post_delete], sender=Lesson)
-def update_course_duration(sender, instance, **kwargs):
-    instance.course.update_duration()
+@receiver(post_delete, sender=Lesson)
+def relink_lessons_on_delete(sender, instance, **kwargs):
+    Lesson.relink(instance.course_id)
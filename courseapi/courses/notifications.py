@@ -0,0 +1,171 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+import socket
+import threading
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from courses.models import Comment, Enrollment
+
+logger = logging.getLogger(__name__)
+
+
+class Hub:
+    def __init__(self):
+        self.loop = None
+        self.topics = defaultdict(set)
+
+    def bind(self, loop):
+        self.loop = loop
+
+    def subscribe(self, connection, topic):
+        self.topics[topic].add(connection)
+
+    def unsubscribe(self, connection, topic):
+        connections = self.topics.get(topic)
+        if connections is not None:
+            connections.discard(connection)
+            if not connections:
+                del self.topics[topic]
+
+    def drop(self, connection):
+        for topic in list(connection.topics):
+            self.unsubscribe(connection, topic)
+
+    def dispatch(self, topic, message):
+        for connection in tuple(self.topics.get(topic, ())):
+            connection.push(message)
+
+    def deliver(self, topic, message):
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self.dispatch(topic, message)
+        else:
+            loop.call_soon_threadsafe(self.dispatch, topic, message)
+
+
+hub = Hub()
+
+
+class LocalBackend:
+    def start(self, loop):
+        hub.bind(loop)
+
+    def publish(self, topic, message):
+        hub.deliver(topic, message)
+
+
+class UnixSocketBackend(LocalBackend):
+    def __init__(self):
+        self.directory = settings.NOTIFICATIONS_SOCKET_DIR
+        self.sock = None
+        self.path = None
+
+    def start(self, loop):
+        super().start(loop)
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f'{os.getpid()}-{uuid.uuid4().hex[:8]}.sock')
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.path)
+        self.sock.setblocking(False)
+        loop.add_reader(self.sock.fileno(), self.receive)
+
+    def receive(self):
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                return
+            topic, _, message = data.decode().partition('\n')
+            hub.dispatch(topic, message)
+
+    def publish(self, topic, message):
+        data = f'{topic}\n{message}'.encode()
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+            for path in glob.glob(os.path.join(self.directory, '*.sock')):
+                try:
+                    sender.sendto(data, path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    self.discard(path)
+                except OSError as e:
+                    logger.warning("Không gửi được thông báo tới %s: %s", path, e)
+
+    @staticmethod
+    def discard(path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+_backend = {}
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    if 'instance' not in _backend:
+        with _backend_lock:
+            if 'instance' not in _backend:
+                _backend['instance'] = import_string(settings.NOTIFICATIONS_BACKEND)()
+    return _backend['instance']
+
+
+def start(loop):
+    if hub.loop is not loop:
+        get_backend().start(loop)
+
+
+def encode(topic, event, data):
+    return json.dumps({'topic': topic, 'event': event, 'data': data}, cls=DjangoJSONEncoder)
+
+
+def publish(topic, event, data):
+    message = encode(topic, event, data)
+    transaction.on_commit(lambda: get_backend().publish(topic, message))
+
+
+def lesson_topic(lesson_id):
+    return f'lesson:{lesson_id}'
+
+
+def instructor_topic(instructor_id):
+    return f'instructor:{instructor_id}'
+
+
+@receiver(post_save, sender=Comment)
+def notify_comment(sender, instance, created, **kwargs):
+    if created:
+        publish(lesson_topic(instance.lesson_id), 'comment.created', {
+            'id': instance.pk,
+            'content': instance.content,
+            'created_date': instance.created_date,
+            'user': {'id': instance.user_id, 'username': instance.user.username},
+        })
+
+
+@receiver(post_save, sender=Enrollment)
+def notify_enrollment(sender, instance, created, **kwargs):
+    if created:
+        course = instance.course
+        publish(instructor_topic(course.instructor_id), 'enrollment.created', {
+            'id': instance.pk,
+            'created_date': instance.created_date,
+            'course': {'id': course.pk, 'name': course.name},
+            'student': {'id': instance.student_id, 'username': instance.student.username},
+        })
@@ -0,0 +1,131 @@
+import datetime
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections, router
+from django.db.models import Q
+
+PARTITION_FIELD = 'created_date'
+
+
+def owner_floor(owner):
+    if isinstance(owner, datetime.datetime):
+        return owner
+    try:
+        field = owner._meta.get_field(PARTITION_FIELD)
+    except FieldDoesNotExist:
+        return None
+    return getattr(owner, PARTITION_FIELD) if getattr(field, 'auto_now_add', False) else None
+
+
+def pruning_floor(*owners):
+    floors = [owner_floor(owner) for owner in owners]
+    floors = [floor for floor in floors if floor is not None]
+    return max(floors) if floors else None
+
+
+def created_since(*owners, prefix=''):
+    floor = pruning_floor(*owners) if settings.PARTITION_PRUNING else None
+    return Q(**{f'{prefix}{PARTITION_FIELD}__gte': floor}) if floor else Q()
+
+
+def partitioned_models():
+    return [apps.get_model(label) for label in settings.PARTITIONED_MODELS]
+
+
+def connection_for(model):
+    return connections[router.db_for_write(model)]
+
+
+def month_start(value):
+    return datetime.date(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'p{month:%Y%m}'
+
+
+def partition_clause(month):
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN (TO_DAYS('{add_months(month, 1):%Y-%m-%d}'))"
+
+
+def blockers(model):
+    meta = model._meta
+    found = []
+    if connection_for(model).vendor != 'mysql':
+        found.append(f"CSDL {connection_for(model).vendor} không hỗ trợ phân vùng gốc của MySQL")
+
+    for field in meta.concrete_fields:
+        if field.remote_field and field.db_constraint:
+            found.append(f"có khóa ngoại {field.column} -> {field.remote_field.model._meta.db_table}")
+    for relation in meta.related_objects:
+        if relation.field.db_constraint:
+            found.append(f"bị tham chiếu bởi {relation.related_model._meta.db_table}.{relation.field.column}")
+
+    uniques = [[meta.pk.name]] + [[field.name] for field in meta.concrete_fields if field.unique and not field.primary_key]
+    uniques += [list(fields) for fields in meta.unique_together]
+    for fields in uniques:
+        if PARTITION_FIELD not in fields:
+            found.append(f"khóa duy nhất ({', '.join(fields)}) không chứa {PARTITION_FIELD}")
+    return found
+
+
+def existing_partitions(model):
+    with connection_for(model).cursor() as cursor:
+        cursor.execute("SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+                       "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL "
+                       "ORDER BY PARTITION_ORDINAL_POSITION", [model._meta.db_table])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def oldest_month(model, today):
+    first = model.objects.order_by(PARTITION_FIELD).values_list(PARTITION_FIELD, flat=True).first()
+    return month_start(first) if first else today
+
+
+def months_between(start, end):
+    months = []
+    while start <= end:
+        months.append(start)
+        start = add_months(start, 1)
+    return months
+
+
+def plan(model, ahead=None, retain=None, today=None, partitions=None):
+    ahead = settings.PARTITION_MONTHS_AHEAD if ahead is None else ahead
+    today = month_start(today or datetime.date.today())
+    table = connection_for(model).ops.quote_name(model._meta.db_table)
+    partitions = existing_partitions(model) if partitions is None else partitions
+    last = add_months(today, ahead)
+
+    if not partitions:
+        clauses = [partition_clause(month) for month in months_between(oldest_month(model, today), last)]
+        return [f"ALTER TABLE {table} PARTITION BY RANGE (TO_DAYS({PARTITION_FIELD})) "
+                f"({', '.join(clauses)}, PARTITION pmax VALUES LESS THAN MAXVALUE)"]
+
+    statements = []
+    monthly = sorted(name for name in partitions if name != 'pmax')
+    newest = datetime.datetime.strptime(monthly[-1], 'p%Y%m').date() if monthly else add_months(today, -1)
+    missing = months_between(add_months(newest, 1), last)
+    if missing:
+        clauses = ', '.join(partition_clause(month) for month in missing)
+        statements.append(f"ALTER TABLE {table} REORGANIZE PARTITION pmax INTO "
+                          f"({clauses}, PARTITION pmax VALUES LESS THAN MAXVALUE)")
+
+    if retain is not None:
+        expired = [name for name in monthly if name < partition_name(add_months(today, -retain))]
+        if expired:
+            statements.append(f"ALTER TABLE {table} DROP PARTITION {', '.join(expired)}")
+    return statements
+
+
+def apply(model, statements):
+    with connection_for(model).cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
@@ -42,3 +42,15 @@ class IsInstructorOfCourse(permissions.BasePermission):
         return False
 
 
+
+
+class CanExportReports(permissions.IsAuthenticated):
+    message = "Chỉ giảng viên đã xác thực hoặc quản trị viên mới được xuất báo cáo."
+
+    def has_permission(self, request, view):
+        if not super().has_permission(request, view):
+            return False
+        return request.user.is_staff or IsVerifiedTeacher().has_permission(request, view)
+
+    def has_object_permission(self, request, view, export):
+        return request.user.is_staff or export.requested_by_id == request.user.pk
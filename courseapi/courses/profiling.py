@@ -0,0 +1,171 @@
+import hashlib
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from courses import jobs
+from courses.models import ProfileStack, ProfileWindow
+from courses.telemetry import endpoint_name
+
+_busy = threading.Lock()
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', code.co_filename)}:{code.co_qualname}"
+
+
+def fold(frame, root, max_depth):
+    labels = []
+    while frame is not None and frame is not root and len(labels) < max_depth:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class StackSampler(threading.Thread):
+    def __init__(self, thread_id, root, interval, max_depth):
+        super().__init__(name='stack-sampler', daemon=True)
+        self.thread_id, self.root = thread_id, root
+        self.interval, self.max_depth = interval, max_depth
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[fold(frame, self.root, self.max_depth)] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.stacks.pop('', None)
+        return self.stacks
+
+
+def window_start(when):
+    minutes = settings.PROFILING_WINDOW_MINUTES
+    start = when.replace(second=0, microsecond=0)
+    return start - timedelta(minutes=(start.hour * 60 + start.minute) % minutes)
+
+
+def increment(model, lookup, defaults=None, **values):
+    rows = model.objects.filter(**lookup)
+    changes = {field: F(field) + value for field, value in values.items()}
+    if rows.update(**changes):
+        return False
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **(defaults or {}), **values)
+        return True
+    except IntegrityError:
+        rows.update(**changes)
+        return False
+
+
+def prune(now=None):
+    cutoff = (now or timezone.now()) - timedelta(days=settings.PROFILING_RETENTION_DAYS)
+    ProfileStack.objects.filter(window__lt=cutoff).delete()
+    ProfileWindow.objects.filter(window__lt=cutoff).delete()
+
+
+@jobs.task('record_profile')
+def record_profile(endpoint, stacks, seconds, at):
+    window = window_start(datetime.fromisoformat(at))
+    created = increment(ProfileWindow, {'endpoint': endpoint, 'window': window},
+                        requests=1, seconds=seconds, samples=sum(stacks.values()))
+    for stack, samples in stacks.items():
+        increment(ProfileStack, {'endpoint': endpoint, 'window': window,
+                                 'stack_hash': hashlib.sha1(stack.encode('utf-8')).hexdigest()},
+                  defaults={'stack': stack}, samples=samples)
+    if created:
+        prune()
+
+
+def profiled_stacks(since, endpoint=None):
+    queryset = ProfileStack.objects.filter(window__gte=window_start(since))
+    if endpoint:
+        queryset = queryset.filter(endpoint=endpoint)
+    return queryset.values('stack').annotate(total=Sum('samples')).values_list('stack', 'total')
+
+
+def hottest(since, endpoint=None, limit=50):
+    own, total = Counter(), Counter()
+    for stack, samples in profiled_stacks(since, endpoint).iterator():
+        frames = stack.split(';')
+        own[frames[-1]] += samples
+        for frame in set(frames):
+            total[frame] += samples
+
+    overall = sum(own.values()) or 1
+    return [{'function': function, 'self': samples, 'total': total[function],
+             'self_percent': 100 * samples / overall, 'total_percent': 100 * total[function] / overall}
+            for function, samples in own.most_common(limit)]
+
+
+def folded(since, endpoint=None):
+    return ''.join(f'{stack} {samples}\n' for stack, samples in profiled_stacks(since, endpoint).iterator())
+
+
+def windows(since):
+    return (ProfileWindow.objects.filter(window__gte=window_start(since)).values('endpoint')
+            .annotate(requests=Sum('requests'), seconds=Sum('seconds'), samples=Sum('samples'))
+            .order_by('-seconds'))
+
+
+def is_staff_request(request):
+    if 'Authorization' not in request.headers:
+        return False
+    api_request = Request(request)
+    for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            result = authenticator().authenticate(api_request)
+        except APIException:
+            return False
+        if result is not None:
+            return result[0].is_staff
+    return False
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sampled = random.random() < settings.PROFILING_SAMPLE_RATE
+        flagged = (not sampled and request.headers.get(settings.PROFILING_HEADER) == '1'
+                   and is_staff_request(request))
+        if not (sampled or flagged) or not _busy.acquire(blocking=False):
+            return self.get_response(request)
+
+        try:
+            sampler = StackSampler(threading.get_ident(), sys._getframe(), settings.PROFILING_INTERVAL,
+                                   settings.PROFILING_MAX_DEPTH)
+            started = time.perf_counter()
+            sampler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                stacks = sampler.stop()
+            elapsed = time.perf_counter() - started
+        finally:
+            _busy.release()
+
+        jobs.enqueue('record_profile', {'endpoint': endpoint_name(request), 'stacks': dict(stacks),
+                                        'seconds': elapsed, 'at': timezone.now().isoformat()})
+        return response
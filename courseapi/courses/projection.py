@@ -0,0 +1,66 @@
+from functools import lru_cache
+
+from django.db import models
+from rest_framework import serializers
+
+
+@lru_cache(maxsize=None)
+def heavy_fields(model):
+    return frozenset(f.name for f in model._meta.concrete_fields if isinstance(f, models.TextField))
+
+
+def _unwrap(field):
+    return field.child if isinstance(field, serializers.ListSerializer) else field
+
+
+def _deferred_paths(serializer, prefix=''):
+    model = serializer.Meta.model
+    reads = set()
+    paths = []
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            return []
+
+        name = field.source.split('.')[0]
+        reads.add(name)
+
+        nested = _unwrap(field)
+        if isinstance(nested, serializers.ModelSerializer) and '.' not in field.source:
+            relation = model._meta.get_field(name)
+            if relation.many_to_one or relation.one_to_one and relation.concrete:
+                paths += _deferred_paths(nested, f'{prefix}{name}__')
+
+    forced = getattr(serializer.Meta, 'projection_defer', ())
+    return [f'{prefix}{f}' for f in sorted((heavy_fields(model) - reads) | set(forced))] + paths
+
+
+@lru_cache(maxsize=None)
+def deferred_fields(serializer_class):
+    return tuple(_deferred_paths(serializer_class()))
+
+
+def project(queryset, serializer_class):
+    if getattr(getattr(serializer_class, 'Meta', None), 'model', None) is not queryset.model:
+        return queryset
+
+    related = queryset.query.select_related
+    paths = [p for p in deferred_fields(serializer_class) if '__' not in p or _is_selected(related, p)]
+    return queryset.defer(*paths) if paths else queryset
+
+
+def _is_selected(related, path):
+    if related is True:
+        return True
+    for name in path.split('__')[:-1]:
+        if not isinstance(related, dict) or name not in related:
+            return False
+        related = related[name]
+    return True
+
+
+class ProjectedQuerysetMixin:
+    def get_queryset(self):
+        return project(super().get_queryset(), self.get_serializer_class())
@@ -0,0 +1,203 @@
+import codecs
+import csv
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from courses import hashing
+from courses.caching import bump_version
+from courses.models import Student, Teacher, User
+
+PARSE_ERRORS = (ValueError, UnicodeDecodeError, csv.Error)
+
+PROFILE_FIELDS = {
+    User.Role.STUDENT: ('birth_date',),
+    User.Role.TEACHER: ('bio', 'work_place'),
+}
+
+
+class RosterRowSerializer(serializers.Serializer):
+    username = serializers.CharField(max_length=150, validators=[User.username_validator])
+    password = serializers.CharField(max_length=128)
+    email = serializers.EmailField(required=False, default='')
+    first_name = serializers.CharField(max_length=150, required=False, default='')
+    last_name = serializers.CharField(max_length=150, required=False, default='')
+    role = serializers.ChoiceField(choices=list(PROFILE_FIELDS), default=User.Role.STUDENT)
+    birth_date = serializers.DateField(required=False, default=None)
+    bio = serializers.CharField(required=False, default=None)
+    work_place = serializers.CharField(max_length=255, required=False, default=None)
+
+
+def read_roster(file):
+    if getattr(file, 'name', '').endswith('.json'):
+        return iter_json_array(file)
+    return csv.DictReader(codecs.iterdecode(file, 'utf-8-sig'))
+
+
+def iter_json_array(file, chunk_size=64 * 1024):
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer, expect = '', '['
+    while True:
+        chunk = file.read(chunk_size)
+        buffer += text.decode(chunk, final=not chunk)
+        while buffer := buffer.lstrip():
+            if expect == '[':
+                if buffer[0] != '[':
+                    raise ValueError("Tệp JSON phải là một danh sách")
+                buffer, expect = buffer[1:], 'first'
+            elif buffer[0] == ']' and expect in ('first', ','):
+                return
+            elif expect == ',':
+                if buffer[0] != ',':
+                    raise ValueError("Thiếu dấu phẩy giữa các phần tử JSON")
+                buffer, expect = buffer[1:], 'item'
+            else:
+                try:
+                    item, end = decoder.raw_decode(buffer)
+                except json.JSONDecodeError:
+                    if not chunk:
+                        raise
+                    break
+                if end == len(buffer) and chunk:
+                    break
+                yield item
+                buffer, expect = buffer[end:], ','
+        if not chunk:
+            raise ValueError("Tệp JSON kết thúc đột ngột")
+
+
+def clean_row(raw):
+    if not isinstance(raw, dict):
+        return {}
+    return {key.strip(): value.strip() if isinstance(value, str) else value
+            for key, value in raw.items() if key and value not in ('', None)}
+
+
+def insert_profiles(model, rows):
+    fields = model._meta.local_concrete_fields
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        connection.ops.quote_name(model._meta.db_table),
+        ', '.join(connection.ops.quote_name(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)))
+
+    params = []
+    for user, profile in rows:
+        profile = {**profile, model._meta.pk.attname: user.pk}
+        params.append([field.get_db_prep_save(profile[field.attname] if field.attname in profile
+                                              else field.get_default(), connection)
+                       for field in fields])
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def insert_users(rows):
+    now = timezone.now()
+    users = [User(username=data['username'], password=data['password'], email=data['email'],
+                  first_name=data['first_name'], last_name=data['last_name'], role=data['role'],
+                  date_joined=now)
+             for _, data in rows]
+    User.objects.bulk_create(users)
+
+    if any(user.pk is None for user in users):
+        ids = dict(User.objects.filter(username__in=[user.username for user in users])
+                   .values_list('username', 'pk'))
+        for user in users:
+            user.pk = ids[user.username]
+
+    profiles = {role: [] for role in PROFILE_FIELDS}
+    for user, (_, data) in zip(users, rows):
+        profiles[data['role']].append((user, {field: data[field] for field in PROFILE_FIELDS[data['role']]
+                                              if data[field] is not None}))
+
+    students = profiles[User.Role.STUDENT]
+    for (user, profile), code in zip(students, Student.allocate_codes(len(students))):
+        profile['student_code'] = code
+
+    if students:
+        insert_profiles(Student, students)
+    if profiles[User.Role.TEACHER]:
+        insert_profiles(Teacher, profiles[User.Role.TEACHER])
+    return [(user, profile.get('student_code')) for user, profile in students + profiles[User.Role.TEACHER]]
+
+
+def failed(number, username, errors):
+    return {'row': number, 'username': username, 'status': 'failed', 'errors': errors}
+
+
+def provision_batch(batch, seen):
+    results, valid = {}, []
+    for number, raw in batch:
+        serializer = RosterRowSerializer(data=clean_row(raw))
+        if not serializer.is_valid():
+            results[number] = failed(number, serializer.initial_data.get('username'), serializer.errors)
+            continue
+
+        data = serializer.validated_data
+        if data['username'] in seen:
+            results[number] = failed(number, data['username'],
+                                     {'username': ["Tên đăng nhập bị trùng trong danh sách."]})
+            continue
+        seen.add(data['username'])
+        valid.append((number, data))
+
+    for password, (_, data) in zip(hashing.make_passwords([data['password'] for _, data in valid]), valid):
+        data['password'] = password
+
+    for attempt in range(2):
+        existing = set(User.objects.filter(username__in=[data['username'] for _, data in valid])
+                       .values_list('username', flat=True))
+        rows = []
+        for number, data in valid:
+            if data['username'] in existing:
+                results[number] = failed(number, data['username'],
+                                         {'username': ["Tên đăng nhập đã tồn tại."]})
+            else:
+                rows.append((number, data))
+
+        try:
+            with transaction.atomic():
+                created = insert_users(rows) if rows else []
+            break
+        except IntegrityError as e:
+            created, error = [], str(e)
+    else:
+        for number, data in rows:
+            results[number] = failed(number, data['username'], {'non_field_errors': [error]})
+
+    numbers = {data['username']: number for number, data in rows}
+    for user, student_code in created:
+        number = numbers[user.username]
+        results[number] = {'row': number, 'username': user.username, 'status': 'created', 'id': user.pk,
+                           'role': user.role, 'student_code': student_code}
+    return [results[number] for number, _ in batch]
+
+
+def read_rows(rows, report):
+    number = 0
+    try:
+        for number, row in enumerate(rows, start=1):
+            yield row
+    except PARSE_ERRORS:
+        report['error'] = f"Tệp danh sách không đúng định dạng từ dòng {number + 1}; các dòng trước đó đã được xử lý."
+
+
+def provision(rows, batch_size=None):
+    batch_size = batch_size or settings.PROVISIONING_BATCH_SIZE
+
+    report = {'total': 0, 'created': 0, 'failed': 0, 'results': []}
+    numbered, seen = enumerate(read_rows(rows, report), start=1), set()
+    while batch := list(islice(numbered, batch_size)):
+        results = provision_batch(batch, seen)
+        report['results'].extend(results)
+        report['total'] += len(results)
+        report['created'] += sum(1 for result in results if result['status'] == 'created')
+
+    report['failed'] = report['total'] - report['created']
+    if any(result.get('role') == User.Role.TEACHER for result in report['results']):
+        bump_version('teacher')
+    return report
@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count
+
+from courses.models import Course, CourseNeighbor, Enrollment, Rating
+
+DEFAULT_WEIGHTS = {
+    'enrollment': 0.6,
+    'tag': 0.25,
+    'category': 0.15,
+    'rating': 0.2,
+}
+
+
+def _cosine(matrix):
+    import numpy as np
+    from scipy import sparse
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    normalized = sparse.diags(1.0 / norms) @ matrix
+    return (normalized @ normalized.T).tocsr()
+
+
+def _incidence(pairs, row_index, n_rows):
+    import numpy as np
+    from scipy import sparse
+
+    cols = {}
+    rows, columns = [], []
+    for row_key, col_key in pairs:
+        if row_key not in row_index:
+            continue
+        rows.append(row_index[row_key])
+        columns.append(cols.setdefault(col_key, len(cols)))
+
+    data = np.ones(len(rows), dtype=np.float32)
+    matrix = sparse.csr_matrix((data, (rows, columns)), shape=(n_rows, max(len(cols), 1)))
+    matrix.data[:] = 1.0
+    return matrix
+
+
+def build_similarity(top_k=20, weights=None):
+    import numpy as np
+
+    weights = {**DEFAULT_WEIGHTS, **getattr(settings, 'RECOMMENDATION_WEIGHTS', {}), **(weights or {})}
+
+    course_ids = list(Course.objects.active().order_by('id').values_list('id', flat=True))
+    index = {course_id: i for i, course_id in enumerate(course_ids)}
+    n = len(course_ids)
+    if n < 2:
+        return {}
+
+    enrollments = _incidence(
+        ((course_id, student_id) for student_id, course_id in
+         Enrollment.objects.values_list('student_id', 'course_id').iterator(chunk_size=5000)),
+        index, n)
+    tags = _incidence(Course.tags.through.objects.values_list('course_id', 'tag_id').iterator(), index, n)
+    categories = _incidence(Course.objects.active().values_list('id', 'category_id'), index, n)
+
+    similarity = (weights['enrollment'] * _cosine(enrollments)
+                  + weights['tag'] * _cosine(tags)
+                  + weights['category'] * categories @ categories.T).tocsr()
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+
+    quality = np.zeros(n, dtype=np.float64)
+    stats = Rating.objects.values('course_id').annotate(avg=Avg('rate'), total=Count('id'))
+    for row in stats:
+        if row['course_id'] in index:
+            confidence = row['total'] / (row['total'] + 5)
+            quality[index[row['course_id']]] = confidence * (row['avg'] - 3) / 2
+
+    neighbors = {}
+    for i in range(n):
+        start, end = similarity.indptr[i], similarity.indptr[i + 1]
+        if start == end:
+            continue
+        columns = similarity.indices[start:end]
+        scores = similarity.data[start:end] * (1 + weights['rating'] * quality[columns])
+        top = np.argsort(-scores)[:top_k]
+        neighbors[course_ids[i]] = [(course_ids[columns[j]], float(scores[j])) for j in top if scores[j] > 0]
+    return neighbors
+
+
+@transaction.atomic
+def store_neighbors(neighbors):
+    CourseNeighbor.objects.all().delete()
+    CourseNeighbor.objects.bulk_create(
+        [CourseNeighbor(course_id=course_id, neighbor_id=neighbor_id, score=score, rank=rank)
+         for course_id, items in neighbors.items()
+         for rank, (neighbor_id, score) in enumerate(items, start=1)],
+        batch_size=1000
+    )
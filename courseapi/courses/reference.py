@@ -0,0 +1,120 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+from rest_framework.response import Response
+
+from courses.caching import get_version, is_shared
+from courses.models import Category, Tag
+
+
+class SnapshotState:
+    def __init__(self, version, objects):
+        self.version = version
+        self.objects = objects
+        self.memo = {}
+        self.loaded = time.monotonic()
+
+    def expired(self):
+        return not is_shared() and time.monotonic() - self.loaded > settings.REFERENCE_SNAPSHOT_MAX_AGE
+
+    def remember(self, key, build):
+        if key not in self.memo:
+            self.memo[key] = build()
+        return self.memo[key]
+
+
+class Snapshot:
+    def __init__(self, model):
+        self.model = model
+        self.version_name = model._meta.model_name
+        self.state = None
+        self.lock = threading.Lock()
+
+    def current(self):
+        version = get_version(self.version_name)
+        state = self.state
+        if state is None or state.version != version or state.expired():
+            with self.lock:
+                state = self.state
+                if state is None or state.version != version or state.expired():
+                    objects = {obj.pk: obj for obj in self.model._default_manager.order_by('pk')}
+                    state = self.state = SnapshotState(version, objects)
+        return state
+
+    def clear(self):
+        self.state = None
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+categories = Snapshot(Category)
+tags = Snapshot(Tag)
+
+
+class SnapshotListMixin:
+    snapshot = None
+
+    def snapshot_items(self, objects):
+        return list(objects)
+
+    def list(self, request, *args, **kwargs):
+        state = self.snapshot.current()
+        data = state.remember(self.get_serializer_class(), lambda: list(
+            self.get_serializer(self.snapshot_items(state.objects.values()), many=True).data))
+        return self.conditional_response(request, {'total': len(data)}, lambda: Response(data))
+
+
+class SnapshotRelatedField(serializers.PrimaryKeyRelatedField):
+    def __init__(self, snapshot, **kwargs):
+        self.snapshot = snapshot
+        kwargs.setdefault('queryset', snapshot.model._default_manager.all())
+        super().__init__(**kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {key: value for key, value in kwargs.items() if key in MANY_RELATION_KWARGS}
+        return SnapshotManyRelatedField(child_relation=cls(*args, **kwargs), **list_kwargs)
+
+    def parse_pk(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.snapshot.model._meta.pk.to_python(data)
+        except (ValidationError, TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def resolve(self, pks):
+        objects = self.snapshot.current().objects
+        found = {pk: objects[pk] for pk in pks if pk in objects}
+        missing = set(pks) - found.keys()
+        if missing:
+            found.update(self.get_queryset().in_bulk(missing))
+        return found
+
+    def to_internal_value(self, data):
+        pk = self.parse_pk(data)
+        obj = self.resolve([pk]).get(pk)
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
+
+
+class SnapshotManyRelatedField(serializers.ManyRelatedField):
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        pks = [child.parse_pk(item) for item in data]
+        found = child.resolve(pks)
+        for item, pk in zip(data, pks):
+            if pk not in found:
+                child.fail('does_not_exist', pk_value=item)
+        return [found[pk] for pk in pks]
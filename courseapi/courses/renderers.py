@@ -0,0 +1,34 @@
+import itertools
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def stream_json(queryset, serializer_class, context=None, chunk_size=None):
+    chunk_size = chunk_size or getattr(settings, 'STREAMING_JSON_CHUNK_SIZE', 500)
+    encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+    yield b'['
+    chunk, first = [], True
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(obj)
+        if len(chunk) >= chunk_size:
+            yield render_chunk(encoder, serializer_class(chunk, many=True, context=context).data, first)
+            chunk, first = [], False
+    if chunk:
+        yield render_chunk(encoder, serializer_class(chunk, many=True, context=context).data, first)
+    yield b']'
+
+
+def render_chunk(encoder, data, first):
+    body = ','.join(encoder.encode(item) for item in data)
+    return (body if first else ',' + body).encode('utf-8')
+
+
+class StreamingJSONResponse(StreamingHttpResponse):
+    def __init__(self, queryset, serializer_class, context=None, chunk_size=None, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        stream = stream_json(queryset, serializer_class, context, chunk_size)
+        head = b''.join(itertools.islice(stream, 2))
+        super().__init__(itertools.chain([head], stream), **kwargs)
@@ -0,0 +1,125 @@
+import hashlib
+import math
+import re
+from html import escape
+from html.parser import HTMLParser
+
+from django.conf import settings
+from django.utils.text import Truncator
+
+RENDER_VERSION = 1
+
+ALLOWED_TAGS = {
+    'a': {'href', 'title', 'target'},
+    'b': set(), 'blockquote': set(), 'br': set(), 'code': set(), 'div': set(), 'em': set(),
+    'figcaption': set(), 'figure': set(), 'h1': set(), 'h2': set(), 'h3': set(), 'h4': set(),
+    'h5': set(), 'h6': set(), 'hr': set(), 'i': set(), 'li': set(), 'ol': {'start'}, 'p': set(),
+    'pre': set(), 's': set(), 'span': set(), 'strong': set(), 'sub': set(), 'sup': set(),
+    'table': set(), 'tbody': set(), 'td': {'colspan', 'rowspan'}, 'th': {'colspan', 'rowspan'},
+    'thead': set(), 'tr': set(), 'u': set(), 'ul': set(),
+    'img': {'src', 'alt', 'title', 'width', 'height'},
+    'iframe': {'src', 'width', 'height', 'allowfullscreen'},
+}
+VOID_TAGS = {'br', 'hr', 'img'}
+DROP_CONTENT_TAGS = {'script', 'style', 'noscript', 'template'}
+BLOCK_TAGS = {'p', 'div', 'br', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'pre'}
+
+SAFE_URL = re.compile(r'^(https?:|mailto:|/|#)', re.IGNORECASE)
+EMBED_URL = re.compile(r'^https://(www\.)?(youtube\.com|youtube-nocookie\.com|player\.vimeo\.com)/', re.IGNORECASE)
+CLOUDINARY_IMAGE = re.compile(r'^(https?://res\.cloudinary\.com/[^/]+/image/upload/)(?!(?:[a-z]{1,2}_[^/]+,?)+/)(.*)$')
+
+
+def content_hash(content):
+    return hashlib.sha256(f'{RENDER_VERSION}:{content}'.encode('utf-8')).hexdigest()
+
+
+def rewrite_image_url(src):
+    transformation = getattr(settings, 'LESSON_IMAGE_TRANSFORMATION', 'w_800,c_limit,q_auto,f_auto')
+    return CLOUDINARY_IMAGE.sub(lambda m: f'{m.group(1)}{transformation}/{m.group(2)}', src)
+
+
+class LessonHTMLParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.open_tags = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.skip_depth += 1
+            return
+        if self.skip_depth:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in ALLOWED_TAGS:
+            return
+
+        clean = []
+        for name, value in attrs:
+            if name not in ALLOWED_TAGS[tag] or value is None and name != 'allowfullscreen':
+                continue
+            if name in ('href', 'src'):
+                value = value.strip()
+                if not SAFE_URL.match(value):
+                    continue
+                if tag == 'iframe' and not EMBED_URL.match(value):
+                    return
+                if tag == 'img':
+                    value = rewrite_image_url(value)
+            clean.append(name if value is None else f'{name}="{escape(value)}"')
+
+        if tag == 'img':
+            clean.append('loading="lazy"')
+        if tag == 'a' and any(a.startswith('target=') for a in clean):
+            clean.append('rel="noopener noreferrer"')
+
+        self.html.append(f"<{tag}{''.join(' ' + a for a in clean)}>")
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.skip_depth = max(self.skip_depth - 1, 0)
+            return
+        if self.skip_depth or tag not in self.open_tags:
+            return
+        while self.open_tags:
+            current = self.open_tags.pop()
+            self.html.append(f'</{current}>')
+            if current == tag:
+                break
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        self.html.append(escape(data, quote=False))
+        self.text.append(data)
+
+    def close(self):
+        super().close()
+        while self.open_tags:
+            self.html.append(f'</{self.open_tags.pop()}>')
+
+
+def render(content):
+    parser = LessonHTMLParser()
+    parser.feed(content or '')
+    parser.close()
+
+    text = ' '.join(''.join(parser.text).split())
+    words = len(text.split())
+    wpm = getattr(settings, 'LESSON_READING_WPM', 200)
+
+    return {
+        'html': ''.join(parser.html),
+        'excerpt': Truncator(text).chars(getattr(settings, 'LESSON_EXCERPT_LENGTH', 200)),
+        'reading_time': math.ceil(words / wpm) if words else 0,
+    }
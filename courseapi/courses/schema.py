@@ -0,0 +1,103 @@
+import hashlib
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+from rest_framework import permissions
+
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'yaml': 'application/yaml',
+}
+
+_loaded = {}
+
+
+def api_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="Course API",
+        default_version='v1',
+        description="APIs for CourseApp",
+        contact=openapi.Contact(email="tranthinhuhanh17@gmail.com"),
+        license=openapi.License(name="Han@2026"),
+    )
+
+
+@lru_cache(maxsize=None)
+def drf_yasg_view(renderer=None):
+    from drf_yasg.views import get_schema_view
+
+    view = get_schema_view(api_info(), public=True, permission_classes=(permissions.AllowAny,))
+    if renderer is None:
+        return view.without_ui(cache_timeout=settings.SCHEMA_CACHE_TIMEOUT)
+    return view.with_ui(renderer, cache_timeout=settings.SCHEMA_CACHE_TIMEOUT)
+
+
+def generate(format):
+    from django.contrib.auth.models import AnonymousUser
+    from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+    from drf_yasg.generators import OpenAPISchemaGenerator
+    from rest_framework.test import APIRequestFactory
+    from rest_framework.views import APIView
+
+    request = APIView().initialize_request(APIRequestFactory().get('/swagger.json'))
+    request.user = AnonymousUser()
+    schema = OpenAPISchemaGenerator(api_info()).get_schema(request=request, public=True)
+    for key in ('host', 'schemes'):
+        schema.pop(key, None)
+
+    codec = OpenAPICodecJson if format == 'json' else OpenAPICodecYaml
+    return codec(validators=[]).encode(schema)
+
+
+def schema_path(format):
+    return os.path.join(settings.SCHEMA_ROOT, f'openapi.{format}')
+
+
+def load(format):
+    path = schema_path(format)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    cached = _loaded.get(format)
+    if cached is None or cached['mtime'] != mtime:
+        with open(path, 'rb') as f:
+            content = f.read()
+        cached = _loaded[format] = {
+            'mtime': mtime,
+            'content': content,
+            'etag': quote_etag(hashlib.sha256(content).hexdigest()[:32]),
+            'last_modified': mtime // 1_000_000_000,
+        }
+    return cached
+
+
+@require_safe
+def schema_view(request, format):
+    format = format.lstrip('.')
+    schema = load(format)
+    if schema is None:
+        return drf_yasg_view()(request, format=f'.{format}')
+
+    response = get_conditional_response(request, etag=schema['etag'], last_modified=schema['last_modified'])
+    if response is None:
+        response = HttpResponse(schema['content'], content_type=CONTENT_TYPES[format])
+    response['ETag'] = schema['etag']
+    response['Last-Modified'] = http_date(schema['last_modified'])
+    patch_cache_control(response, public=True, max_age=settings.SCHEMA_CACHE_TIMEOUT)
+    return response
+
+
+def ui_view(renderer):
+    def view(request, *args, **kwargs):
+        return drf_yasg_view(renderer)(request, *args, **kwargs)
+
+    return view
@@ -4,11 +4,31 @@ from django.db import transaction
 from rest_framework.exceptions import ValidationError
 
 from courses.models import Course, Category, Lesson, Tag, Teacher, Student, User, Like, LessonStatus
-from courses.models import Enrollment, Comment, Rating, Transaction
+from courses.models import Enrollment, Comment, Rating, Transaction, ExportJob
 from rest_framework import serializers
+from django.core.files.uploadedfile import UploadedFile
+from courses import jobs, tasks, reference
 import json
 
 
+class DeferredUploadMixin:
+    deferred_upload_fields = ()
+
+    def save(self, **kwargs):
+        if not jobs.enabled():
+            return super().save(**kwargs)
+
+        uploads = {}
+        for field in self.deferred_upload_fields:
+            if isinstance(self.validated_data.get(field), UploadedFile):
+                uploads[field] = self.validated_data.pop(field)
+
+        instance = super().save(**kwargs)
+        for field, uploaded_file in uploads.items():
+            tasks.defer_upload(instance, field, uploaded_file)
+        return instance
+
+
 class ImageSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         data = super().to_representation(instance)
@@ -24,9 +44,9 @@ class ImageSerializer(serializers.ModelSerializer):
 class AvatarSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        if instance.image and hasattr(instance.image, 'url'):
+        if instance.avatar and hasattr(instance.avatar, 'url'):
 
-            data['avatar'] = instance.image.url
+            data['avatar'] = instance.avatar.url
         else:
             data['avatar'] = None 
             
@@ -65,9 +85,10 @@ class CourseSerializer(ImageSerializer):
         ]
 
 
-class CourseCreateSerializer(CourseSerializer):
-    tags = serializers.PrimaryKeyRelatedField(many=True, queryset=Tag.objects.all(), required=False)
-    category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all())
+class CourseCreateSerializer(DeferredUploadMixin, CourseSerializer):
+    deferred_upload_fields = ('image',)
+    tags = reference.SnapshotRelatedField(reference.tags, many=True, required=False)
+    category = reference.SnapshotRelatedField(reference.categories)
     instructor = serializers.ReadOnlyField(source='instructor.id')
     image = serializers.ImageField(required=False)
 
@@ -104,21 +125,44 @@ class CourseCreateSerializer(CourseSerializer):
 class LessonSerializer(serializers.ModelSerializer):
     class Meta:
         model = Lesson
-        fields = 'id', 'subject', 'created_date'
+        fields = 'id', 'subject', 'created_date', 'excerpt', 'reading_time', 'comment_count', 'position'
+
+class LessonLinkSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Lesson
+        fields = 'id', 'subject'
+
+class LessonMoveSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    after = serializers.IntegerField(allow_null=True, required=False, default=None)
+
+class LessonReorderSerializer(serializers.Serializer):
+    moves = LessonMoveSerializer(many=True, allow_empty=False)
+
+class RenderedContentField(serializers.CharField):
+    def get_attribute(self, instance):
+        if instance.rendered_id:
+            return instance.rendered.html
+        return super().get_attribute(instance)
 
 class LessonDetailSerializer(LessonSerializer):
     tags = TagSerializer(many=True)
+    content = RenderedContentField()
+    prev_lesson = LessonLinkSerializer(read_only=True)
+    next_lesson = LessonLinkSerializer(read_only=True)
     class Meta:
         model = LessonSerializer.Meta.model
-        fields = LessonSerializer.Meta.fields + ('tags','content')
+        fields = LessonSerializer.Meta.fields + ('tags','content', 'prev_lesson', 'next_lesson')
+        projection_defer = ('content',)
 
 class LessonCreateSerializer(serializers.ModelSerializer):
-    tags = serializers.PrimaryKeyRelatedField(many=True, queryset=Tag.objects.all(), required=False)
+    tags = reference.SnapshotRelatedField(reference.tags, many=True, required=False)
 
     class Meta(LessonSerializer.Meta):
         fields = LessonSerializer.Meta.fields + ('content', 'tags')
         extra_kwargs = {
             'created_date': {'read_only': True},
+            'position': {'read_only': True},
         }
 
     def create(self, validated_data):
@@ -142,8 +186,8 @@ class StudentSerializer(serializers.ModelSerializer):
         read_only_fields = ('student_code',)
 
 
-class UserSerializer(AvatarSerializer):
-
+class UserSerializer(DeferredUploadMixin, AvatarSerializer):
+    deferred_upload_fields = ('avatar',)
     teacher = TeacherSerializer(required=False)
     student = StudentSerializer(required=False)
 
@@ -253,6 +297,14 @@ class CommentSerializer(UserDataSerializer):
             }
         }
 
+class CommentCreateSerializer(serializers.ModelSerializer):
+    user = ChatUserSerializer(read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ['id', 'content', 'created_date', 'user']
+
+
 class LikeSerializer(serializers.ModelSerializer):
     student = serializers.SerializerMethodField()
 
@@ -277,6 +329,32 @@ class EnrollmentSerializer(serializers.ModelSerializer):
            fields = ['id', 'course','student','created_date', 'progress', 'is_completed']
 
 
+class CourseSummarySerializer(ImageSerializer):
+    total_likes = serializers.IntegerField(read_only=True)
+    avg_rating = serializers.FloatField(read_only=True)
+    instructor_name = serializers.CharField(source='instructor.get_full_name', read_only=True)
+
+    class Meta:
+        model = Course
+        fields = ['id', 'name', 'image', 'duration', 'fee', 'instructor_name',
+                  'total_likes', 'avg_rating', 'updated_date']
+
+
+class DashboardSerializer(serializers.ModelSerializer):
+    course = CourseSummarySerializer(read_only=True)
+    last_activity = serializers.DateTimeField(read_only=True)
+    next_lesson = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Enrollment
+        fields = ['id', 'course', 'progress', 'is_completed', 'last_activity', 'next_lesson', 'created_date']
+
+    def get_next_lesson(self, obj):
+        if obj.next_lesson_id is None:
+            return None
+        return {"id": obj.next_lesson_id, "subject": obj.next_lesson_subject}
+
+
 class RatingSerializer(serializers.ModelSerializer):
     course = CourseSerializer(read_only=True)
     class Meta:
@@ -300,4 +378,31 @@ class LecturerStatsSerializer(serializers.Serializer):
 
 class MonthlyRevenueSerializer(serializers.Serializer):
     month = serializers.DateTimeField(format="%Y-%m")
-    monthly_revenue = serializers.DecimalField(max_digits=12, decimal_places=2)
\ No newline at end of file
+    monthly_revenue = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    progress = serializers.ReadOnlyField()
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = ['id', 'report', 'format', 'date_from', 'date_to', 'instructor', 'pay_method', 'status',
+                  'progress', 'processed_rows', 'total_rows', 'error', 'created_date', 'finished_date',
+                  'download_url']
+        read_only_fields = ['status', 'processed_rows', 'total_rows', 'error', 'finished_date']
+
+    def get_download_url(self, obj):
+        if not obj.file:
+            return None
+        request = self.context.get('request')
+        url = f'/exports/{obj.pk}/download/'
+        return request.build_absolute_uri(url) if request else url
+
+    def validate(self, attrs):
+        if attrs.get('date_from') and attrs.get('date_to') and attrs['date_from'] > attrs['date_to']:
+            raise ValidationError({"date_to": "Ngày kết thúc phải sau ngày bắt đầu"})
+
+        request = self.context.get('request')
+        if request and not request.user.is_staff:
+            attrs['instructor'] = request.user.teacher
+        return attrs
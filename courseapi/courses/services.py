@@ -1,12 +1,20 @@
+from django.conf import settings
 from django.db import transaction
-from django.db.models import Count, Sum, Q, DecimalField
-from django.db.models.functions import Coalesce, TruncMonth, TruncQuarter, TruncYear
-from rest_framework.exceptions import PermissionDenied
+from django.db.models import Count, Sum, Q, DecimalField, Avg, Max, Exists, OuterRef, Subquery, Prefetch
+from django.db.models import FilteredRelation, FloatField, IntegerField, Min
+from django.db.models.functions import Coalesce, Greatest, TruncMonth, TruncQuarter, TruncYear
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
 from rest_framework import status
+from collections import Counter
 from decimal import Decimal
-from .models import Course, Enrollment, Transaction, User
-from . import serializers
+from .models import Course, Enrollment, Transaction, User, Like, Rating, Lesson, LessonStatus, CourseNeighbor
+from .models import Comment, LecturerReport, adjust_comment_counts
+from .caching import bump_version
+from . import jobs, partitioning, serializers, tasks
+from .projection import project
 
 
 class CreateServices:
@@ -29,17 +37,68 @@ class CreateServices:
 
 
 class CourseService:
+    @staticmethod
+    def with_stats(courses, student=None):
+        likes = Like.objects.active().filter(course=OuterRef('pk')).order_by().values('course')
+        ratings = Rating.objects.filter(course=OuterRef('pk')).order_by().values('course')
+
+        courses = courses.select_related('instructor').annotate(
+            total_likes=Coalesce(Subquery(likes.annotate(c=Count('pk')).values('c')), 0,
+                                 output_field=IntegerField()),
+            avg_rating=Coalesce(Subquery(ratings.annotate(a=Avg('rate')).values('a')), 0.0,
+                                output_field=FloatField())
+        )
+        if student is not None:
+            courses = courses.annotate(
+                is_liked_by_me=Exists(Like.objects.active().filter(course=OuterRef('pk'), student=student)),
+                is_enrolled_by_me=Exists(Enrollment.objects.filter(course=OuterRef('pk'), student=student))
+            )
+        return courses
+
     @staticmethod
     def get_my_courses(user):
         if user.role == User.Role.TEACHER:
-            courses = Course.objects.filter(instructor=user.teacher, active=True)
-            serializer = serializers.CourseSerializer(courses, many=True)
-            return serializer.data, status.HTTP_200_OK
+            courses = CourseService.with_stats(Course.objects.active().filter(instructor=user.teacher))
+            return project(courses.prefetch_related('tags'), serializers.CourseSerializer), serializers.CourseSerializer
 
         else:
-            enrollments = Enrollment.objects.filter(student=user.student)
-            serializer = serializers.EnrollmentSerializer(enrollments, many=True)
-            return serializer.data, status.HTTP_200_OK
+            courses = CourseService.with_stats(Course.objects.prefetch_related('tags'), user.student)
+            enrollments = Enrollment.objects.filter(student=user.student).prefetch_related(
+                Prefetch('course', queryset=project(courses, serializers.CourseSerializer)))
+            return enrollments, serializers.EnrollmentSerializer
+
+    @staticmethod
+    def get_dashboard(user, updated_since=None):
+        student = getattr(user, 'student', None)
+        if not student:
+            raise PermissionDenied("Chỉ học sinh mới có bảng điều khiển học tập")
+
+        completed = LessonStatus.objects.filter(student=student, lesson=OuterRef('pk'), is_completed=True)
+        next_lessons = (Lesson.objects.active().filter(course=OuterRef('course'))
+                        .exclude(Exists(completed)).order_by('position', 'id'))
+        activity = (LessonStatus.objects.filter(student=student, lesson__course=OuterRef('course'))
+                    .order_by().values('lesson__course').annotate(m=Max('updated_date')).values('m'))
+
+        courses = CourseService.with_stats(Course.objects.defer('description'))
+        enrollments = (Enrollment.objects.filter(student=student)
+                       .annotate(last_activity=Greatest('updated_date', Coalesce(Subquery(activity), 'updated_date')),
+                                 next_lesson_id=Subquery(next_lessons.values('id')[:1]),
+                                 next_lesson_subject=Subquery(next_lessons.values('subject')[:1]))
+                       .prefetch_related(Prefetch('course', queryset=courses))
+                       .order_by('-last_activity'))
+
+        if updated_since:
+            since = parse_datetime(updated_since)
+            if since is None:
+                raise ValidationError({"updated_since": "Thời gian không hợp lệ (định dạng ISO 8601)."})
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            enrollments = enrollments.filter(Q(last_activity__gte=since) | Q(course__updated_date__gte=since))
+
+        return {
+            "server_time": timezone.now(),
+            "results": serializers.DashboardSerializer(enrollments, many=True).data
+        }
 
     @staticmethod
     def enroll_student_to_course(user, course, pay_method):
@@ -47,7 +106,8 @@ class CourseService:
         if not student:
             raise PermissionDenied("Chỉ học sinh mới được đăng ký khóa học")
 
-        if Enrollment.objects.filter(student=student, course=course).exists():
+        if Enrollment.objects.filter(partitioning.created_since(course),
+                                     student=student, course=course).exists():
             return {"detail": "Bạn đã đăng ký khóa học này rồi."}, status.HTTP_400_BAD_REQUEST
 
         with transaction.atomic():
@@ -75,16 +135,45 @@ class CourseService:
             return response_data, status.HTTP_201_CREATED
 
 
+class RecommendationService:
+    @staticmethod
+    def get_similar_courses(course_id, student=None):
+        courses = (Course.objects.active().filter(neighbor_of__course_id=course_id)
+                   .order_by('neighbor_of__rank'))
+        return CourseService.with_stats(courses, student)
+
+    @staticmethod
+    def get_recommendations(student, limit=10):
+        enrolled = list(Enrollment.objects.filter(student=student).values_list('course_id', flat=True))
+        scores = list(CourseNeighbor.objects.filter(course_id__in=enrolled)
+                      .exclude(neighbor_id__in=enrolled)
+                      .values('neighbor_id').annotate(total=Sum('score'))
+                      .order_by('-total').values_list('neighbor_id', flat=True)[:limit])
+
+        courses = CourseService.with_stats(Course.objects.active().filter(pk__in=scores), student)
+        return sorted(courses, key=lambda c: scores.index(c.pk))
+
+
+REPORT_PERIODS = ('month', 'quarter', 'year')
+
+
 class LecturerReportService:
+    @staticmethod
+    def pruning_floor(teacher):
+        return Course.objects.filter(instructor=teacher).aggregate(first=Min('created_date'))['first']
+
     @staticmethod
     def get_financial_stats(teacher):
+        floor = LecturerReportService.pruning_floor(teacher)
         return Course.objects.filter(instructor=teacher).annotate(
-            total_students=Count('enrollments', distinct=True),
+            recent=FilteredRelation('enrollments', condition=partitioning.created_since(floor, prefix='enrollments__')),
+            paid=FilteredRelation('recent__payment',
+                                  condition=Q(recent__payment__status=True) &
+                                  partitioning.created_since(floor, prefix='recent__payment__'))
+        ).annotate(
+            total_students=Count('recent', distinct=True),
             total_revenue=Coalesce(
-                Sum(
-                    'enrollments__payment__amount',
-                    filter=Q(enrollments__payment__status=True)
-                ),
+                Sum('paid__amount'),
                 Decimal('0.0'),
                 output_field=DecimalField(max_digits=12, decimal_places=2) 
             )
@@ -99,11 +188,106 @@ class LecturerReportService:
             'year': TruncYear('created_date')
         }.get(period, TruncMonth('created_date'))
 
+        floor = LecturerReportService.pruning_floor(teacher)
         return Transaction.objects.filter(
+            partitioning.created_since(floor),
+            partitioning.created_since(floor, prefix='enrollment__'),
             enrollment__course__instructor=teacher,
             status=True
         ).annotate(
             time_mark=trunc_func 
         ).values('time_mark').annotate(
             total_revenue=Sum('amount', output_field=DecimalField(max_digits=12, decimal_places=2))
-        ).order_by('-time_mark')
\ No newline at end of file
+        ).order_by('-time_mark')
+    @staticmethod
+    def build_report(teacher, period='month'):
+        by_courses = list(LecturerReportService.get_financial_stats(teacher))
+        by_periods = list(LecturerReportService.get_revenue_stats(teacher, period))
+
+        return {
+            "summary": {
+                "grand_total_revenue": sum(item['total_revenue'] for item in by_courses),
+                "total_students": sum(item['total_students'] for item in by_courses),
+                "period_viewing": period
+            },
+            "stats_by_courses": by_courses,
+            "stats_by_time": by_periods,
+            "generated_at": timezone.now()
+        }
+
+    @staticmethod
+    def get_report(teacher, period='month'):
+        period = period if period in REPORT_PERIODS else 'month'
+        if not jobs.enabled():
+            return LecturerReportService.build_report(teacher, period)
+
+        stored = LecturerReport.objects.filter(teacher=teacher, period=period).first()
+        if stored is None:
+            return tasks.refresh_lecturer_stats(teacher.pk, period)
+
+        age = (timezone.now() - stored.generated_date).total_seconds()
+        if age > settings.LECTURER_STATS_TTL:
+            jobs.enqueue('refresh_lecturer_stats', {'teacher_id': teacher.pk, 'period': period},
+                         dedup_key=f'lecturer-stats:{teacher.pk}:{period}')
+        return stored.data
+
+
+class CommentService:
+    @staticmethod
+    @transaction.atomic
+    def hide(comments):
+        rows = list(comments.select_for_update().active().values_list('id', 'lesson_id'))
+        if not rows:
+            return 0
+
+        Comment.objects.filter(id__in=[comment_id for comment_id, _ in rows]).update(active=False,
+                                                                                    updated_date=timezone.now())
+        adjust_comment_counts({lesson_id: -count for lesson_id, count in
+                               Counter(lesson_id for _, lesson_id in rows).items()})
+        bump_version('comment')
+        return len(rows)
+
+
+class LessonService:
+    @staticmethod
+    def position_between(before, after):
+        low = before.position if before else 0
+        high = after.position if after else low + 2 * settings.LESSON_POSITION_GAP
+        return low + (high - low) // 2 if high - low > 1 else None
+
+    @staticmethod
+    @transaction.atomic
+    def reorder(course, moves):
+        lessons = {lesson.pk: lesson for lesson in
+                   course.lessons.active().select_for_update().order_by('position', 'id').only('id', 'position')}
+        order = list(lessons)
+        original = {pk: lesson.position for pk, lesson in lessons.items()}
+
+        for move in moves:
+            lesson_id, after_id = move['id'], move.get('after')
+            if lesson_id not in lessons or (after_id is not None and after_id not in lessons) \
+                    or lesson_id == after_id:
+                raise ValidationError({"moves": f"Bài học không hợp lệ: {move}"})
+
+            order.remove(lesson_id)
+            index = order.index(after_id) + 1 if after_id is not None else 0
+            order.insert(index, lesson_id)
+
+            before = lessons[order[index - 1]] if index else None
+            after = lessons[order[index + 1]] if index + 1 < len(order) else None
+            position = LessonService.position_between(before, after)
+            if position is not None:
+                lessons[lesson_id].position = position
+            else:
+                for number, pk in enumerate(order, start=1):
+                    lessons[pk].position = number * settings.LESSON_POSITION_GAP
+
+        now = timezone.now()
+        changed = [lesson for pk, lesson in lessons.items() if lesson.position != original[pk]]
+        for lesson in changed:
+            lesson.updated_date = now
+        if changed:
+            Lesson.objects.bulk_update(changed, ['position', 'updated_date'])
+            Lesson.relink(course.pk)
+            bump_version('lesson')
+        return order
@@ -0,0 +1,77 @@
+import os
+import uuid
+
+import cloudinary.uploader
+from django.apps import apps
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from courses import jobs
+from courses.models import Course, Enrollment, LecturerReport, Lesson, Teacher
+
+
+@jobs.task('update_course_duration')
+def update_course_duration(course_id):
+    course = Course.objects.filter(pk=course_id).first()
+    if course:
+        course.update_duration()
+
+
+@jobs.task('update_enrollment_progress')
+def update_enrollment_progress(enrollment_id):
+    enrollment = Enrollment.objects.select_related('course', 'student').filter(pk=enrollment_id).first()
+    if enrollment:
+        enrollment.update_progress()
+
+
+@jobs.task('upload_image')
+def upload_image(model, pk, field, path):
+    model = apps.get_model(model)
+    result = cloudinary.uploader.upload(path)
+    model.objects.filter(pk=pk).update(**{field: result['public_id']})
+    os.remove(path)
+
+
+@jobs.task('refresh_lecturer_stats')
+def refresh_lecturer_stats(teacher_id, period):
+    from courses.services import LecturerReportService
+
+    teacher = Teacher.objects.get(pk=teacher_id)
+    report = LecturerReportService.build_report(teacher, period)
+    LecturerReport.objects.update_or_create(teacher=teacher, period=period,
+                                            defaults={'data': report, 'generated_date': report['generated_at']})
+    return report
+
+
+def defer_upload(instance, field, uploaded_file):
+    spool_dir = settings.JOBS_SPOOL_DIR
+    os.makedirs(spool_dir, exist_ok=True)
+    path = os.path.join(spool_dir, f'{uuid.uuid4().hex}_{os.path.basename(uploaded_file.name)}')
+    with open(path, 'wb') as f:
+        for chunk in uploaded_file.chunks():
+            f.write(chunk)
+
+    label = instance._meta.label
+    payload = {'model': label, 'pk': instance.pk, 'field': field, 'path': path}
+    dedup_key = f'upload:{label}:{instance.pk}:{field}'
+    job = jobs.enqueue('upload_image', payload, dedup_key=dedup_key)
+    while job is not None and job.payload != payload:
+        previous = jobs.replace_pending(dedup_key, payload)
+        if previous is not None:
+            remove_spooled(previous['path'])
+            break
+        job = jobs.enqueue('upload_image', payload, dedup_key=dedup_key)
+
+
+def remove_spooled(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@receiver([post_save, post_delete], sender=Lesson)
+def update_course_duration_on_lesson_change(sender, instance, **kwargs):
+    jobs.enqueue('update_course_duration', {'course_id': instance.course_id},
+                 dedup_key=f'course-duration:{instance.course_id}')
@@ -0,0 +1,365 @@
+import bisect
+import contextvars
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache.backends import locmem, redis
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.core.signals import setting_changed
+from django.db import connections
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_safe
+
+from courses import hashing
+
+logger = logging.getLogger('courses.telemetry')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+PHASES = ('db', 'serialize', 'render', 'other')
+
+re_string = re.compile(r"'(?:[^']|'')*'")
+re_number = re.compile(r'\b\d+(?:\.\d+)?\b')
+re_in_list = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+re_values = re.compile(r'\bVALUES\s*(\([^()]*\))(?:\s*,\s*\([^()]*\))+', re.IGNORECASE)
+re_space = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    sql = re_string.sub('?', sql.replace('%s', '?'))
+    sql = re_number.sub('?', sql)
+    sql = re_in_list.sub('IN (...)', sql)
+    sql = re_values.sub(r'VALUES \1, ...', sql)
+    return re_space.sub(' ', sql).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = {}
+            self.phases = {}
+            self.sampled = {}
+            self.queries = {}
+            self.cache = {}
+            self.slow = {}
+            self.samples = deque(maxlen=settings.TELEMETRY_SLOW_QUERY_SAMPLES)
+
+    def observe(self, endpoint, method, status, seconds):
+        key = (endpoint, method, str(status))
+        with self.lock:
+            entry = self.requests.get(key)
+            if entry is None:
+                buckets = tuple(settings.TELEMETRY_LATENCY_BUCKETS)
+                entry = self.requests[key] = {'buckets': buckets, 'counts': [0] * (len(buckets) + 1),
+                                              'sum': 0.0, 'count': 0}
+            entry['counts'][bisect.bisect_left(entry['buckets'], seconds)] += 1
+            entry['sum'] += seconds
+            entry['count'] += 1
+
+    def record_phases(self, endpoint, phases, queries):
+        with self.lock:
+            self.sampled[endpoint] = self.sampled.get(endpoint, 0) + 1
+            self.queries[endpoint] = self.queries.get(endpoint, 0) + queries
+            for phase, seconds in phases.items():
+                self.phases[endpoint, phase] = self.phases.get((endpoint, phase), 0.0) + seconds
+
+    def record_cache(self, namespace, hit):
+        key = (namespace, 'hit' if hit else 'miss')
+        with self.lock:
+            self.cache[key] = self.cache.get(key, 0) + 1
+
+    def record_slow_query(self, endpoint, sql, seconds):
+        normalized = normalize_sql(sql)
+        key = fingerprint(normalized)
+        with self.lock:
+            entry = self.slow.setdefault(key, {'sql': normalized, 'count': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            entry['count'] += 1
+            entry['seconds'] += seconds
+            entry['max_seconds'] = max(entry['max_seconds'], seconds)
+            self.samples.append({'fingerprint': key, 'sql': normalized, 'endpoint': endpoint,
+                                 'duration_ms': round(seconds * 1000, 3), 'at': time.time()})
+        return key, normalized
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'requests': {key: {**entry, 'counts': list(entry['counts'])} for key, entry in self.requests.items()},
+                'phases': dict(self.phases),
+                'sampled': dict(self.sampled),
+                'queries': dict(self.queries),
+                'cache': dict(self.cache),
+                'slow': {key: dict(entry) for key, entry in self.slow.items()},
+                'samples': list(self.samples),
+            }
+
+
+registry = Registry()
+
+
+class RequestTimer:
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.slow = []
+        self.view_started = self.view_db = None
+        self.view_seconds = self.render_started = None
+        self.render_seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.db_seconds += elapsed
+            self.queries += 1
+            if elapsed * 1000 >= settings.TELEMETRY_SLOW_QUERY_MS:
+                self.slow.append((sql, elapsed))
+
+    def start_view(self):
+        self.view_started = time.perf_counter()
+        self.view_db = self.db_seconds
+
+    def end_view(self):
+        if self.view_started is not None and self.view_seconds is None:
+            self.view_seconds = time.perf_counter() - self.view_started
+            self.view_db = self.db_seconds - self.view_db
+
+    def start_render(self):
+        self.end_view()
+        self.render_started = time.perf_counter()
+
+    def end_render(self, response):
+        if self.render_started is not None:
+            self.render_seconds = time.perf_counter() - self.render_started
+
+    def phases(self, total):
+        self.end_view()
+        serialize = max(0.0, (self.view_seconds or 0.0) - (self.view_db or 0.0))
+        return {
+            'db': self.db_seconds,
+            'serialize': serialize,
+            'render': self.render_seconds,
+            'other': max(0.0, total - self.db_seconds - serialize - self.render_seconds),
+        }
+
+
+def endpoint_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else 'unmatched'
+
+
+class TelemetryMiddleware:
+    def __init__(self, get_response):
+        if not settings.TELEMETRY_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        if random.random() >= settings.TELEMETRY_SAMPLE_RATE:
+            response = self.get_response(request)
+            registry.observe(endpoint_name(request), request.method, response.status_code,
+                             time.perf_counter() - started)
+            return response
+
+        timer = request._telemetry = RequestTimer()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(timer))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        endpoint = endpoint_name(request)
+        phases = timer.phases(elapsed)
+        registry.observe(endpoint, request.method, response.status_code, elapsed)
+        registry.record_phases(endpoint, phases, timer.queries)
+        logger.info('request', extra={'telemetry': {
+            'endpoint': endpoint, 'method': request.method, 'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 3), 'queries': timer.queries,
+            **{f'{phase}_ms': round(seconds * 1000, 3) for phase, seconds in phases.items()},
+        }})
+        for sql, seconds in timer.slow:
+            key, normalized = registry.record_slow_query(endpoint, sql, seconds)
+            logger.warning('slow_query', extra={'telemetry': {
+                'endpoint': endpoint, 'fingerprint': key, 'sql': normalized,
+                'duration_ms': round(seconds * 1000, 3),
+            }})
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timer = getattr(request, '_telemetry', None)
+        if timer is not None:
+            timer.start_view()
+
+    def process_template_response(self, request, response):
+        timer = getattr(request, '_telemetry', None)
+        if timer is not None:
+            timer.start_render()
+            response.add_post_render_callback(timer.end_render)
+        return response
+
+
+_counting = contextvars.ContextVar('telemetry_cache_counting', default=True)
+_missing = object()
+
+
+def cache_namespace(key):
+    return str(key).partition(':')[0]
+
+
+class InstrumentedCacheMixin:
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        if settings.TELEMETRY_ENABLED and _counting.get():
+            registry.record_cache(cache_namespace(key), value is not _missing)
+        return default if value is _missing else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        token = _counting.set(False)
+        try:
+            found = super().get_many(keys, version)
+        finally:
+            _counting.reset(token)
+        if settings.TELEMETRY_ENABLED:
+            for key in keys:
+                registry.record_cache(cache_namespace(key), key in found)
+        return found
+
+
+class LocMemCache(InstrumentedCacheMixin, locmem.LocMemCache):
+    pass
+
+
+class RedisCache(InstrumentedCacheMixin, redis.RedisCache):
+    pass
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': record.getMessage(),
+            **getattr(record, 'telemetry', {}),
+        }
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class RotatingFileHandler(logging.handlers.RotatingFileHandler):
+    def __init__(self, filename, *args, setting=None, **kwargs):
+        os.makedirs(os.path.dirname(os.fspath(filename)), exist_ok=True)
+        super().__init__(filename, *args, **kwargs)
+        self.setting = setting
+        if setting:
+            setting_changed.connect(self.follow_setting)
+
+    def follow_setting(self, setting, value, **kwargs):
+        if setting != self.setting:
+            return
+        with self.lock:
+            self.close()
+            os.makedirs(os.path.dirname(os.fspath(value)), exist_ok=True)
+            self.baseFilename = os.path.abspath(value)
+
+
+def escape_label(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def format_labels(**labels):
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels.items()) + '}'
+
+
+def format_value(value):
+    return '+Inf' if value == float('inf') else repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def exposition():
+    data = registry.snapshot()
+    lines = []
+
+    def family(name, kind, description, samples):
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        for suffix, labels, value in samples:
+            lines.append(f'{name}{suffix}{format_labels(**labels)} {format_value(value)}')
+
+    histogram = []
+    for (endpoint, method, status), entry in sorted(data['requests'].items()):
+        labels = {'endpoint': endpoint, 'method': method, 'status': status}
+        cumulative = 0
+        for bound, count in zip((*entry['buckets'], float('inf')), entry['counts']):
+            cumulative += count
+            histogram.append(('_bucket', {**labels, 'le': format_value(float(bound))}, cumulative))
+        histogram.append(('_sum', labels, entry['sum']))
+        histogram.append(('_count', labels, entry['count']))
+    family('courseapi_request_duration_seconds', 'histogram', 'Request latency by endpoint.', histogram)
+
+    family('courseapi_sampled_requests_total', 'counter', 'Requests with a phase breakdown.',
+           [('', {'endpoint': endpoint}, count) for endpoint, count in sorted(data['sampled'].items())])
+    family('courseapi_request_phase_seconds_total', 'counter', 'Time spent per phase in sampled requests.',
+           [('', {'endpoint': endpoint, 'phase': phase}, seconds)
+            for (endpoint, phase), seconds in sorted(data['phases'].items())])
+    family('courseapi_db_queries_total', 'counter', 'Queries executed in sampled requests.',
+           [('', {'endpoint': endpoint}, count) for endpoint, count in sorted(data['queries'].items())])
+    family('courseapi_cache_requests_total', 'counter', 'Cache lookups by key namespace.',
+           [('', {'namespace': namespace, 'result': result}, count)
+            for (namespace, result), count in sorted(data['cache'].items())])
+
+    slow = sorted(data['slow'].items())
+    family('courseapi_slow_queries_total', 'counter', 'Slow queries by SQL fingerprint.',
+           [('', {'fingerprint': key}, entry['count']) for key, entry in slow])
+    family('courseapi_slow_query_seconds_total', 'counter', 'Time spent in slow queries by SQL fingerprint.',
+           [('', {'fingerprint': key}, entry['seconds']) for key, entry in slow])
+
+    hashes = sorted(hashing.metrics.snapshot().items())
+    family('courseapi_password_hash_total', 'counter', 'Password hash operations.',
+           [('', {'operation': operation}, entry['count']) for operation, entry in hashes])
+    family('courseapi_password_hash_rejected_total', 'counter', 'Password hash operations rejected when busy.',
+           [('', {'operation': operation}, entry['rejected']) for operation, entry in hashes])
+    family('courseapi_password_hash_seconds_total', 'counter', 'Password hash time by stage.',
+           [('', {'operation': operation, 'stage': stage}, entry[f'{stage}_seconds'])
+            for operation, entry in hashes for stage in ('wait', 'run')])
+
+    return '\n'.join(lines) + '\n'
+
+
+def can_scrape(request):
+    token = settings.TELEMETRY_METRICS_TOKEN
+    if token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    if request.META.get('REMOTE_ADDR') in settings.TELEMETRY_METRICS_ALLOWED_IPS:
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_staff)
+
+
+@require_safe
+def metrics_view(request):
+    if not can_scrape(request):
+        raise PermissionDenied
+    return HttpResponse(exposition(), content_type=CONTENT_TYPE)
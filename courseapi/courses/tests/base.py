@@ -0,0 +1,56 @@
+import os
+import tempfile
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from courses.models import Category, Course, Enrollment, Lesson, Student, Teacher, User
+
+PASSWORD = '123456'
+TELEMETRY_LOG_FILE = os.path.join(tempfile.gettempdir(), 'courseapi-tests', 'telemetry.log')
+
+
+def make_teacher(username='gv', **extra):
+    return Teacher.objects.create_user(username=username, password=PASSWORD, is_verified=True, **extra)
+
+
+def make_student(username='sv', **extra):
+    return Student.objects.create_user(username=username, password=PASSWORD, **extra)
+
+
+def make_admin(username='admin'):
+    return User.objects.create_superuser(username=username, password=PASSWORD, role=User.Role.ADMIN)
+
+
+def make_course(instructor, category=None, name='Nhập môn phần mềm', **extra):
+    category = category or Category.objects.create(name='Công nghệ phần mềm')
+    return Course.objects.create(name=name, category=category, instructor=instructor, **extra)
+
+
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(User.objects.get(pk=user.pk))
+    return client
+
+
+@override_settings(TELEMETRY_LOG_FILE=TELEMETRY_LOG_FILE)
+class CourseTestCase(TestCase):
+    """Giảng viên gv, sinh viên sv và một khóa học; sv được ghi danh khi enrolled = True."""
+
+    enrolled = False
+    course_fields = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_teacher(first_name='Thành', last_name='Nguyễn')
+        cls.student = make_student()
+        cls.category = Category.objects.create(name='Công nghệ phần mềm')
+        cls.course = make_course(cls.teacher, cls.category, **cls.course_fields)
+        cls.lessons = cls.create_lessons()
+        cls.lesson = cls.lessons[0] if cls.lessons else None
+        if cls.enrolled:
+            cls.enrollment = Enrollment.objects.create(student=cls.student, course=cls.course)
+
+    @classmethod
+    def create_lessons(cls):
+        return [Lesson.objects.create(subject='Bài 1', content='<p>Nội dung</p>', course=cls.course)]
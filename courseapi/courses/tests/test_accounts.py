@@ -0,0 +1,195 @@
+import csv
+import datetime
+import io
+import json
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from oauth2_provider.models import AccessToken, Application, RefreshToken
+from rest_framework.test import APIClient
+
+from courses import hashing, provisioning, tokens
+from courses.models import Student, Teacher, User
+from courses.tests.base import api_client, make_admin, make_student
+
+
+class ProvisioningTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_admin()
+        cls.existing = make_student('sv-cu')
+
+    def setUp(self):
+        self.client_api = api_client(self.admin)
+
+    def test_roster_upload_reports_each_row(self):
+        roster = io.BytesIO("username,password,first_name,role,birth_date,work_place\n"
+                            "sv1,matkhau1,An,STUDENT,2004-05-01,\n"
+                            "sv2,matkhau2,Bình,,,\n"
+                            "gv1,matkhau3,Cường,TEACHER,,OU\n"
+                            "sv1,matkhau4,Trùng,STUDENT,,\n"
+                            "sv-cu,matkhau5,Cũ,STUDENT,,\n"
+                            "sv3,matkhau6,Sai,ADMIN,,\n".encode())
+        roster.name = 'roster.csv'
+
+        response = self.client_api.post('/users/provision/', {'roster': roster}, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual((report['total'], report['created'], report['failed']), (6, 3, 3))
+        self.assertEqual([row['status'] for row in report['results']],
+                         ['created', 'created', 'created', 'failed', 'failed', 'failed'])
+        self.assertEqual(set(report['results'][5]['errors']), {'role'})
+
+        code = int(self.existing.student_code[-4:])
+        self.assertEqual([row['student_code'] for row in report['results'][:2]],
+                         [f'{self.existing.student_code[:-4]}{number:04d}' for number in (code + 1, code + 2)])
+        student = Student.objects.get(username='sv1')
+        self.assertEqual((student.role, str(student.birth_date)), (User.Role.STUDENT, '2004-05-01'))
+        self.assertTrue(student.check_password('matkhau1'))
+        self.assertEqual(Teacher.objects.get(username='gv1').work_place, 'OU')
+
+    @override_settings(PASSWORD_HASH_WORKERS=2)
+    def test_passwords_hashed_in_shared_pool(self):
+        hashing.shutdown()
+        hashing.metrics.reset()
+        self.addCleanup(hashing.shutdown)
+        rows = [{'username': f'sv{i}', 'password': f'matkhau{i}'} for i in range(4)]
+
+        report = provisioning.provision(rows, batch_size=3)
+
+        self.assertEqual(report['created'], 4)
+        self.assertIsNotNone(hashing.get_pool()['executor'])
+        self.assertEqual(hashing.metrics.snapshot()['hash']['count'], 4)
+        self.assertTrue(Student.objects.get(username='sv3').check_password('matkhau3'))
+
+    def test_json_roster_is_parsed_incrementally(self):
+        content = ' \ufeff[ {"username": "sv1", "password": "a"} ,\n{"username": "sv2", "password": "ê"}, 5 ] '
+        rows = list(provisioning.iter_json_array(io.BytesIO(content.strip().encode()), chunk_size=7))
+        self.assertEqual(rows, [{'username': 'sv1', 'password': 'a'}, {'username': 'sv2', 'password': 'ê'}, 5])
+        self.assertEqual(list(provisioning.iter_json_array(io.BytesIO(b'[]'))), [])
+
+        for broken in (b'{"username": "sv1"}', b'[{"username": "sv1"}', b'[{"a": 1} {"b": 2}]', b'[1,]'):
+            with self.subTest(broken=broken), self.assertRaises(ValueError):
+                list(provisioning.iter_json_array(io.BytesIO(broken), chunk_size=4))
+
+        roster = io.BytesIO(json.dumps([{'username': 'sv9', 'password': 'matkhau9'}]).encode())
+        roster.name = 'roster.json'
+        response = self.client_api.post('/users/provision/', {'roster': roster}, format='multipart')
+        self.assertEqual(response.json()['created'], 1)
+
+    def test_malformed_tail_keeps_partial_report(self):
+        oversized = b'e' * (csv.field_size_limit() + 1)
+        for name, content in (('roster.json', b'[{"username": "sv1", "password": "a"}, '
+                                              b'{"username": "sv2", "password": "b"}, {'),
+                              ('roster.csv', b'username,password\nsv3,c\nsv4,d\nsv5,' + oversized)):
+            with self.subTest(name=name):
+                roster = io.BytesIO(content)
+                roster.name = name
+                response = self.client_api.post('/users/provision/', {'roster': roster}, format='multipart')
+
+                self.assertEqual(response.status_code, 400)
+                report = response.json()
+                self.assertIn('dòng 3', report['detail'])
+                self.assertEqual([row['status'] for row in report['results']], ['created', 'created'])
+
+        report = provisioning.provision(provisioning.iter_json_array(io.BytesIO(b'[{"username": "sv6"')))
+        self.assertEqual(report['total'], 0)
+        self.assertIn('dòng 1', report['error'])
+
+    def test_requires_admin(self):
+        self.client_api.force_authenticate(User.objects.get(pk=self.existing.pk))
+        response = self.client_api.post('/users/provision/', {'users': []}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(PASSWORD_HASHERS=['courses.hashing.ConfigurablePBKDF2PasswordHasher',
+                                     'django.contrib.auth.hashers.MD5PasswordHasher'],
+                   PASSWORD_HASH_ITERATIONS=1000, PASSWORD_HASH_WORKERS=0)
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        hashing.shutdown()
+        hashing.metrics.reset()
+
+    def tearDown(self):
+        hashing.shutdown()
+
+    def test_login_upgrades_outdated_hash(self):
+        student = make_student()
+        Student.objects.filter(pk=student.pk).update(password=make_password('123456', hasher='md5'))
+
+        self.assertTrue(User.objects.get(pk=student.pk).check_password('123456'))
+        self.assertTrue(User.objects.get(pk=student.pk).password.startswith('pbkdf2_sha256$1000$'))
+
+        with self.settings(PASSWORD_HASH_ITERATIONS=2000):
+            self.assertFalse(User.objects.get(pk=student.pk).check_password('sai'))
+            self.assertTrue(User.objects.get(pk=student.pk).check_password('123456'))
+            self.assertTrue(User.objects.get(pk=student.pk).password.startswith('pbkdf2_sha256$2000$'))
+
+        stats = hashing.metrics.snapshot()
+        self.assertEqual((stats['hash']['count'], stats['verify']['count']), (3, 3))
+
+    def test_saturated_pool_rejects_with_503(self):
+        with self.settings(PASSWORD_HASH_WORKERS=1):
+            pool = hashing.get_pool()
+        while pool['slots'].acquire(blocking=False):
+            pass
+
+        with self.settings(PASSWORD_HASH_WAIT_SECONDS=0):
+            response = APIClient().post('/users/', {'username': 'sv', 'password': '123456',
+                                                    'role': User.Role.STUDENT}, format='json')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(hashing.metrics.snapshot()['hash']['rejected'], 1)
+
+
+class TokenLifecycleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = make_student()
+        cls.application = Application.objects.create(name='app', client_type=Application.CLIENT_PUBLIC,
+                                                     authorization_grant_type=Application.GRANT_PASSWORD)
+
+    def token(self, name, expires_in, refresh=None):
+        access = AccessToken.objects.create(user=self.student, token=name, application=self.application,
+                                            expires=timezone.now() + datetime.timedelta(seconds=expires_in))
+        if refresh is not None:
+            RefreshToken.objects.create(user=self.student, token=f'{name}-refresh', application=self.application,
+                                        access_token=access, revoked=refresh or None)
+        return access
+
+    def test_password_grant_rotates_short_lived_tokens(self):
+        response = self.client.post('/o/token/', {'grant_type': 'password', 'username': 'sv', 'password': '123456',
+                                                  'client_id': self.application.client_id})
+        self.assertEqual(response.status_code, 200)
+        first = response.json()
+        self.assertEqual(first['expires_in'], settings.OAUTH2_PROVIDER['ACCESS_TOKEN_EXPIRE_SECONDS'])
+
+        response = self.client.post('/o/token/', {'grant_type': 'refresh_token',
+                                                  'refresh_token': first['refresh_token'],
+                                                  'client_id': self.application.client_id})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.json()['refresh_token'], first['refresh_token'])
+        self.assertIsNotNone(RefreshToken.objects.get(token=first['refresh_token']).revoked)
+
+    def test_clear_expired_in_batches(self):
+        long_ago = timezone.now() - datetime.timedelta(days=1)
+        live = [self.token('live', 3600), self.token('live-refreshable', -60, refresh=False)]
+        for i in range(3):
+            self.token(f'expired-{i}', -60)
+        self.token('revoked', -60, refresh=long_ago)
+
+        report = {row['table']: row for row in tokens.clear_expired(batch_size=2, pause=0)}
+
+        self.assertEqual(report[AccessToken._meta.db_table]['deleted'], 4)
+        self.assertEqual(report[RefreshToken._meta.db_table]['deleted'], 1)
+        self.assertCountEqual(AccessToken.objects.values_list('pk', flat=True), [token.pk for token in live])
+        self.assertEqual(list(RefreshToken.objects.values_list('token', flat=True)), ['live-refreshable-refresh'])
+
+    def test_cleanup_indexes_exist(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, AccessToken._meta.db_table)
+        self.assertEqual(constraints['oauth_access_expires_idx']['columns'], ['expires'])
@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from courses.admin import admin_site
+from courses.admin_performance import ApproximateCountPaginator
+from courses.models import Category, Comment, Course, Enrollment, ExportJob, Lesson, Tag, Transaction
+from courses.tests.base import make_admin, make_course, make_student, make_teacher
+
+
+class AdminChangelistQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_admin()
+        cls.category = Category.objects.create(name='Công nghệ phần mềm')
+        cls.add_rows(0)
+
+    @classmethod
+    def add_rows(cls, batch):
+        for i in range(batch * 3, batch * 3 + 3):
+            teacher = make_teacher(f'gv{i}')
+            student = make_student(f'sv{i}')
+            tag = Tag.objects.create(name=f'tag{i}')
+            course = make_course(teacher, cls.category, name=f'Khóa học {i}', fee=i)
+            course.tags.add(tag)
+            lesson = Lesson.objects.create(subject=f'Bài {i}', content='<p>Nội dung</p>', course=course)
+            enrollment = Enrollment.objects.create(student=student, course=course)
+            Transaction.objects.create(enrollment=enrollment, amount=i)
+            Comment.objects.create(user=student, lesson=lesson, content=f'Bình luận {i}')
+            ExportJob.objects.create(requested_by=cls.admin, report=ExportJob.Reports.REVENUE)
+
+    def changelist_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(ctx.captured_queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.client.force_login(self.admin)
+        urls = [reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+                for model in admin_site._registry]
+
+        before = {url: self.changelist_queries(url) for url in urls}
+        self.add_rows(1)
+        after = {url: self.changelist_queries(url) for url in urls}
+
+        self.assertEqual(before, after)
+
+    def test_filter_choices_are_cached(self):
+        self.client.force_login(self.admin)
+        url = reverse('admin:courses_course_changelist')
+        cold = self.changelist_queries(url)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+
+        self.assertLess(len(ctx.captured_queries), cold)
+
+    def test_approximate_paginator_falls_back_to_exact_count(self):
+        paginator = ApproximateCountPaginator(Course.objects.order_by('id'), 10)
+        self.assertEqual(paginator.count, Course.objects.count())
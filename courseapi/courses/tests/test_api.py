@@ -0,0 +1,184 @@
+import gzip
+import json
+import unittest
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from courses import conditional
+from courses.middleware import CompressionMiddleware, brotli
+from courses.models import Course, Lesson, Teacher, User
+from courses.renderers import StreamingJSONResponse
+from courses.serializers import ChatUserSerializer
+from courses.tests.base import CourseTestCase, api_client, make_admin, make_student
+
+
+class FieldProjectionTests(CourseTestCase):
+    enrolled = True
+    course_fields = {'description': '<p>Khóa học về SE</p>'}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = make_admin()
+
+    @classmethod
+    def create_lessons(cls):
+        return [Lesson.objects.create(subject=f'Bài {i}', content=f'<p>Nội dung bài {i}</p>', course=cls.course)
+                for i in range(3)]
+
+    def column(self, model, field):
+        return f'{connection.ops.quote_name(model._meta.db_table)}.{connection.ops.quote_name(field)}'
+
+    def assertNotSelected(self, queries, model, field):
+        column = self.column(model, field)
+        for query in queries:
+            sql = query['sql']
+            if sql.startswith('SELECT'):
+                self.assertNotIn(column, sql.split(' FROM ')[0])
+
+    def test_course_lessons_list_defers_content(self):
+        client = APIClient()
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(f'/courses/{self.course.id}/lessons/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 3)
+        self.assertNotSelected(ctx.captured_queries, Lesson, 'content')
+
+    def test_lesson_detail_serves_rendered_content(self):
+        client = api_client(self.student)
+        lesson = self.course.lessons.first()
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(f'/lessons/{lesson.id}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['content'], lesson.rendered.html)
+        self.assertNotSelected(ctx.captured_queries, Lesson, 'content')
+
+    def test_admin_changelists_defer_text_columns(self):
+        self.client.force_login(self.admin)
+        for url, model, field in [('/admin/courses/course/', Course, 'description'),
+                                  ('/admin/courses/lesson/', Lesson, 'content'),
+                                  ('/admin/courses/teacher/', Teacher, 'bio')]:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertNotSelected(ctx.captured_queries, model, field)
+
+
+class ConditionalGetTests(CourseTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.enterContext(mock.patch.object(conditional, 'is_shared', return_value=True))
+
+    def revalidate(self, etag):
+        return self.client.get('/courses/', HTTP_IF_NONE_MATCH=etag)
+
+    def test_process_local_cache_disables_validators(self):
+        etag = self.client.get('/courses/')['ETag']
+        # A write handled by another worker never bumps the versions in this process's local cache.
+        Course.objects.filter(pk=self.course.pk).update(name='Đổi tên ở worker khác')
+        with mock.patch.object(conditional, 'is_shared', return_value=False):
+            response = self.revalidate(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+    def test_unchanged_list_returns_304(self):
+        response = self.client.get('/courses/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('Authorization', response['Vary'])
+
+        response = self.revalidate(response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_course_change_invalidates_etag(self):
+        etag = self.client.get('/courses/')['ETag']
+        self.course.description = 'Mới'
+        self.course.save()
+        self.assertEqual(self.revalidate(etag).status_code, 200)
+
+    def test_embedded_category_and_teacher_invalidate_etag(self):
+        etag = self.client.get('/courses/')['ETag']
+        self.category.name = 'Khoa học máy tính'
+        self.category.save()
+        response = self.revalidate(etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        user = User.objects.get(pk=self.teacher.pk)
+        user.last_name = 'Trần'
+        user.save()
+        response = self.revalidate(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Thành Trần', response.content.decode())
+
+    def test_login_does_not_invalidate_etag(self):
+        etag = self.client.get('/courses/')['ETag']
+        user = User.objects.get(pk=self.teacher.pk)
+        user.last_login = timezone.now()
+        user.save(update_fields=['last_login'])
+        self.assertEqual(self.revalidate(etag).status_code, 304)
+
+
+class StreamingJSONTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(5):
+            make_student(f'sv{i}', first_name=f'Sinh viên {i}')
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def students(self):
+        return User.objects.filter(role=User.Role.STUDENT).order_by('id')
+
+    def test_streams_valid_json_in_chunks(self):
+        response = StreamingJSONResponse(self.students(), ChatUserSerializer, chunk_size=2)
+        data = json.loads(self.body(response))
+        self.assertEqual([item['username'] for item in data], [f'sv{i}' for i in range(5)])
+        self.assertEqual(json.loads(self.body(StreamingJSONResponse(User.objects.none(), ChatUserSerializer))), [])
+
+    def test_error_in_first_chunk_raises_before_headers(self):
+        class Broken(ChatUserSerializer):
+            def to_representation(self, instance):
+                raise RuntimeError('hỏng')
+
+        with self.assertRaises(RuntimeError):
+            StreamingJSONResponse(self.students(), Broken)
+
+    def test_endpoint_streams_json(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username='sv0'))
+        response = client.get('/users/chat-students/')
+        self.assertTrue(response.streaming)
+        self.assertEqual(len(json.loads(self.body(response))), 4)
+
+    def compress(self, encoding, response):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=encoding)
+        return CompressionMiddleware(lambda r: response)(request)
+
+    def test_gzip_streaming(self):
+        response = self.compress('gzip', StreamingJSONResponse(self.students(), ChatUserSerializer, chunk_size=2))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(self.body(response)))), 5)
+
+    @unittest.skipIf(brotli is None, "Chưa cài brotli")
+    def test_brotli_streaming_and_small_responses(self):
+        response = self.compress('gzip, br', StreamingJSONResponse(self.students(), ChatUserSerializer, chunk_size=2))
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(len(json.loads(brotli.decompress(self.body(response)))), 5)
+
+        response = self.compress('br', HttpResponse(b'{}', content_type='application/json'))
+        self.assertFalse(response.has_header('Content-Encoding'))
@@ -0,0 +1,142 @@
+import datetime
+import io
+import json
+import os
+import tempfile
+import zipfile
+from unittest import mock
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from courses import bundles
+from courses.models import Course, Lesson, Tag, User
+from courses.tests.base import CourseTestCase, api_client, make_student
+
+
+class CourseBundleTests(CourseTestCase):
+    enrolled = True
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.outsider = make_student('sv2')
+        yesterday = timezone.now() - datetime.timedelta(days=1)
+        Lesson.objects.update(updated_date=yesterday)
+        Course.objects.update(updated_date=yesterday)
+
+    @classmethod
+    def create_lessons(cls):
+        return [Lesson.objects.create(subject=f'Bài {i}', course=cls.course,
+                                      content=f'<p>Bài {i}</p><img src="https://cdn.test/{i}.png">')
+                for i in range(3)]
+
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        self.enterContext(override_settings(BUNDLES_ROOT=self.root.name))
+        self.api = api_client(self.student)
+
+    def download(self, **extra):
+        response = self.api.get(f'/courses/{self.course.pk}/bundle/', **extra)
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, content
+
+    def manifest(self, content):
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            return json.loads(archive.read('manifest.json')), archive.namelist()
+
+    def test_bundle_built_once_and_served_with_ranges(self):
+        response, content = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        manifest, names = self.manifest(content)
+        self.assertEqual([lesson['subject'] for lesson in manifest['lessons']], ['Bài 0', 'Bài 1', 'Bài 2'])
+        self.assertEqual(manifest['lessons'][0]['media'], ['https://cdn.test/0.png'])
+        self.assertIn(f'lessons/{self.lessons[0].pk}.html', names)
+        self.assertEqual(int(response['X-Bundle-Version']), manifest['version'])
+
+        with CaptureQueriesContext(connection) as ctx:
+            partial, chunk = self.download(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(chunk, content[10:20])
+        self.assertEqual(partial['Content-Range'], f'bytes 10-19/{len(content)}')
+        self.assertFalse(any('courses_lessonrender' in query['sql'] for query in ctx.captured_queries))
+
+        self.assertEqual(self.download(HTTP_RANGE=f'bytes={len(content)}-')[0].status_code, 416)
+        self.assertEqual(self.download(HTTP_IF_NONE_MATCH=response['ETag'])[0].status_code, 304)
+        self.assertEqual(len(os.listdir(os.path.join(self.root.name, str(self.course.pk)))), 1)
+
+    def test_delta_contains_changed_lessons_only(self):
+        version = int(self.download()[0]['X-Bundle-Version'])
+        changed, removed = self.lessons[1], self.lessons[2]
+        changed.content = '<p>Bài 1 mới</p>'
+        changed.save()
+        removed.active = False
+        removed.save()
+
+        response, content = self.download(data={'since': version})
+        manifest, _ = self.manifest(content)
+        self.assertGreater(manifest['version'], version)
+        self.assertEqual([lesson['id'] for lesson in manifest['lessons']], [changed.pk])
+        self.assertEqual(manifest['removed'], [removed.pk])
+        self.assertEqual(manifest['lesson_ids'], [self.lessons[0].pk, changed.pk])
+
+    def test_tag_change_reaches_full_and_delta_bundles(self):
+        etag = self.download()[0]['ETag']
+        version = int(self.download()[0]['X-Bundle-Version'])
+        tag = Tag.objects.create(name='python')
+        self.lessons[0].tags.add(tag)
+
+        response, content = self.download()
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.manifest(content)[0]['lessons'][0]['tags'], [{'id': tag.pk, 'name': 'python'}])
+        delta, _ = self.manifest(self.download(data={'since': version})[1])
+        self.assertEqual([lesson['id'] for lesson in delta['lessons']], [self.lessons[0].pk])
+
+        tag.lessons.clear()
+        delta, _ = self.manifest(self.download(data={'since': version})[1])
+        self.assertEqual(delta['lessons'][0]['tags'], [])
+
+    def test_since_snaps_to_published_versions(self):
+        version = int(self.download()[0]['X-Bundle-Version'])
+        self.lessons[1].save()
+
+        etags = {self.download(data={'since': since})[0]['ETag'] for since in (version, version + 1, version + 999)}
+        self.assertEqual(len(etags), 1)
+        self.assertEqual(self.download(data={'since': 1})[0]['ETag'], self.download(data={'since': 0})[0]['ETag'])
+        self.assertEqual(len(os.listdir(os.path.join(self.root.name, str(self.course.pk)))), 2)
+
+    @override_settings(BUNDLES_MAX_DELTAS=1)
+    def test_delta_files_capped(self):
+        base = timezone.now() - datetime.timedelta(days=1)
+        for i, lesson in enumerate(self.lessons):
+            Lesson.objects.filter(pk=lesson.pk).update(updated_date=base + datetime.timedelta(hours=i))
+
+        for i in range(2):
+            since = bundles.to_version(base + datetime.timedelta(hours=i))
+            self.assertEqual(self.download(data={'since': since})[0].status_code, 200)
+        self.assertEqual(len(os.listdir(os.path.join(self.root.name, str(self.course.pk)))), 1)
+
+    def test_file_pruned_before_open_is_rebuilt(self):
+        prune = bundles.prune
+        calls = []
+
+        def concurrent_prune(directory, key):
+            calls.append(key)
+            if len(calls) == 1:
+                for name in os.listdir(directory):
+                    os.remove(os.path.join(directory, name))
+            prune(directory, key)
+
+        with mock.patch.object(bundles, 'prune', side_effect=concurrent_prune):
+            response, content = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(len(self.manifest(content)[0]['lessons']), 3)
+
+    def test_requires_enrollment(self):
+        self.api.force_authenticate(User.objects.get(pk=self.outsider.pk))
+        self.assertEqual(self.download()[0].status_code, 403)
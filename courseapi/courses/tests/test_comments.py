@@ -0,0 +1,99 @@
+import datetime
+import io
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+
+from courses import throttles
+from courses.models import ArchivedComment, Comment, Lesson, User
+from courses.tests.base import CourseTestCase, api_client, make_admin
+
+
+class CommentCounterTests(CourseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = make_admin()
+
+    def setUp(self):
+        cache.clear()
+        self.client_api = api_client(self.student)
+
+    def comment_count(self):
+        return Lesson.objects.get(pk=self.lesson.pk).comment_count
+
+    def test_post_and_delete_update_counter(self):
+        response = self.client_api.post(f'/lessons/{self.lesson.pk}/comments/', {'content': 'Xin chào'})
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('lesson', response.json())
+        self.assertEqual(self.comment_count(), 1)
+
+        response = self.client_api.delete(f'/comments/{response.json()["id"]}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.comment_count(), 0)
+
+    def test_admin_bulk_hide_updates_counter(self):
+        comments = [Comment.objects.create(user=self.student, lesson=self.lesson, content=f'Bình luận {i}')
+                    for i in range(3)]
+        self.client.force_login(self.admin)
+        response = self.client.post('/admin/courses/comment/', {
+            'action': 'hide_comments', '_selected_action': [c.pk for c in comments[:2]],
+        })
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Comment.objects.filter(active=True).count(), 1)
+        self.assertEqual(self.comment_count(), 1)
+
+    def test_burst_is_throttled(self):
+        capacity = settings.THROTTLE_BUCKETS['comments']['capacity']
+        codes = [self.client_api.post(f'/lessons/{self.lesson.pk}/comments/', {'content': 'spam'}).status_code
+                 for _ in range(capacity + 1)]
+
+        self.assertEqual(codes[:capacity], [201] * capacity)
+        self.assertEqual(codes[-1], 429)
+        self.assertEqual(self.comment_count(), capacity)
+
+    def test_concurrent_burst_is_throttled(self):
+        capacity = settings.THROTTLE_BUCKETS['comments']['capacity']
+        request = mock.Mock(method='POST', user=User.objects.get(pk=self.student.pk))
+        slow_cache = mock.Mock(wraps=cache)
+        slow_cache.get.side_effect = lambda *args: (cache.get(*args), time.sleep(0.01))[0]
+
+        def attempt():
+            allowed.append(throttles.CommentThrottle().allow_request(request, None))
+
+        allowed = []
+        with mock.patch.object(throttles, 'cache', slow_cache):
+            threads = [threading.Thread(target=attempt) for _ in range(capacity * 2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(allowed.count(True), capacity)
+
+
+class SoftDeleteTests(CourseTestCase):
+
+    def test_active_queryset(self):
+        hidden = Lesson.objects.create(subject='Bài 2', content='<p>Nội dung</p>', course=self.course, active=False)
+
+        self.assertEqual(list(self.course.lessons.active()), [self.lesson])
+        self.assertEqual(list(Lesson.objects.inactive()), [hidden])
+
+    def test_archive_moves_long_inactive_rows(self):
+        old = timezone.now() - datetime.timedelta(days=settings.ARCHIVE_AFTER_DAYS + 1)
+        visible = Comment.objects.create(user=self.student, lesson=self.lesson, content='Còn hiển thị')
+        recent = Comment.objects.create(user=self.student, lesson=self.lesson, content='Mới ẩn', active=False)
+        stale = Comment.objects.create(user=self.student, lesson=self.lesson, content='Ẩn lâu', active=False)
+        Comment.objects.filter(pk=stale.pk).update(updated_date=old)
+
+        call_command('archive_inactive', stdout=io.StringIO())
+
+        self.assertCountEqual(Comment.objects.values_list('pk', flat=True), [visible.pk, recent.pk])
+        archived = ArchivedComment.objects.get()
+        self.assertEqual((archived.id, archived.content, archived.lesson_id), (stale.pk, 'Ẩn lâu', self.lesson.pk))
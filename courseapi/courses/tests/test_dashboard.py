@@ -0,0 +1,37 @@
+from django.test import TestCase
+
+from courses.models import Category, Enrollment, Lesson
+from courses.tests.base import api_client, make_course, make_student, make_teacher
+
+
+class DashboardQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = make_student()
+        category = Category.objects.create(name='Công nghệ phần mềm')
+        cls.courses = []
+        for i in range(4):
+            teacher = make_teacher(f'gv{i}', first_name='Giảng', last_name=f'Viên {i}')
+            course = make_course(teacher, category, name=f'Khóa {i}')
+            Lesson.objects.create(subject='Bài 1', content='<p>Bài 1</p>', course=course)
+            cls.courses.append(course)
+
+    def dashboard(self):
+        client = api_client(self.student)
+        with self.assertNumQueries(3):
+            response = client.get('/users/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_query_count_is_independent_of_enrollments(self):
+        Enrollment.objects.create(student=self.student, course=self.courses[0])
+        results = self.dashboard()
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['next_lesson']['subject'], 'Bài 1')
+
+        for course in self.courses[1:]:
+            Enrollment.objects.create(student=self.student, course=course)
+        results = self.dashboard()
+        self.assertEqual(len(results), 4)
+        self.assertEqual({r['course']['instructor_name'] for r in results},
+                         {f'Giảng Viên {i}' for i in range(4)})
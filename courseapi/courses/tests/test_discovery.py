@@ -0,0 +1,174 @@
+import datetime
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from courses import facets, leaderboards, recommendations
+from courses.models import Category, Course, CourseScore, Enrollment, Leaderboard, Like, Rating, Tag
+from courses.tests.base import CourseTestCase, api_client, make_course, make_student, make_teacher
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        teacher = make_teacher()
+        software, biology = Category.objects.create(name='Công nghệ phần mềm'), Category.objects.create(name='Sinh học')
+        tag = Tag.objects.create(name='python')
+        cls.python = Course.objects.create(name='Python cơ bản', category=software, instructor=teacher)
+        cls.django = Course.objects.create(name='Django', category=software, instructor=teacher)
+        cls.cells = Course.objects.create(name='Tế bào', category=biology, instructor=teacher)
+        cls.python.tags.add(tag)
+        cls.django.tags.add(tag)
+
+        cls.students = [make_student(f'sv{i}') for i in range(3)]
+        for student in cls.students:
+            Enrollment.objects.create(student=student, course=cls.python)
+            Enrollment.objects.create(student=student, course=cls.django)
+        Enrollment.objects.create(student=cls.students[0], course=cls.cells)
+        cls.newcomer = make_student('moi')
+        Enrollment.objects.create(student=cls.newcomer, course=cls.python)
+
+    def setUp(self):
+        recommendations.store_neighbors(recommendations.build_similarity())
+
+    def test_similar_courses_ranked_by_overlap(self):
+        response = self.client.get(f'/courses/{self.python.pk}/similar/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['id'] for c in response.json()][:2], [self.django.pk, self.cells.pk])
+
+    def test_similar_unknown_course_is_404(self):
+        self.assertEqual(self.client.get('/courses/abc/similar/').status_code, 404)
+        self.assertEqual(self.client.get('/courses/999999/similar/').status_code, 404)
+
+    def test_recommendations_exclude_enrolled_courses(self):
+        response = api_client(self.newcomer).get('/users/recommendations/')
+        self.assertEqual(response.status_code, 200)
+        ids = [c['id'] for c in response.json()]
+        self.assertEqual(ids[0], self.django.pk)
+        self.assertNotIn(self.python.pk, ids)
+
+
+class LeaderboardScoreTests(CourseTestCase):
+    def setUp(self):
+        self.client = api_client(self.student)
+
+    def score(self, board):
+        entries = leaderboards.top(board)
+        return round(entries[0]['score'], 3) if entries else 0
+
+    def assertMatchesRebuild(self):
+        live = {board: self.score(board) for board in CourseScore.Boards.values}
+        leaderboards.rebuild()
+        self.assertEqual(live, {board: self.score(board) for board in CourseScore.Boards.values})
+
+    def test_like_counts_once_per_activation(self):
+        like = self.client.post(f'/courses/{self.course.pk}/like/')
+        self.assertTrue(like.json()['liked'])
+        Like.objects.get(student=self.student).save()
+        self.assertEqual(self.score(leaderboards.TRENDING), 1)
+
+        self.client.post(f'/courses/{self.course.pk}/like/')
+        self.assertEqual(self.score(leaderboards.TRENDING), 0)
+        self.client.post(f'/courses/{self.course.pk}/like/')
+        self.assertEqual(self.score(leaderboards.TRENDING), 1)
+        self.assertMatchesRebuild()
+
+    def test_record_uses_epoch_read_under_board_lock(self):
+        stale = timezone.now() - datetime.timedelta(days=14)
+        Leaderboard.objects.update_or_create(board=leaderboards.TRENDING, defaults={'epoch': stale})
+        leaderboards.compact(leaderboards.TRENDING)
+        current = leaderboards.get_epoch(leaderboards.TRENDING)
+        when = current + datetime.timedelta(days=7)
+
+        with mock.patch.object(leaderboards, 'get_epoch', return_value=stale), \
+                mock.patch.object(leaderboards, 'lock_board', wraps=leaderboards.lock_board) as lock:
+            leaderboards.record(self.course, {leaderboards.TRENDING: 1}, when)
+        lock.assert_called_once_with(leaderboards.TRENDING)
+        self.assertAlmostEqual(CourseScore.objects.get(scope='global').score,
+                               leaderboards.growth(leaderboards.TRENDING, when, current))
+
+    def test_rating_edit_replaces_previous_contribution(self):
+        response = self.client.post(f'/courses/{self.course.pk}/rating/', {'rate': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['rate'], 5)
+        self.assertEqual(self.score(leaderboards.TOP_RATED), 2)
+
+        self.client.post(f'/courses/{self.course.pk}/rating/', {'rate': 4})
+        self.client.post(f'/courses/{self.course.pk}/rating/', {'rate': 4})
+        Rating.objects.get(student=self.student).save()
+        self.assertEqual(self.score(leaderboards.TOP_RATED), 1)
+        self.assertEqual(self.score(leaderboards.TRENDING), 1)
+        self.assertMatchesRebuild()
+
+
+class CourseSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_teacher()
+        cls.software, cls.biology = Category.objects.create(name='CNPM'), Category.objects.create(name='Sinh học')
+        cls.tag = Tag.objects.create(name='python')
+        cls.free = make_course(cls.teacher, cls.software, name='Python miễn phí', fee=0)
+        cls.paid = make_course(cls.teacher, cls.software, name='Django nâng cao', fee=100)
+        cls.bio = make_course(cls.teacher, cls.biology, name='Tin sinh học', fee=200)
+        cls.free.tags.add(cls.tag)
+        cls.bio.tags.add(cls.tag)
+        Rating.objects.create(student=make_student(), course=cls.free, rate=5)
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, **params):
+        response = self.client.get('/courses/search/', params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        counts = {facet: {item['id']: item['count'] for item in items} for facet, items in data['facets'].items()}
+        return sorted(c['id'] for c in data['results']), counts
+
+    def test_counts_without_filters(self):
+        ids, counts = self.search()
+        self.assertEqual(ids, sorted([self.free.pk, self.paid.pk, self.bio.pk]))
+        self.assertEqual(counts['category'], {self.software.pk: 2, self.biology.pk: 1})
+        self.assertEqual(counts['tag'], {self.tag.pk: 2})
+        self.assertEqual(counts['price'], {'free': 1, 'paid': 2})
+        self.assertEqual(counts['min_rating'][5], 1)
+
+    def test_selected_facet_keeps_its_own_alternatives(self):
+        ids, counts = self.search(category_id=self.software.pk)
+        self.assertEqual(ids, sorted([self.free.pk, self.paid.pk]))
+        self.assertEqual(counts['category'], {self.software.pk: 2, self.biology.pk: 1})
+        self.assertEqual(counts['tag'], {self.tag.pk: 1})
+        self.assertEqual(counts['price'], {'free': 1, 'paid': 1})
+
+    def test_filters(self):
+        self.assertEqual(self.search(price='free')[0], [self.free.pk])
+        self.assertEqual(self.search(price='paid', tag_id=self.tag.pk)[0], [self.bio.pk])
+        self.assertEqual(self.search(fee_min='150')[0], [self.bio.pk])
+        self.assertEqual(self.search(fee_max='100', min_rating='4')[0], [self.free.pk])
+        self.assertEqual(self.search(q='django')[0], [self.paid.pk])
+
+    def test_index_follows_course_changes(self):
+        self.search()
+        self.paid.fee = 0
+        self.paid.save()
+        self.assertEqual(self.search(price='free')[0], sorted([self.free.pk, self.paid.pk]))
+
+    def test_fee_range_matches_scan(self):
+        for fee in (50, 100, 150, 300, 0, 75):
+            make_course(self.teacher, self.software, name=f'Khóa {fee}', fee=fee)
+        index = facets.FacetIndex()
+        fees = dict(Course.objects.active().values_list('id', 'fee'))
+        for low, high in ((None, None), (None, 0), (50, 150), (100, 100), (120, 140), (301, None)):
+            with self.subTest(low=low, high=high):
+                expected = {pk for pk, fee in fees.items()
+                            if (low is None or fee >= low) and (high is None or fee <= high)}
+                found = index.fee_range(None if low is None else Decimal(low), None if high is None else Decimal(high))
+                self.assertEqual(set(index.decode(found)), expected)
+
+    def test_invalid_params_are_rejected(self):
+        for params in ({'price': 'cheap'}, {'fee_min': 'NaN'}, {'fee_max': 'abc'}, {'min_rating': '9'},
+                       {'category_id': 'x'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/courses/search/', params).status_code, 400)
@@ -0,0 +1,77 @@
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from courses import exports
+from courses.models import Enrollment, ExportJob, Job, Transaction
+from courses.tests.base import api_client, make_admin, make_course, make_student, make_teacher
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_admin()
+        cls.teacher = make_teacher()
+        cls.other = make_teacher('gv2')
+        course = make_course(cls.teacher, fee=100)
+        other_course = make_course(cls.other, course.category, name='Khác', fee=50)
+        for i, target in enumerate((course, other_course)):
+            student = make_student(f'sv{i}')
+            enrollment = Enrollment.objects.create(student=student, course=target)
+            Transaction.objects.create(enrollment=enrollment, amount=target.fee, pay_method='CASH', status=True)
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = root.name
+        override = override_settings(EXPORTS_ROOT=root.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode('utf-8-sig')
+
+    def test_teacher_export_is_scoped_and_downloadable(self):
+        client = api_client(self.teacher)
+        response = client.post('/exports/', {'report': 'TRANSACTIONS', 'format': 'CSV'})
+        self.assertEqual(response.status_code, 201)
+        export = response.json()
+        self.assertEqual(export['status'], Job.Status.DONE)
+        self.assertEqual(export['total_rows'], 1)
+        self.assertTrue(ExportJob.objects.get(pk=export['id']).file.path.startswith(self.root))
+
+        content = self.read(client.get(f'/exports/{export["id"]}/download/'))
+        self.assertTrue(content.startswith('Mã giao dịch,'))
+        self.assertIn('Nhập môn phần mềm', content)
+        self.assertNotIn('Khác', content)
+        self.assertEqual(api_client(self.other).get(f'/exports/{export["id"]}/download/').status_code, 404)
+
+    def test_admin_download_uses_session(self):
+        self.client.force_login(self.admin)
+        self.client.post(reverse('admin:courses_exportjob_add'), {'report': 'REVENUE', 'format': 'CSV'})
+        export = ExportJob.objects.get()
+        self.assertEqual(export.status, Job.Status.DONE)
+
+        url = reverse('admin:courses_exportjob_download', args=[export.pk])
+        self.assertContains(self.client.get(reverse('admin:courses_exportjob_changelist')), f'href="{url}"')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Khác', self.read(response))
+
+        ExportJob.objects.filter(pk=export.pk).update(status=Job.Status.RUNNING)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_login(self.teacher)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_failure_hides_traceback(self):
+        failure = OSError('/srv/courseapi/exports: hết dung lượng')
+        with mock.patch.object(exports, 'write_export', side_effect=failure), \
+                self.assertLogs('courses.exports', 'ERROR') as logs:
+            response = api_client(self.teacher).post('/exports/', {'report': 'REVENUE', 'format': 'CSV'})
+        export = response.json()
+        self.assertEqual(export['status'], Job.Status.FAILED)
+        self.assertNotIn('/srv/courseapi', export['error'])
+        self.assertNotIn('Traceback', export['error'])
+        self.assertIn('Traceback', logs.output[0])
@@ -0,0 +1,130 @@
+import datetime
+import os
+import tempfile
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from courses import jobs, tasks
+from courses.models import Enrollment, Job, LecturerReport, Transaction
+from courses.tests.base import CourseTestCase, api_client, make_course, make_student, make_teacher
+
+
+@override_settings(JOBS_ENABLED=True, JOBS_MAX_ATTEMPTS=2, JOBS_RETRY_BASE_SECONDS=10)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.enterContext(mock.patch.dict(jobs._registry, {'record': self.record}))
+
+    def record(self, value, fail=False):
+        self.calls.append(value)
+        if fail:
+            raise RuntimeError(value)
+
+    def test_dedup_key_collapses_pending_jobs(self):
+        job = jobs.enqueue('record', {'value': 1}, dedup_key='k')
+        self.assertEqual(jobs.enqueue('record', {'value': 2}, dedup_key='k').pk, job.pk)
+        self.assertEqual(Job.objects.count(), 1)
+
+        claimed, = jobs.claim(10)
+        self.assertEqual((claimed.status, claimed.attempts, claimed.dedup_key), (Job.Status.RUNNING, 1, None))
+        self.assertNotEqual(jobs.enqueue('record', {'value': 3}, dedup_key='k').pk, job.pk)
+
+    def test_claim_skips_future_and_claimed_jobs(self):
+        due = jobs.enqueue('record', {'value': 1})
+        jobs.enqueue('record', {'value': 2}, delay=60)
+        self.assertEqual([job.pk for job in jobs.claim(10)], [due.pk])
+        self.assertEqual(jobs.claim(10), [])
+
+    def test_failures_back_off_then_fail(self):
+        job = jobs.enqueue('record', {'value': 1, 'fail': True})
+        with self.assertLogs('courses.jobs', 'WARNING'):
+            jobs.execute(jobs.claim(1)[0])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.PENDING)
+        self.assertIn('RuntimeError', job.last_error)
+        self.assertGreaterEqual(job.run_at, timezone.now() + datetime.timedelta(seconds=9))
+        self.assertEqual(jobs.claim(1), [])
+
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('courses.jobs', 'WARNING'):
+            jobs.execute(jobs.claim(1)[0])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.Status.FAILED, 2))
+        self.assertEqual(self.calls, [1, 1])
+
+    def test_success_and_stale_requeue(self):
+        job = jobs.enqueue('record', {'value': 1})
+        jobs.execute(jobs.claim(1)[0])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.DONE)
+
+        stale = jobs.enqueue('record', {'value': 2})
+        jobs.claim(1)
+        Job.objects.filter(pk=stale.pk).update(locked_at=timezone.now() - datetime.timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(Job.objects.get(pk=stale.pk).status, Job.Status.PENDING)
+
+    def test_newer_upload_replaces_pending_one(self):
+        spool = tempfile.TemporaryDirectory()
+        self.addCleanup(spool.cleanup)
+        course = make_course(make_teacher())
+
+        with self.settings(JOBS_SPOOL_DIR=spool.name):
+            tasks.defer_upload(course, 'image', SimpleUploadedFile('cu.png', b'old'))
+            tasks.defer_upload(course, 'image', SimpleUploadedFile('moi.png', b'new'))
+
+        job = Job.objects.get()
+        self.assertTrue(job.payload['path'].endswith('moi.png'))
+        self.assertEqual(os.listdir(spool.name), [os.path.basename(job.payload['path'])])
+
+
+@override_settings(JOBS_ENABLED=True, LECTURER_STATS_TTL=300)
+class LecturerStatsTests(CourseTestCase):
+    enrolled = True
+    course_fields = {'fee': 100}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = make_student('sv1')
+        Transaction.objects.create(enrollment=cls.enrollment, amount=100, pay_method='CASH', status=True)
+
+    @classmethod
+    def create_lessons(cls):
+        return []
+
+    def stats(self, **params):
+        response = api_client(self.teacher).get('/users/stats/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def run_jobs(self):
+        for job in jobs.claim(10):
+            jobs.execute(job)
+
+    def test_first_request_builds_and_stores_report(self):
+        report = self.stats()
+        self.assertEqual(report['summary']['total_students'], 1)
+        stored = LecturerReport.objects.get(teacher=self.teacher, period='month')
+        self.assertEqual(stored.data['summary']['total_students'], 1)
+
+        self.assertEqual(self.stats(time='week')['summary']['period_viewing'], 'month')
+        self.assertEqual(LecturerReport.objects.count(), 1)
+        self.assertFalse(Job.objects.exists())
+
+    def test_stale_report_is_served_and_refreshed_once(self):
+        self.stats()
+        Enrollment.objects.create(student=self.other, course=self.course)
+        LecturerReport.objects.update(generated_date=timezone.now() - datetime.timedelta(seconds=301))
+
+        self.assertEqual(self.stats()['summary']['total_students'], 1)
+        self.assertEqual(self.stats()['summary']['total_students'], 1)
+        self.assertEqual(Job.objects.filter(name='refresh_lecturer_stats').count(), 1)
+
+        self.run_jobs()
+        self.assertEqual(Job.objects.get().status, Job.Status.DONE)
+        self.assertEqual(self.stats()['summary']['total_students'], 2)
+        self.assertEqual(Job.objects.count(), 1)
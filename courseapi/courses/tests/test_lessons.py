@@ -0,0 +1,191 @@
+import datetime
+import io
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from courses import access, caching, rendering
+from courses.models import Enrollment, Lesson, LessonRender
+from courses.tests.base import CourseTestCase, api_client, make_course, make_teacher
+
+
+class LessonNavigationTests(CourseTestCase):
+    enrolled = True
+
+    @classmethod
+    def create_lessons(cls):
+        return [Lesson.objects.create(subject=f'Bài {i}', content=f'<p>Bài {i}</p>', course=cls.course)
+                for i in range(4)]
+
+    def links(self):
+        return list(self.course.lessons.active().order_by('position', 'id')
+                    .values_list('id', 'prev_lesson_id', 'next_lesson_id'))
+
+    def reorder(self, moves):
+        return api_client(self.teacher).post(f'/courses/{self.course.id}/lessons/reorder/', {'moves': moves},
+                                             format='json')
+
+    def test_new_lessons_are_appended_and_linked(self):
+        a, b, c, d = [lesson.pk for lesson in self.lessons]
+        self.assertEqual(list(self.course.lessons.order_by('id').values_list('position', flat=True)),
+                         [1024, 2048, 3072, 4096])
+        self.assertEqual(self.links(), [(a, None, b), (b, a, c), (c, b, d), (d, c, None)])
+
+        Lesson.objects.get(pk=b).delete()
+        self.lessons[2].active = False
+        self.lessons[2].save()
+        self.assertEqual(self.links(), [(a, None, d), (d, a, None)])
+
+    def test_reorder_moves_only_changed_rows(self):
+        a, b, c, d = [lesson.pk for lesson in self.lessons]
+        response = self.reorder([{'id': d, 'after': None}, {'id': b, 'after': c}])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['order'], [d, a, c, b])
+        positions = dict(self.course.lessons.values_list('id', 'position'))
+        self.assertEqual((positions[a], positions[c]), (1024, 3072))
+        self.assertEqual(self.links(), [(d, None, a), (a, d, c), (c, a, b), (b, c, None)])
+
+        Lesson.objects.filter(pk=a).update(position=1000)
+        Lesson.objects.filter(pk=c).update(position=1001)
+        self.reorder([{'id': b, 'after': a}])
+        self.assertEqual([pk for pk, _, _ in self.links()], [d, a, b, c])
+        self.assertEqual(list(self.course.lessons.order_by('position').values_list('position', flat=True)),
+                         [1024, 2048, 3072, 4096])
+
+    def test_reorder_rejects_foreign_lessons(self):
+        self.assertEqual(self.reorder([{'id': 0, 'after': None}]).status_code, 400)
+
+    def test_detail_and_complete_include_navigation(self):
+        client = api_client(self.student)
+        second = self.lessons[1]
+
+        data = client.get(f'/lessons/{second.pk}/').json()
+        self.assertEqual(data['prev_lesson'], {'id': self.lessons[0].pk, 'subject': 'Bài 0'})
+        self.assertEqual(data['next_lesson'], {'id': self.lessons[2].pk, 'subject': 'Bài 2'})
+
+        response = client.post(f'/lessons/{second.pk}/complete/')
+        self.assertEqual(response.json()['next_lesson']['id'], self.lessons[2].pk)
+
+
+class LessonSanitizerTests(TestCase):
+    def html(self, content):
+        return rendering.render(content)['html']
+
+    def test_script_and_style_are_dropped_with_content(self):
+        html = self.html('<p>a</p><script>alert(1)</script><style>p{}</style><p>b</p>')
+        self.assertEqual(html, '<p>a</p><p>b</p>')
+        self.assertEqual(self.html('<p>a<script>alert(1)'), '<p>a</p>')
+        self.assertEqual(self.html('<svg><script>alert(1)</script></svg>x'), 'x')
+
+    def test_event_handlers_are_removed(self):
+        html = self.html('<img src="https://x.test/a.png" onerror="alert(1)"><p onclick="alert(1)">x</p>')
+        self.assertNotIn('onerror', html)
+        self.assertNotIn('onclick', html)
+        self.assertIn('src="https://x.test/a.png"', html)
+
+    def test_unsafe_url_schemes_are_removed(self):
+        for url in ('javascript:alert(1)', ' JaVaScRiPt:alert(1)', '&#106;avascript:alert(1)',
+                    'javascript&colon;alert(1)', 'jav&#x09;ascript:alert(1)', 'data:text/html,<script>',
+                    'vbscript:msgbox(1)'):
+            with self.subTest(url=url):
+                self.assertEqual(self.html(f'<a href="{url}">x</a>'), '<a>x</a>')
+        self.assertEqual(self.html('<a href="https://a.test/" target="_blank">x</a>'),
+                         '<a href="https://a.test/" target="_blank" rel="noopener noreferrer">x</a>')
+
+    def test_iframes_are_limited_to_embed_hosts(self):
+        self.assertEqual(self.html('<iframe src="https://evil.test/"></iframe>'), '')
+        self.assertIn('src="https://www.youtube.com/embed/x"',
+                      self.html('<iframe src="https://www.youtube.com/embed/x"></iframe>'))
+
+    def test_unclosed_and_stray_tags_are_balanced(self):
+        self.assertEqual(self.html('<p><b>x'), '<p><b>x</b></p>')
+        self.assertEqual(self.html('</div><p>x</b></p>'), '<p>x</p>')
+        self.assertEqual(self.html('<p title="x">"&lt;b&gt;"</p>'), '<p>"&lt;b&gt;"</p>')
+
+    def test_attribute_values_are_escaped(self):
+        html = self.html('<img src="https://x.test/a.png" alt="&quot;><script>alert(1)</script>">')
+        self.assertNotIn('<script', html)
+        self.assertIn('alt="&quot;&gt;&lt;script&gt;', html)
+
+    def test_prune_removes_old_orphaned_renders(self):
+        lesson = Lesson.objects.create(subject='Bài 1', content='<p>Cũ</p>', course=make_course(make_teacher()))
+        old = lesson.rendered_id
+        lesson.content = '<p>Mới</p>'
+        lesson.save()
+
+        self.assertEqual(LessonRender.prune(24), 0)
+        LessonRender.objects.update(created_date=timezone.now() - datetime.timedelta(days=2))
+        out = io.StringIO()
+        call_command('prune_renders', stdout=out)
+        self.assertIn('Đã xoá 1', out.getvalue())
+        self.assertFalse(LessonRender.objects.filter(pk=old).exists())
+        self.assertTrue(LessonRender.objects.filter(pk=lesson.rendered_id).exists())
+
+
+class LessonAccessCacheTests(CourseTestCase):
+    def setUp(self):
+        cache.clear()
+        self.enterContext(mock.patch.object(caching, 'is_shared', return_value=True))
+
+    def retrieve(self, user):
+        return api_client(user).get(f'/lessons/{self.lesson.pk}/')
+
+    def test_retrieve_uses_cached_decision(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enrollment = Enrollment.objects.create(student=self.student, course=self.course)
+        student, teacher = api_client(self.student), api_client(self.teacher)
+        with self.assertNumQueries(2):
+            self.assertEqual(student.get(f'/lessons/{self.lesson.pk}/').status_code, 200)
+        with self.assertNumQueries(2):
+            self.assertEqual(teacher.get(f'/lessons/{self.lesson.pk}/').status_code, 200)
+
+        enrollment.active = False
+        enrollment.save()
+        self.assertEqual(self.retrieve(self.student).status_code, 403)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            enrollment.active = True
+            enrollment.save()
+        self.assertEqual(self.retrieve(self.student).status_code, 200)
+
+        enrollment.delete()
+        self.assertEqual(self.retrieve(self.student).status_code, 403)
+
+    def test_enrollment_populates_cache_on_commit(self):
+        self.assertEqual(self.retrieve(self.student).status_code, 403)
+        self.assertIsNone(cache.get(access.access_key(self.student.pk, self.course.pk)))
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(student=self.student, course=self.course)
+        self.assertIs(cache.get(access.access_key(self.student.pk, self.course.pk)), True)
+        self.assertEqual(self.retrieve(self.student).status_code, 200)
+
+    def test_miss_does_not_write_decision(self):
+        key = access.access_key(self.student.pk, self.course.pk)
+        self.assertFalse(access.is_enrolled(self.student.pk, self.course.pk))
+        self.assertIsNone(cache.get(key))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            enrollment = Enrollment.objects.create(student=self.student, course=self.course)
+        self.assertIs(cache.get(key), True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            enrollment.active = False
+            enrollment.save()
+            self.assertIsNone(cache.get(key))
+            self.assertFalse(access.is_enrolled(self.student.pk, self.course.pk))
+        self.assertIsNone(cache.get(key))
+
+    def test_process_local_cache_not_trusted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(student=self.student, course=self.course)
+        self.assertEqual(self.retrieve(self.student).status_code, 200)
+
+        # Another worker unenrolls the student: its signals never reach this process's local cache.
+        Enrollment.objects.update(active=False)
+        self.assertIs(cache.get(access.access_key(self.student.pk, self.course.pk)), True)
+        with mock.patch.object(caching, 'is_shared', return_value=False):
+            self.assertEqual(self.retrieve(self.student).status_code, 403)
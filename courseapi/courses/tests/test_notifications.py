@@ -0,0 +1,84 @@
+import datetime
+import json
+
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.utils import timezone
+from oauth2_provider.models import AccessToken, Application
+
+from courses.consumers import websocket_application
+from courses.models import Comment, Enrollment
+from courses.tests.base import CourseTestCase
+
+
+class NotificationChannelTests(CourseTestCase):
+    enrolled = True
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        application = Application.objects.create(name='app', client_type=Application.CLIENT_PUBLIC,
+                                                 authorization_grant_type=Application.GRANT_PASSWORD)
+        AccessToken.objects.create(user=cls.student, token='student-token', application=application,
+                                   expires=timezone.now() + datetime.timedelta(hours=1), scope='read write')
+
+    async def connect(self, token='student-token'):
+        query = f'access_token={token}'.encode() if token else b''
+        communicator = ApplicationCommunicator(websocket_application, {
+            'type': 'websocket', 'path': '/ws/notifications/', 'query_string': query, 'headers': [],
+        })
+        await communicator.send_input({'type': 'websocket.connect'})
+        return communicator, await communicator.receive_output()
+
+    async def request(self, communicator, **data):
+        await communicator.send_input({'type': 'websocket.receive', 'text': json.dumps(data)})
+        return json.loads((await communicator.receive_output())['text'])
+
+    async def test_rejects_missing_token(self):
+        _, message = await self.connect(token=None)
+        self.assertEqual(message, {'type': 'websocket.close', 'code': 4401})
+
+    async def test_enrolled_student_receives_new_comments(self):
+        communicator, message = await self.connect()
+        self.assertEqual(message['type'], 'websocket.accept')
+
+        topic = f'lesson:{self.lesson.pk}'
+        self.assertEqual(await self.request(communicator, action='subscribe', topic=topic), {'subscribed': topic})
+
+        def post_comment():
+            with self.captureOnCommitCallbacks(execute=True):
+                return Comment.objects.create(user=self.student, lesson=self.lesson, content='Xin chào')
+
+        comment = await sync_to_async(post_comment)()
+        event = json.loads((await communicator.receive_output())['text'])
+        self.assertEqual(event['event'], 'comment.created')
+        self.assertEqual(event['data']['id'], comment.pk)
+
+        await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await communicator.wait()
+
+    async def test_student_cannot_subscribe_to_instructor_topic(self):
+        communicator, _ = await self.connect()
+        reply = await self.request(communicator, action='subscribe', topic=f'instructor:{self.teacher.pk}')
+        self.assertIn('error', reply)
+
+        await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await communicator.wait()
+
+    async def test_inactive_enrollment_cannot_subscribe(self):
+        await sync_to_async(Enrollment.objects.update)(active=False)
+        communicator, _ = await self.connect()
+        reply = await self.request(communicator, action='subscribe', topic=f'lesson:{self.lesson.pk}')
+        self.assertIn('error', reply)
+
+        await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await communicator.wait()
+
+    async def test_socket_closed_when_token_expires(self):
+        await sync_to_async(AccessToken.objects.update)(expires=timezone.now() + datetime.timedelta(seconds=0.3))
+        communicator, message = await self.connect()
+        self.assertEqual(message['type'], 'websocket.accept')
+        self.assertEqual(await communicator.receive_output(timeout=2), {'type': 'websocket.close', 'code': 4401})
+
+        await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await communicator.wait()
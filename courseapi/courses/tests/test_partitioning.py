@@ -0,0 +1,102 @@
+import datetime
+import io
+import unittest
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Q
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from courses import partitioning, services
+from courses.models import Comment, Enrollment, LessonStatus, Student, User
+from courses.tests.base import CourseTestCase, api_client
+
+
+class PartitioningTests(CourseTestCase):
+    course_fields = {'fee': 100}
+
+    def test_blockers_reported(self):
+        found = partitioning.blockers(Enrollment)
+        self.assertIn("bị tham chiếu bởi courses_transaction.enrollment_id", found)
+        self.assertIn("khóa duy nhất (student, course) không chứa created_date", found)
+
+        out = io.StringIO()
+        call_command('partition_tables', stdout=out)
+        self.assertIn("courses_enrollment: bỏ qua", out.getvalue())
+
+    def test_plan_creates_and_rotates_monthly_partitions(self):
+        today = datetime.date(2026, 10, 19)
+        create, = partitioning.plan(Comment, ahead=1, today=today, partitions=[])
+        self.assertIn("PARTITION BY RANGE (TO_DAYS(created_date))", create)
+        self.assertIn("PARTITION p202610 VALUES LESS THAN (TO_DAYS('2026-11-01'))", create)
+        self.assertIn("PARTITION p202611 VALUES LESS THAN (TO_DAYS('2026-12-01'))", create)
+        self.assertTrue(create.endswith("PARTITION pmax VALUES LESS THAN MAXVALUE)"))
+
+        rotate, drop = partitioning.plan(Comment, ahead=3, retain=1, today=today,
+                                         partitions=['p202608', 'p202609', 'p202610', 'pmax'])
+        self.assertIn("REORGANIZE PARTITION pmax INTO (PARTITION p202611", rotate)
+        self.assertIn("PARTITION p202701 VALUES LESS THAN (TO_DAYS('2027-02-01'))", rotate)
+        self.assertTrue(drop.endswith("DROP PARTITION p202608"))
+
+        self.assertEqual(partitioning.plan(Comment, ahead=0, today=today, partitions=['p202610', 'pmax']), [])
+
+    @override_settings(PARTITION_PRUNING=True)
+    def test_hot_queries_carry_pruning_predicates(self):
+        qn = connection.ops.quote_name
+        user = User.objects.get(pk=self.student.pk)
+        with CaptureQueriesContext(connection) as ctx:
+            services.CourseService.enroll_student_to_course(user, self.course, 'MoMo')
+        exists = next(q['sql'] for q in ctx.captured_queries if f"FROM {qn('courses_enrollment')}" in q['sql'])
+        self.assertIn(f"{qn('courses_enrollment')}.{qn('created_date')} >=", exists)
+
+        client = api_client(self.student)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(client.post(f'/lessons/{self.lesson.pk}/complete/').status_code, 200)
+        status_sql = [q['sql'] for q in ctx.captured_queries if f"FROM {qn('courses_lessonstatus')}" in q['sql']]
+        self.assertTrue(status_sql)
+        self.assertTrue(all(f"{qn('courses_lessonstatus')}.{qn('created_date')} >=" in sql for sql in status_sql))
+
+        with CaptureQueriesContext(connection) as ctx:
+            report = services.LecturerReportService.build_report(self.teacher)
+        self.assertEqual(report['summary']['total_students'], 1)
+        self.assertEqual(report['summary']['grand_total_revenue'], 100)
+        self.assertTrue(any(f"{qn('courses_transaction')}.{qn('created_date')} >=" in q['sql']
+                            for q in ctx.captured_queries))
+
+    @override_settings(PARTITION_PRUNING=True)
+    def test_floors_ignore_editable_dates(self):
+        self.assertEqual(partitioning.pruning_floor(self.student), None)
+        self.assertEqual(partitioning.pruning_floor(self.student, self.course), self.course.created_date)
+
+        user = User.objects.get(pk=self.student.pk)
+        services.CourseService.enroll_student_to_course(user, self.course, 'MoMo')
+        Student.objects.filter(pk=self.student.pk).update(date_joined=timezone.now() + datetime.timedelta(days=30))
+        user = User.objects.get(pk=self.student.pk)
+
+        self.assertEqual(services.CourseService.enroll_student_to_course(user, self.course, 'MoMo')[1], 400)
+        self.assertEqual(api_client(self.student).post(f'/lessons/{self.lesson.pk}/complete/').status_code, 200)
+        self.assertTrue(LessonStatus.objects.filter(student=self.student, lesson=self.lesson, is_completed=True).exists())
+
+    @override_settings(PARTITION_PRUNING=False)
+    def test_pruning_can_be_disabled(self):
+        self.assertEqual(partitioning.created_since(self.student, self.course), Q())
+        report = services.LecturerReportService.build_report(self.teacher)
+        self.assertEqual(report['summary']['total_students'], 0)
+
+    @unittest.skipUnless(connection.vendor == 'mysql', "Cần MySQL để kiểm tra EXPLAIN")
+    @override_settings(PARTITION_PRUNING=True)
+    def test_explain_prunes_comment_partitions(self):
+        if partitioning.blockers(Comment):
+            self.skipTest("; ".join(partitioning.blockers(Comment)))
+        month = partitioning.month_start(self.lesson.created_date)
+        partitioning.apply(Comment, partitioning.plan(Comment, ahead=3, today=partitioning.add_months(month, -2)))
+        sql, params = self.lesson.comment_set.filter(partitioning.created_since(self.lesson)).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN ' + sql, params)
+            columns = [col[0] for col in cursor.description]
+            partitions = dict(zip(columns, cursor.fetchone()))['partitions'].split(',')
+        stale = partitioning.partition_name(partitioning.add_months(month, -1))
+        self.assertIn(stale, partitioning.existing_partitions(Comment))
+        self.assertNotIn(stale, partitions)
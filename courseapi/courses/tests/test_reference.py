@@ -0,0 +1,64 @@
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from courses import caching, reference
+from courses.models import Category, Tag
+from courses.serializers import LessonCreateSerializer
+
+
+class ReferenceSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Công nghệ phần mềm')
+        cls.tags = [Tag.objects.create(name=f'tag-{i}') for i in range(3)]
+        Tag.objects.create(name='tag-ẩn', active=False)
+
+    def setUp(self):
+        cache.clear()
+        self.client_api = APIClient()
+
+    def test_lists_are_served_from_memory(self):
+        self.assertEqual(len(self.client_api.get('/tags/').json()), 3)
+        self.client_api.get('/categories/')
+
+        with self.assertNumQueries(0):
+            tags = self.client_api.get('/tags/').json()
+            categories = self.client_api.get('/categories/').json()
+        self.assertEqual([tag['name'] for tag in tags], ['tag-0', 'tag-1', 'tag-2'])
+        self.assertEqual(categories, [{'id': self.category.pk, 'name': 'Công nghệ phần mềm'}])
+
+        Tag.objects.create(name='tag-mới')
+        self.assertEqual(len(self.client_api.get('/tags/').json()), 4)
+
+    def test_tag_ids_validate_in_one_lookup(self):
+        serializer = LessonCreateSerializer()
+        reference.tags.current()
+
+        with self.assertNumQueries(0):
+            tags = serializer.fields['tags'].run_validation([str(tag.pk) for tag in self.tags])
+        self.assertEqual(tags, self.tags)
+
+        with self.assertNumQueries(1), self.assertRaises(ValidationError):
+            serializer.fields['tags'].run_validation([self.tags[0].pk, 998, 999])
+
+    def test_local_cache_snapshot_expires(self):
+        reference.categories.current()
+        Category.objects.filter(pk=self.category.pk).update(name='Đổi ở tiến trình khác')
+        self.assertEqual(reference.categories.current().objects[self.category.pk].name, 'Công nghệ phần mềm')
+
+        reference.categories.state.loaded -= settings.REFERENCE_SNAPSHOT_MAX_AGE + 1
+        self.assertEqual(reference.categories.current().objects[self.category.pk].name, 'Đổi ở tiến trình khác')
+        self.assertEqual([w.id for w in caching.check_shared_cache(None)], ['courses.W001'])
+
+    def test_shared_cache_relies_on_versions(self):
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}):
+            self.assertEqual(caching.check_shared_cache(None), [])
+            state = reference.categories.current()
+            state.loaded -= settings.REFERENCE_SNAPSHOT_MAX_AGE + 1
+            self.assertIs(reference.categories.current(), state)
@@ -0,0 +1,29 @@
+import io
+import json
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+
+class StaticSchemaTests(TestCase):
+    def setUp(self):
+        self.schema_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.schema_root.cleanup)
+        self.enterContext(override_settings(SCHEMA_ROOT=self.schema_root.name))
+
+    def test_prebuilt_schema_served_with_etag(self):
+        call_command('build_schema', stdout=io.StringIO())
+
+        response = self.client.get('/swagger.json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('/courses/', json.loads(response.content)['paths'])
+        etag = response['ETag']
+
+        self.assertEqual(self.client.get('/swagger.json', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get('/swagger.yaml').status_code, 200)
+
+    def test_falls_back_to_live_generation(self):
+        response = self.client.get('/swagger.json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('/courses/', json.loads(response.content)['paths'])
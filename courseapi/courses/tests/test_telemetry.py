@@ -0,0 +1,145 @@
+import datetime
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from oauth2_provider.models import AccessToken, Application
+
+from courses import profiling, telemetry
+from courses.models import Category, Course, ProfileWindow, Teacher, User
+
+
+class TelemetryTests(TestCase):
+    def setUp(self):
+        telemetry.registry.reset()
+        cache.clear()
+
+    def test_log_file_follows_setting(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        path = os.path.join(root.name, 'logs', 'telemetry.log')
+        with self.settings(TELEMETRY_LOG_FILE=path):
+            logging.getLogger('courses.telemetry').warning('slow_query')
+        with open(path) as f:
+            self.assertEqual(json.loads(f.readline())['event'], 'slow_query')
+
+    @override_settings(TELEMETRY_SAMPLE_RATE=1, TELEMETRY_SLOW_QUERY_MS=0)
+    def test_sampled_request_records_phases_and_slow_queries(self):
+        teacher = Teacher.objects.create_user(username='gv', password='123456')
+        category = Category.objects.create(name='Lập trình')
+        Course.objects.create(name='Python', category=category, instructor=teacher)
+
+        with self.assertLogs('courses.telemetry', level='INFO') as logs:
+            response = self.client.get('/courses/')
+        self.assertEqual(response.status_code, 200)
+
+        data = telemetry.registry.snapshot()
+        histogram = data['requests']['course-list', 'GET', '200']
+        self.assertEqual(histogram['count'], 1)
+        self.assertEqual(sum(histogram['counts']), 1)
+        self.assertGreater(data['queries']['course-list'], 0)
+        self.assertGreater(data['phases']['course-list', 'db'], 0)
+        self.assertGreater(data['phases']['course-list', 'render'], 0)
+        self.assertTrue(data['slow'])
+        self.assertTrue(all('%s' not in entry['sql'] for entry in data['slow'].values()))
+        self.assertTrue(any(kind == 'version' for kind, _ in data['cache']))
+        self.assertIn('slow_query', ''.join(logs.output))
+
+    @override_settings(TELEMETRY_SAMPLE_RATE=0)
+    def test_unsampled_request_only_observes_latency(self):
+        self.client.get('/categories/')
+        data = telemetry.registry.snapshot()
+        self.assertEqual(data['requests']['category-list', 'GET', '200']['count'], 1)
+        self.assertEqual((data['phases'], data['slow']), ({}, {}))
+
+    def test_sql_fingerprint_ignores_literals(self):
+        first = telemetry.normalize_sql('SELECT * FROM t WHERE id IN (%s, %s) AND name = \'a\' LIMIT 21')
+        second = telemetry.normalize_sql('SELECT *  FROM t WHERE id IN (%s) AND name = \'b\' LIMIT 5')
+        self.assertEqual(first, 'SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?')
+        self.assertEqual(telemetry.fingerprint(first), telemetry.fingerprint(second))
+
+    @override_settings(TELEMETRY_METRICS_TOKEN='secret')
+    def test_metrics_endpoint(self):
+        telemetry.registry.observe('course-list', 'GET', 200, 0.03)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('courseapi_request_duration_seconds_bucket{endpoint="course-list",method="GET",'
+                      'status="200",le="0.05"} 1', body)
+        self.assertIn('courseapi_request_duration_seconds_bucket{endpoint="course-list",method="GET",'
+                      'status="200",le="0.025"} 0', body)
+
+    @override_settings(TELEMETRY_METRICS_TOKEN='secret')
+    def test_metrics_access(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='127.0.0.1').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        with self.settings(TELEMETRY_METRICS_ALLOWED_IPS=['10.0.0.5']):
+            self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.5').status_code, 200)
+
+        self.client.force_login(User.objects.create_user(username='sv', password='123456'))
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.client.force_login(User.objects.create_superuser(username='admin', password='123456'))
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+
+class ProfilingTests(TestCase):
+    def busy(self, seconds):
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            pass
+
+    def test_sampler_folds_stacks_below_root(self):
+        sampler = profiling.StackSampler(threading.get_ident(), sys._getframe(), 0.001, 64)
+        sampler.start()
+        self.busy(0.05)
+        stacks = sampler.stop()
+
+        self.assertEqual(stacks.most_common(1)[0][0], f'{__name__}:ProfilingTests.busy')
+
+    @override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=0)
+    def test_header_profiles_only_staff_requests(self):
+        application = Application.objects.create(name='app', client_type=Application.CLIENT_PUBLIC,
+                                                 authorization_grant_type=Application.GRANT_PASSWORD)
+        for username, is_staff in (('admin', True), ('sv', False)):
+            AccessToken.objects.create(user=User.objects.create_user(username=username, password='123456',
+                                                                     is_staff=is_staff),
+                                       token=f'{username}-token', application=application, scope='read write',
+                                       expires=timezone.now() + datetime.timedelta(hours=1))
+
+        with mock.patch.object(profiling, 'StackSampler', wraps=profiling.StackSampler) as sampler:
+            self.client.get('/categories/', HTTP_X_PROFILE='1')
+            self.client.get('/categories/', HTTP_X_PROFILE='1', HTTP_AUTHORIZATION='Bearer sv-token')
+            self.client.get('/categories/', HTTP_X_PROFILE='1', HTTP_AUTHORIZATION='Bearer bad-token')
+            self.assertFalse(sampler.called)
+            self.assertFalse(ProfileWindow.objects.exists())
+
+            self.client.get('/categories/', HTTP_X_PROFILE='1', HTTP_AUTHORIZATION='Bearer admin-token')
+            self.assertEqual(sampler.call_count, 1)
+        self.assertEqual(ProfileWindow.objects.get().endpoint, 'category-list')
+
+    def test_hottest_functions_and_folded_export(self):
+        now = timezone.now()
+        profiling.record_profile('course-list', {'a:view;b:serialize': 6, 'a:view;c:query': 2}, 0.2, now.isoformat())
+        profiling.record_profile('course-list', {'a:view;b:serialize': 2}, 0.1, now.isoformat())
+
+        window = ProfileWindow.objects.get()
+        self.assertEqual((window.requests, window.samples), (2, 10))
+        hottest = profiling.hottest(now - datetime.timedelta(hours=1))
+        self.assertEqual([(f['function'], f['self'], f['total']) for f in hottest],
+                         [('b:serialize', 8, 8), ('c:query', 2, 2)])
+        self.assertIn('a:view;b:serialize 8\n', profiling.folded(now - datetime.timedelta(hours=1)))
+
+        admin = User.objects.create_superuser(username='admin', password='123456')
+        self.client.force_login(admin)
+        response = self.client.get('/admin/profiles/', {'hours': 1})
+        self.assertContains(response, 'b:serialize')
+        response = self.client.get('/admin/profiles/', {'hours': 1, 'format': 'folded'})
+        self.assertEqual(response.content.decode().count('\n'), 2)
@@ -0,0 +1,68 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import permissions, throttling
+
+
+LOCK_TIMEOUT = 2
+LOCK_WAIT = 0.5
+
+
+class TokenBucketThrottle(throttling.BaseThrottle):
+    scope = None
+
+    def __init__(self):
+        bucket = settings.THROTTLE_BUCKETS[self.scope]
+        self.capacity = bucket['capacity']
+        self.refill_rate = bucket['per_minute'] / 60
+        self.wait_seconds = None
+
+    def get_cache_key(self, request):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return f'throttle:{self.scope}:{ident}'
+
+    def acquire(self, key):
+        deadline = time.monotonic() + LOCK_WAIT
+        while not cache.add(key, 1, LOCK_TIMEOUT):
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def allow_request(self, request, view):
+        if request.method in permissions.SAFE_METHODS:
+            return True
+
+        key = self.get_cache_key(request)
+        if not self.acquire(f'{key}:lock'):
+            self.wait_seconds = 1 / self.refill_rate
+            return False
+        try:
+            return self.take(key)
+        finally:
+            cache.delete(f'{key}:lock')
+
+    def take(self, key):
+        now = time.time()
+        tokens, updated = cache.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated) * self.refill_rate)
+
+        timeout = int(self.capacity / self.refill_rate) + 1
+        if tokens < 1:
+            self.wait_seconds = (1 - tokens) / self.refill_rate
+            cache.set(key, (tokens, now), timeout)
+            return False
+
+        cache.set(key, (tokens - 1, now), timeout)
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class CommentThrottle(TokenBucketThrottle):
+    scope = 'comments'
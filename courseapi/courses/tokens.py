@@ -0,0 +1,82 @@
+import time
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from oauth2_provider.models import get_access_token_model, get_grant_model, get_id_token_model
+from oauth2_provider.models import get_refresh_token_model
+from oauth2_provider.settings import oauth2_settings
+
+from courses.admin_performance import estimated_rows
+
+
+def seconds(value):
+    return value if isinstance(value, timedelta) else timedelta(seconds=value)
+
+
+def expired_queries(now=None):
+    now = now or timezone.now()
+    refresh_lifetime = oauth2_settings.REFRESH_TOKEN_EXPIRE_SECONDS
+    refresh_cutoff = now - seconds(refresh_lifetime) if refresh_lifetime else None
+
+    if oauth2_settings.REFRESH_TOKEN_REUSE_PROTECTION:
+        revoked_cutoff = refresh_cutoff
+    else:
+        revoked_cutoff = now - seconds(oauth2_settings.REFRESH_TOKEN_GRACE_PERIOD_SECONDS or 0)
+
+    refresh_query = Q(revoked__lt=revoked_cutoff) if revoked_cutoff else Q(pk__in=[])
+    if refresh_cutoff:
+        refresh_query |= Q(created__lt=refresh_cutoff)
+
+    return [
+        (get_refresh_token_model(), refresh_query),
+        (get_access_token_model(), Q(expires__lt=now, refresh_token__isnull=True)),
+        (get_id_token_model(), Q(expires__lt=now, access_token__isnull=True)),
+        (get_grant_model(), Q(expires__lt=now)),
+    ]
+
+
+def table_size(model):
+    estimate = estimated_rows(model, model.objects.db)
+    return estimate if estimate is not None else model.objects.count()
+
+
+def purge(model, query, batch_size, pause=0):
+    deleted, last_pk = 0, 0
+    label = model._meta.label
+    while True:
+        ids = list(model.objects.filter(query, pk__gt=last_pk).order_by('pk')
+                   .values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+
+        deleted += model.objects.filter(query, pk__in=ids).delete()[1].get(label, 0)
+        last_pk = ids[-1]
+        if len(ids) < batch_size:
+            return deleted
+        if pause:
+            time.sleep(pause)
+
+
+def clear_expired(batch_size=None, pause=None, dry_run=False):
+    batch_size = batch_size or oauth2_settings.CLEAR_EXPIRED_TOKENS_BATCH_SIZE
+    pause = oauth2_settings.CLEAR_EXPIRED_TOKENS_BATCH_INTERVAL if pause is None else pause
+
+    report = []
+    for model, query in expired_queries():
+        before = table_size(model)
+        started = time.perf_counter()
+        if dry_run:
+            deleted = model.objects.filter(query).count()
+        else:
+            deleted = purge(model, query, batch_size, pause)
+        elapsed = time.perf_counter() - started
+        report.append({
+            'table': model._meta.db_table,
+            'before': before,
+            'deleted': deleted,
+            'seconds': elapsed,
+            'rate': deleted / elapsed if elapsed else 0,
+            'after': before if dry_run else table_size(model),
+        })
+    return report
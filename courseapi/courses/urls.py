@@ -10,6 +10,7 @@ r.register('lessons', views.LessonView, basename='lesson')
 r.register('users', views.UserView, basename='user')
 r.register('comments', views.CommentView, basename='comment')
 r.register('tags', views.TagView, basename='tag')
+r.register('exports', views.ExportView, basename='export')
 
 
 urlpatterns = [
@@ -1,3 +1,5 @@
+import os
+
 from django.contrib.admindocs.utils import parse_rst
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import viewsets, generics, status, parsers, permissions
@@ -5,53 +7,61 @@ from rest_framework.decorators import action
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from courses import serializers, paginators, perms, services
+from courses import serializers, paginators, perms, services, leaderboards, facets, jobs, exports, throttles
+from courses import reference, provisioning, hashing, bundles, access, partitioning
+from courses.conditional import ConditionalGetMixin
+from courses.reference import SnapshotListMixin
+from courses.projection import ProjectedQuerysetMixin, project
+from courses.renderers import StreamingJSONResponse
 from courses.models import Category, Course, Lesson, User, Comment, Like, Enrollment
-from courses.models import  Teacher, Rating, Transaction, LessonStatus, Tag
-from django.db.models import Count, Avg, Q, Exists, OuterRef,Value, BooleanField
+from courses.models import  Teacher, Rating, Transaction, LessonStatus, Tag, CourseScore, ExportJob, Job
+from django.db.models import Count, Avg, Q, Exists, OuterRef,Value, BooleanField, Subquery, F
 from django.db.models.functions import Coalesce
+from django.http import FileResponse
 
 
-class CategoryView(services.CreateServices, viewsets.ViewSet, generics.ListAPIView, generics.CreateAPIView):
+class CategoryView(SnapshotListMixin, ConditionalGetMixin, services.CreateServices, viewsets.ViewSet,
+                   generics.ListAPIView, generics.CreateAPIView):
    queryset = Category.objects.all()
+   snapshot = reference.categories
    serializer_class = serializers.CategorySerializer
    parser_classes = (parsers.MultiPartParser, parsers.FormParser)
    permission_classes = [perms.IsGiangVienOrReadOnly]
    success_message = 'Tạo danh mục thành công'
+   etag_versions = ('category',)
+   last_modified_field = None
 
 
-class TagView(services.CreateServices, viewsets.ViewSet, generics.ListAPIView, generics.CreateAPIView):
-    queryset = Tag.objects.filter(active=True)
+class TagView(SnapshotListMixin, ConditionalGetMixin, services.CreateServices, viewsets.ViewSet,
+              generics.ListAPIView, generics.CreateAPIView):
+    queryset = Tag.objects.active()
+    snapshot = reference.tags
     serializer_class = serializers.TagSerializer
     parser_classes = [parsers.MultiPartParser, parsers.FormParser]
     permission_classes = [perms.IsGiangVienOrReadOnly]
     success_message = 'Tạo tag thành công'
+    etag_versions = ('tag',)
+
+    def snapshot_items(self, objects):
+        return [tag for tag in objects if tag.active]
 
 
-class CourseView( viewsets.ModelViewSet):
- 
-    queryset = (Course.objects.filter(active=True)
+class CourseView(ConditionalGetMixin, viewsets.ModelViewSet):
+
+    queryset = (Course.objects.active()
                 .select_related('instructor__user_ptr', 'category')
-                .prefetch_related('tags').filter(active=True)
-                .annotate(
-                    total_likes=Count(
-                        'like',
-                        filter=Q(like__active=True),
-                        distinct=True
-                    ),
-                    avg_rating=Coalesce(
-                        Avg('rating__rate'),0.0)
-                ))
+                .prefetch_related('tags'))
 
     serializer_class = serializers.CourseSerializer
     pagination_class = paginators.ItemPagination
     parser_classes = [parsers.MultiPartParser, parsers.FormParser]
     http_method_names = ['get', 'post', 'patch', 'delete', 'head', 'options']
+    etag_versions = ('course', 'like', 'rating', 'enrollment', 'tag', 'category', 'teacher')
 
     def get_permissions(self):
         if self.action == 'create':
             return [perms.IsVerifiedTeacher()]
-        elif self.action in ['update', 'partial_update', 'destroy']:
+        elif self.action in ['update', 'partial_update', 'destroy', 'reorder_lessons']:
             return [perms.IsVerifiedTeacher(), perms.IsInstructorOfCourse()]
         return [permissions.AllowAny()]
 
@@ -60,8 +70,7 @@ class CourseView( viewsets.ModelViewSet):
             return serializers.CourseCreateSerializer
         return self.serializer_class
 
-    def get_queryset(self):
-        query = self.queryset
+    def filter_courses(self, query):
         q = self.request.query_params.get('q')
         if q:
             query = query.filter(name__icontains=q)
@@ -77,30 +86,32 @@ class CourseView( viewsets.ModelViewSet):
         if instructor_id:
             query = query.filter(instructor_id=instructor_id)
 
+        return query
+
+    def get_validator_queryset(self):
+        return self.filter_courses(Course.objects.active())
+
+    def get_queryset(self):
         user = self.request.user
-        if user.is_authenticated and hasattr(user, 'student'):
-            query = query.annotate(
-                is_liked_by_me=Exists(
-                    Like.objects.filter(
-                        course=OuterRef('pk'),
-                        student=user.student,
-                        active=True
-                    )
-                ),
-                is_enrolled_by_me=Exists(
-                    Enrollment.objects.filter(
-                        course=OuterRef('pk'),
-                        student=user.student
-                    )
-                )
-            )
-        else:
+        student = user.student if user.is_authenticated and hasattr(user, 'student') else None
+        query = services.CourseService.with_stats(self.filter_courses(self.queryset), student)
+
+        if student is None:
             query = query.annotate(
                 is_liked_by_me=Value(False, output_field=BooleanField()),
                 is_enrolled_by_me=Value(False, output_field=BooleanField())
             )
 
-        return query.distinct()
+        ordering = self.request.query_params.get('ordering')
+        board = {'trending': CourseScore.Boards.TRENDING, 'top_rated': CourseScore.Boards.TOP_RATED}.get(ordering)
+        if board:
+            scope = leaderboards.scope_for(self.request.query_params.get('category_id'),
+                                           self.request.query_params.get('tag_id'))
+            query = query.annotate(leader_score=Subquery(
+                CourseScore.objects.filter(board=board, scope=scope, course=OuterRef('pk')).values('score')[:1]
+            )).order_by(F('leader_score').desc(nulls_last=True), '-id')
+
+        return project(query.distinct(), self.get_serializer_class())
 
     def perform_create(self, serializer):
         serializer.save(instructor=self.request.user.teacher)
@@ -143,8 +154,75 @@ class CourseView( viewsets.ModelViewSet):
                     return Response(serializer.data, status=status.HTTP_201_CREATED)
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-            lessons = course.lessons.filter(active=True)
-            return Response(serializers.LessonSerializer(lessons, many=True).data, status=status.HTTP_200_OK)
+            lessons = project(course.lessons.active().order_by('position', 'id'), serializers.LessonSerializer)
+            return self.conditional_response(
+                request, self.get_stamp(lessons),
+                lambda: Response(serializers.LessonSerializer(lessons, many=True).data, status=status.HTTP_200_OK),
+                etag_versions=('lesson', 'comment'))
+
+    @action(methods=['post'], url_path='lessons/reorder', detail=True, parser_classes=[parsers.JSONParser],
+            serializer_class=serializers.LessonReorderSerializer)
+    def reorder_lessons(self, request, pk):
+        course = self.get_object()
+        serializer = serializers.LessonReorderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        order = services.LessonService.reorder(course, serializer.validated_data['moves'])
+        return Response({"order": order}, status=status.HTTP_200_OK)
+
+    @action(methods=['get'], url_path='bundle', detail=True, permission_classes=[IsAuthenticated])
+    def bundle(self, request, pk):
+        course = generics.get_object_or_404(Course.objects.active(), pk=pk)
+        if not access.can_view(request.user, course.pk, course.instructor_id):
+            return Response({"detail": "Bạn cần đăng ký khóa học này để tải nội dung."},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        since = request.query_params.get('since')
+        if since is not None:
+            if not since.isdigit():
+                return Response({"detail": "Phiên bản không hợp lệ."}, status=status.HTTP_400_BAD_REQUEST)
+            since = int(since)
+
+        bundle = bundles.get_bundle(course, since)
+        name = f'course-{course.pk}-{bundle["version"]}' + (f'-since-{since}' if since is not None else '')
+        response = bundles.ranged_response(request._request, bundle['file'], bundle['etag'], f'{name}.zip')
+        response['X-Bundle-Version'] = str(bundle['version'])
+        response['Cache-Control'] = 'private'
+        return response
+
+    @action(methods=['get'], url_path='search', detail=False)
+    def search(self, request):
+        try:
+            params = facets.parse_params(request.query_params)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        index = facets.get_index()
+        q = request.query_params.get('q')
+        if q:
+            params['restrict'] = index.encode(
+                Course.objects.active().filter(name__icontains=q).values_list('id', flat=True))
+
+        ids, counts = index.search(**params)
+
+        p = paginators.ItemPagination()
+        page = p.paginate_queryset(ids, request, view=self)
+        student = getattr(request.user, 'student', None) if request.user.is_authenticated else None
+        courses = services.CourseService.with_stats(
+            Course.objects.filter(pk__in=page).select_related('category').prefetch_related('tags'), student)
+        courses = sorted(courses, key=lambda c: page.index(c.pk))
+
+        response = p.get_paginated_response(serializers.CourseSerializer(courses, many=True).data)
+        response.data['facets'] = counts
+        return response
+
+    @action(methods=['get'], url_path='similar', detail=True, serializer_class=serializers.CourseSummarySerializer)
+    def similar(self, request, pk):
+        if not str(pk).isdigit() or not Course.objects.active().filter(pk=pk).exists():
+            return Response({"detail": "Không tìm thấy khóa học."}, status=status.HTTP_404_NOT_FOUND)
+
+        courses = services.RecommendationService.get_similar_courses(pk)
+        return Response(serializers.CourseSummarySerializer(courses, many=True).data, status=status.HTTP_200_OK)
 
     @action(methods=['post'], url_path='enroll', detail=True, serializer_class = serializers.EnrollmentSerializer)
     def enroll(self, request, pk):
@@ -181,7 +259,7 @@ class CourseView( viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
 
         rate_value = serializer.validated_data.get('rate')
-        rating = Rating.objects.update_or_create(
+        rating, _ = Rating.objects.update_or_create(
             student=request.user.student,
             course=self.get_object(),
             defaults={'rate': rate_value}
@@ -190,35 +268,35 @@ class CourseView( viewsets.ModelViewSet):
 
 
 
-class LessonView(viewsets.ViewSet, generics.RetrieveAPIView, generics.DestroyAPIView, generics.UpdateAPIView):
-    queryset = Lesson.objects.prefetch_related('tags').filter(active=True)
+class LessonView(ConditionalGetMixin, ProjectedQuerysetMixin, viewsets.ViewSet, generics.RetrieveAPIView,
+                 generics.DestroyAPIView, generics.UpdateAPIView):
+    queryset = (Lesson.objects.select_related('rendered', 'prev_lesson', 'next_lesson')
+                .annotate(instructor_id=F('course__instructor_id'))
+                .prefetch_related('tags').active())
     serializer_class = serializers.LessonDetailSerializer
     http_method_names = ['get', 'post', 'patch', 'delete', 'head', 'options']
+    etag_versions = ('lesson', 'tag', 'comment')
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [perms.IsInstructorOfCourse()]
+        if self.action == 'get_comments' and self.request.method == 'POST':
+            return [permissions.IsAuthenticated()]
         return [permissions.AllowAny()]
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         user = request.user
 
-        if user.role == User.Role.TEACHER:
-            if instance.course.instructor == getattr(user, 'teacher', None):
-                return super().retrieve(request, *args, **kwargs)
+        if access.can_view(user, instance.course_id, instance.instructor_id):
+            return self.conditional_retrieve(request, instance)
+
+        role = getattr(user, 'role', None)
+        if role == User.Role.TEACHER:
             return Response({"detail": "Bạn không phải giảng viên của khóa học này."},
                             status=status.HTTP_403_FORBIDDEN)
 
-        if user.role == User.Role.STUDENT:
-            is_enrolled = Enrollment.objects.filter(
-                student=getattr(user, 'student', None),
-                course=instance.course
-            ).exists()
-
-            if is_enrolled:
-                return super().retrieve(request, *args, **kwargs)
-
+        if role == User.Role.STUDENT:
             return Response(
                 {"detail": "Bạn cần đăng ký khóa học này để xem nội dung bài học."},
                 status=status.HTTP_403_FORBIDDEN
@@ -231,20 +309,25 @@ class LessonView(viewsets.ViewSet, generics.RetrieveAPIView, generics.DestroyAPI
         instance.active = False
         instance.save()
 
-    @action(methods=['get', 'post'], url_path='comments', detail=True)
+    @action(methods=['get', 'post'], url_path='comments', detail=True, throttle_classes=[throttles.CommentThrottle])
     def get_comments(self, request, pk):
         if request.method.__eq__('POST'):
 
-            s = serializers.CommentSerializer(data=request.data)
+            s = serializers.CommentCreateSerializer(data=request.data)
             s.is_valid(raise_exception=True)
             c = s.save(
                 user=request.user,
                 lesson=self.get_object()
             )
-            return Response(serializers.CommentSerializer(c).data, status=status.HTTP_201_CREATED)
+            return Response(serializers.CommentCreateSerializer(c).data, status=status.HTTP_201_CREATED)
 
-        comments = self.get_object().comment_set.select_related('user').filter(active=True)
+        lesson = self.get_object()
+        comments = lesson.comment_set.filter(partitioning.created_since(lesson)).select_related('user').active()
+        return self.conditional_response(request, self.get_stamp(comments),
+                                         lambda: self.list_comments(request, comments),
+                                         etag_versions=('comment',))
 
+    def list_comments(self, request, comments):
         p = paginators.CommentPaginator()
         page = p.paginate_queryset(comments, request)
         if page is not None:
@@ -257,18 +340,23 @@ class LessonView(viewsets.ViewSet, generics.RetrieveAPIView, generics.DestroyAPI
     def mark_completed(self, request, pk):
         lesson = self.get_object()
         student = request.user.student
-        enrollment = Enrollment.objects.filter(student=student, course=lesson.course).first()
+        enrollment = Enrollment.objects.filter(partitioning.created_since(lesson.course),
+                                               student=student, course=lesson.course).first()
 
         if enrollment:
-            LessonStatus.objects.update_or_create(
+            LessonStatus.objects.filter(partitioning.created_since(lesson)).update_or_create(
                 student=student, lesson=lesson,
                 defaults={'is_completed': True}
             )
-            enrollment.update_progress()
+            jobs.enqueue('update_enrollment_progress', {'enrollment_id': enrollment.pk},
+                         dedup_key=f'progress:{enrollment.pk}')
+            enrollment.refresh_from_db(fields=['progress', 'is_completed'])
             return Response({
                 "message": "Đã hoàn thành bài học!",
                 "progress": f"{enrollment.progress}%",
-                "is_completed": enrollment.is_completed
+                "is_completed": enrollment.is_completed,
+                "next_lesson": serializers.LessonLinkSerializer(lesson.next_lesson).data if lesson.next_lesson else None,
+                "queued": jobs.enabled()
             })
         return Response({"detail": "Lỗi: Không tìm thấy khóa học đăng ký"}, status=400)
 
@@ -295,11 +383,46 @@ class UserView(viewsets.ViewSet, generics.CreateAPIView):
 
         return Response(serializers.UserSerializer(u).data, status=status.HTTP_200_OK)
 
+    @action(methods=['post'], url_path='provision', detail=False, permission_classes=[permissions.IsAdminUser],
+            parser_classes=[parsers.MultiPartParser, parsers.JSONParser])
+    def provision(self, request):
+        roster = request.FILES.get('roster')
+        if roster is not None:
+            rows = provisioning.read_roster(roster)
+        elif isinstance(request.data.get('users'), list):
+            rows = request.data['users']
+        else:
+            return Response({"detail": "Vui lòng gửi tệp roster (CSV/JSON) hoặc danh sách users."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        report = provisioning.provision(rows)
+        if 'error' in report:
+            return Response({"detail": report['error'], **report}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_200_OK)
+
+    @action(methods=['get'], url_path='hashing-stats', detail=False, permission_classes=[permissions.IsAdminUser])
+    def hashing_stats(self, request):
+        return Response(hashing.metrics.snapshot(), status=status.HTTP_200_OK)
+
     @action(methods=['get'], url_path='my-courses', detail=False,permission_classes=[permissions.IsAuthenticated])
     def my_courses(self, request):
-        serializer, http_status = services.CourseService.get_my_courses(request.user)
-        return Response(serializer, status=http_status)
+        queryset, serializer_class = services.CourseService.get_my_courses(request.user)
+        return StreamingJSONResponse(queryset, serializer_class, status=status.HTTP_200_OK)
+
+
+    @action(methods=['get'], url_path='dashboard', detail=False, permission_classes=[permissions.IsAuthenticated])
+    def dashboard(self, request):
+        data = services.CourseService.get_dashboard(request.user, request.query_params.get('updated_since'))
+        return Response(data, status=status.HTTP_200_OK)
+
+    @action(methods=['get'], url_path='recommendations', detail=False, permission_classes=[permissions.IsAuthenticated])
+    def recommendations(self, request):
+        student = getattr(request.user, 'student', None)
+        if student is None:
+            return Response({"detail": "Chỉ học sinh mới nhận được gợi ý khóa học."}, status=status.HTTP_403_FORBIDDEN)
 
+        courses = services.RecommendationService.get_recommendations(student)
+        return Response(serializers.CourseSummarySerializer(courses, many=True).data, status=status.HTTP_200_OK)
 
     @action(methods=['get'], url_path='verified-teachers', detail=False)
     def get_verified_teachers(self, request):
@@ -318,15 +441,13 @@ class UserView(viewsets.ViewSet, generics.CreateAPIView):
         students = User.objects.filter(role=User.Role.STUDENT,is_active=True
                             ).exclude(id=request.user.id)
 
-        serializer = serializers.ChatUserSerializer(students, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return StreamingJSONResponse(students, serializers.ChatUserSerializer, context={'request': request})
 
     @action(methods=['get'], url_path='chat-teachers', detail=False, permission_classes=[permissions.IsAuthenticated])
     def get_chat_teachers(self, request):
         teachers = User.objects.filter(role=User.Role.TEACHER, is_active=True)
 
-        serializer = serializers.ChatUserSerializer(teachers, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return StreamingJSONResponse(teachers, serializers.ChatUserSerializer, context={'request': request})
 
 
     @action(methods=['get'], url_path='stats', detail=False, 
@@ -336,28 +457,53 @@ class UserView(viewsets.ViewSet, generics.CreateAPIView):
             teacher = request.user.teacher
             period = request.query_params.get('time', 'month') 
 
-            by_courses = services.LecturerReportService.get_financial_stats(teacher)
-            by_periods = services.LecturerReportService.get_revenue_stats(teacher, period)
-            
+            report = services.LecturerReportService.get_report(teacher, period)
 
-            grand_total = sum(item['total_revenue'] for item in by_courses)
-            total_students = sum(item['total_students'] for item in by_courses)
-
-            return Response({
-                "summary": {
-                    "grand_total_revenue": grand_total,
-                    "total_students": total_students,
-                    "period_viewing": period
-                },
-                "stats_by_courses": list(by_courses),
-                "stats_by_time": list(by_periods)
-            }, status=status.HTTP_200_OK)
+            return Response(report, status=status.HTTP_200_OK)
 
         except Exception as e:
             return Response({"detail": f"Lỗi báo cáo: {str(e)}"}, status=500)
 
 
 class CommentView(viewsets.ViewSet, generics.DestroyAPIView):
-    queryset = Comment.objects.filter(active=True)
+    queryset = Comment.objects.active()
     serializer_class = serializers.CommentSerializer
-    permission_classes = [perms.CommentOwner]
\ No newline at end of file
+    permission_classes = [perms.CommentOwner]
+
+    def perform_destroy(self, instance):
+        services.CommentService.hide(Comment.objects.filter(pk=instance.pk))
+
+
+class ExportView(viewsets.ViewSet, generics.ListAPIView, generics.RetrieveAPIView, generics.CreateAPIView):
+    serializer_class = serializers.ExportJobSerializer
+    pagination_class = paginators.ItemPagination
+    permission_classes = [perms.CanExportReports]
+
+    def get_queryset(self):
+        queryset = ExportJob.objects.all()
+        if getattr(self, 'swagger_fake_view', False):
+            return queryset.none()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(requested_by=self.request.user)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        export = serializer.save(requested_by=request.user)
+
+        jobs.enqueue('run_export', {'export_id': export.pk}, dedup_key=f'export:{export.pk}')
+        export.refresh_from_db()
+
+        return Response(self.get_serializer(export).data,
+                        status=status.HTTP_202_ACCEPTED if jobs.enabled() else status.HTTP_201_CREATED)
+
+    @action(methods=['get'], url_path='download', detail=True)
+    def download(self, request, pk):
+        export = self.get_object()
+        if export.status != Job.Status.DONE or not export.file:
+            return Response({"detail": "Báo cáo chưa sẵn sàng để tải về"}, status=status.HTTP_409_CONFLICT)
+
+        return FileResponse(export.file.open('rb'), as_attachment=True,
+                            filename=os.path.basename(export.file.name),
+                            content_type=exports.content_type(export))